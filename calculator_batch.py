@@ -0,0 +1,110 @@
+"""Streaming batch evaluation for the Ultimate Scientific Calculator.
+
+Reads one expression per line and writes one JSON object per line, in input
+order. Work is split into chunks that are evaluated by a pool of worker
+processes; at most a fixed number of chunks is in flight at any time, so
+memory stays bounded however long the input is.
+"""
+import json
+import math
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from calculator_core import (evaluate_expression, format_result, is_approximate,
+                             set_compile_cache_stores)
+
+CHUNK_SIZE = 512
+CHUNKS_PER_WORKER = 2  # chunks queued per worker ahead of the writer
+
+
+def _json_result(result):
+    """Return a JSON-safe form of an evaluation result"""
+    if hasattr(result, 'tolist'):  # NumPy arrays become lists, NumPy scalars numbers
+        result = result.tolist()
+    if isinstance(result, list):
+        return [_json_result(value) for value in result]
+    if isinstance(result, int) and not isinstance(result, bool):
+        return result
+    if isinstance(result, float) and math.isfinite(result):
+        return result
+    return str(result)
+
+
+def evaluate_fields(expression, angle_mode='deg', exact=False, modulus=None):
+    """Evaluate one expression; return {'result': ...} or {'error': message}
+
+    Approximate results are given as text with 'approximate': true.
+    """
+    try:
+        result = evaluate_expression(expression, angle_mode, exact, modulus)
+        if is_approximate(result):
+            return {'result': format_result(result), 'approximate': True}
+        return {'result': _json_result(result)}
+    except Exception as e:
+        return {'error': str(e) or type(e).__name__}
+
+
+def evaluate_record(line_number, expression, angle_mode='deg', exact=False):
+    """Evaluate one expression and return its JSON line"""
+    record = {'line': line_number, 'expression': expression}
+    record.update(evaluate_fields(expression, angle_mode, exact))
+    return json.dumps(record)
+
+
+def evaluate_chunk(chunk, angle_mode='deg', exact=False):
+    """Evaluate a list of (line_number, expression) pairs in a worker"""
+    return [evaluate_record(number, expression, angle_mode, exact)
+            for number, expression in chunk]
+
+
+def _chunks(lines, chunk_size):
+    numbered = ((number, line.strip()) for number, line in enumerate(lines, 1))
+    expressions = ((number, line) for number, line in numbered if line)
+    while True:
+        chunk = list(islice(expressions, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def evaluate_lines(lines, angle_mode='deg', workers=None, chunk_size=CHUNK_SIZE,
+                   exact=False):
+    """Yield a JSON line for every non-blank input line, in input order
+
+    workers=1 evaluates in this process; otherwise a process pool of the
+    given size (default: CPU count) is used.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = _chunks(lines, chunk_size)
+    # Batch input rarely repeats, so reading the compile cache pays but filling it doesn't
+    if workers == 1:
+        previous = set_compile_cache_stores('off')
+        try:
+            for chunk in chunks:
+                yield from evaluate_chunk(chunk, angle_mode, exact)
+        finally:
+            set_compile_cache_stores(previous)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=set_compile_cache_stores,
+                             initargs=('off',)) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(evaluate_chunk, chunk, angle_mode, exact))
+            if len(pending) >= workers * CHUNKS_PER_WORKER:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def run_batch(infile, outfile, angle_mode='deg', workers=None, chunk_size=CHUNK_SIZE,
+              exact=False):
+    """Stream expressions from infile to JSONL results on outfile"""
+    count = 0
+    for record in evaluate_lines(infile, angle_mode, workers, chunk_size, exact):
+        outfile.write(record + "\n")
+        count += 1
+    outfile.flush()
+    return count
@@ -0,0 +1,471 @@
+"""Benchmark suite for the Ultimate Scientific Calculator.
+
+Drives UltimateCalculator without a window and times its hot paths:
+expression evaluation, plotting and removing functions, adding history
+entries, big factorials and base conversion, and cold start-up. Results are
+written as JSON and can be compared against a stored baseline, so a slower
+build is caught before release.
+
+When no display is available (or headless=True), tkinter is replaced by a
+minimal stand-in and matplotlib renders with Agg, so the numbers cover the
+calculator's own work plus the real figure rendering but no Tk drawing.
+"""
+import importlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_FORMAT = 1
+TOLERANCE = 0.25  # slowdown beyond which a benchmark counts as a regression
+HISTORY_WINDOW = 1000  # entries timed at each history size
+
+EXPRESSION_CORPUS = (
+    '2+3*4', '(1+2)*(3+4)/5', '2^10', '10/3', '7 mod 3', '-5+2',
+    'sin(30)', 'cos(60)+tan(45)', 'asin(0.5)', 'sinh(1)*cosh(1)',
+    'log(1000)', 'ln(e^2)', 'math.sqrt(2)', 'math.exp(1)', 'abs(-3.5)',
+    'pi*2^2', 'factorial(20)', 'round(2.5)+min(3, 4)+max(1, 2)',
+    '2^1000', '3^5000 mod 7', '7^10^7 mod 1000000007', '9^9^9',
+    'log10(9^9^9)', 'exp(1000)', 'crt(2, 3, 3, 5, 2, 7)', 'modinv(3, 11)',
+    'np.sum(np.sqrt(16))', 'sin(range(0, 360, 0.01))', 'mean([1, 2, 3, 4])', '1/0',
+)
+GRAPH_FUNCTIONS = (
+    'sin(x)', 'cos(x)', 'x**2', 'tan(x)', '1/x', 'sqrt(x)', 'exp(x/5)',
+    'ln(abs(x)+1)', 'x**3-2*x', 'abs(x)', 'sin(x)*cos(3*x)', 'floor(x)',
+)
+GRAPH_FAMILY = 'sin(k*x), k=1..200'
+GRAPH_REPEATED = 'sin(x)^2 + sin(x)*cos(x) + sin(x) + exp(-x^2)*cos(x)*exp(-x^2)'
+REPEATED_SAMPLES = 10 ** 6
+FACTORIAL_INPUTS = ('400', '100000', '1000000000')
+CONVERSION_INPUTS = ('255', '1e15', '1e300')
+
+
+# Headless tkinter
+
+class _Variable:
+    def __init__(self, master=None, value=None, name=None):
+        self._value = '' if value is None else value
+
+    def get(self):
+        return self._value
+
+    def set(self, value):
+        self._value = value
+
+
+class _Entry:
+    def __init__(self, master=None, textvariable=None, **options):
+        self._text = ''
+        self._variable = textvariable
+
+    def get(self):
+        return self._variable.get() if self._variable is not None else self._text
+
+    def insert(self, index, text):
+        self._text = text + self._text if index == 0 else self._text + text
+
+    def delete(self, first, last=None):
+        self._text = ''
+
+    def __getattr__(self, name):  # grid, pack, bind, configure, ...
+        return lambda *args, **kwargs: None
+
+
+class _Combobox(_Entry):
+    def set(self, value):
+        self._text = value
+
+
+class _Listbox:
+    def __init__(self, master=None, **options):
+        self._items = []
+        self._selection = ()
+
+    def _index(self, index):
+        return len(self._items) if index == 'end' else index
+
+    def insert(self, index, *items):
+        index = self._index(index)
+        self._items[index:index] = items
+
+    def delete(self, first, last=None):
+        first = self._index(first)
+        last = first if last is None else self._index(last)
+        del self._items[first:last + 1]
+
+    def get(self, first, last=None):
+        if isinstance(first, tuple):
+            first = first[0]
+        return self._items[self._index(first)]
+
+    def size(self):
+        return len(self._items)
+
+    def curselection(self):
+        return self._selection
+
+    def selection_clear(self, first, last=None):
+        self._selection = ()
+
+    def selection_set(self, first, last=None):
+        self._selection = (self._index(first),)
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class _Root:
+    """Stand-in for tk.Tk: after() callbacks run on update()"""
+
+    def __init__(self):
+        self._pending = []
+
+    def after(self, ms, func=None, *args):
+        if func is not None:
+            self._pending.append((func, args))
+        return len(self._pending)
+
+    def after_idle(self, func, *args):
+        return self.after(0, func, *args)
+
+    def update(self):
+        pending, self._pending = self._pending, []
+        for func, args in pending:
+            func(*args)
+
+    def __getattr__(self, name):  # title, geometry, bind, protocol, ...
+        return lambda *args, **kwargs: None
+
+
+def _install_headless_tk():
+    """Replace tkinter and the TkAgg backend with windowless stand-ins"""
+    from unittest import mock
+
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    class Canvas(FigureCanvasAgg):
+        def __init__(self, figure, master=None):
+            super().__init__(figure)
+
+        def get_tk_widget(self):
+            return mock.MagicMock()
+
+        def draw_idle(self, *args, **kwargs):
+            self.draw()
+
+    tk = mock.MagicMock(name='tkinter')
+    tk.END = 'end'
+    tk.StringVar = tk.IntVar = tk.DoubleVar = tk.BooleanVar = _Variable
+    tk.Listbox = _Listbox
+    tk.TclError = type('TclError', (Exception,), {})
+    ttk = mock.MagicMock(name='tkinter.ttk')
+    ttk.Entry = _Entry
+    ttk.Combobox = _Combobox
+    tk.ttk = ttk
+    backend = mock.MagicMock(name='backend_tkagg')
+    backend.FigureCanvasTkAgg = Canvas
+    sys.modules.update({
+        'tkinter': tk, 'tkinter.ttk': ttk, 'tkinter.messagebox': tk.messagebox,
+        'tkinter.simpledialog': tk.simpledialog, 'tkinter.filedialog': tk.filedialog,
+        'matplotlib.backends.backend_tkagg': backend,
+    })
+
+
+def _display_available():
+    try:
+        import tkinter
+        tkinter.Tk().destroy()
+        return True
+    except Exception:
+        return False
+
+
+def build_app(headless=None):
+    """Create an UltimateCalculator with its window hidden; return (app, root)
+
+    headless=None uses a real Tk root when a display is available.
+    """
+    if headless is None:
+        headless = not _display_available()
+    if headless:
+        _install_headless_tk()
+    module = importlib.import_module('calculator_gui')
+    if headless:
+        root = _Root()
+    else:
+        root = module.tk.Tk()
+        root.withdraw()
+    return module.UltimateCalculator(root), root
+
+
+# Measurement
+
+def _timed(func, repeat):
+    """Seconds per call of func: (min, median) over repeat calls"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times), statistics.median(times)
+
+
+def _record(results, name, seconds, repeat, per=1):
+    best, median = seconds
+    results[name] = {'seconds': median / per, 'min': best / per, 'repeat': repeat}
+
+
+def bench_evaluate(app, root, results, repeat):
+    from calculator_core import _compile_cached, compile_cache
+
+    core = app.core
+
+    def corpus():
+        for expression in EXPRESSION_CORPUS:
+            core.clear()
+            core.add_to_expression(expression)
+            core.evaluate()
+
+    def cold_corpus():
+        _compile_cached.cache_clear()
+        compile_cache().clear()
+        corpus()
+
+    def disk_corpus():  # a new session: compiled code comes from the disk cache
+        _compile_cached.cache_clear()
+        corpus()
+
+    def gui_corpus():
+        for expression in EXPRESSION_CORPUS:
+            app.clear()
+            app.add_to_expression(expression)
+            app.evaluate()
+            while app.evaluation_job is not None:
+                root.update()
+
+    count = len(EXPRESSION_CORPUS)
+    corpus()  # warm the compile cache and the worker
+    gui_corpus()
+    _record(results, 'evaluate.corpus', _timed(corpus, repeat), repeat, count)
+    _record(results, 'evaluate.corpus_cold', _timed(cold_corpus, repeat), repeat, count)
+    _record(results, 'evaluate.corpus_disk', _timed(disk_corpus, repeat), repeat, count)
+    _record(results, 'evaluate.gui_round_trip', _timed(gui_corpus, repeat), repeat, count)
+
+
+class BenchmarkError(RuntimeError):
+    """A benchmarked operation failed, so its timing would be meaningless"""
+
+
+def _check_curves(app, expected):
+    if len(app.graph_functions) != expected or len(app.function_lines) != expected:
+        raise BenchmarkError(f"Expected {expected} curves, found {len(app.graph_functions)} "
+                             f"functions and {len(app.function_lines)} lines")
+
+
+def bench_graph(app, root, results, repeat, counts):
+    # Error dialogs abort the run instead of being timed as if plotting worked
+    messagebox = type(app).plot_function.__globals__['messagebox']
+    showerror = messagebox.showerror
+
+    def fail(title, message, **options):
+        raise BenchmarkError(message)
+
+    messagebox.showerror = fail
+    try:
+        _bench_graph(app, root, results, repeat, counts)
+    finally:
+        messagebox.showerror = showerror
+
+
+def _bench_graph(app, root, results, repeat, counts):
+    def plot(n):
+        for index in range(n):
+            app.function_entry.delete(0, 'end')
+            app.function_entry.insert(0, GRAPH_FUNCTIONS[index % len(GRAPH_FUNCTIONS)])
+            app.plot_function()
+        root.update()
+        _check_curves(app, n)
+
+    def remove_all():
+        while app.graph_functions:
+            app.function_listbox.selection_clear(0, 'end')
+            app.function_listbox.selection_set(0)
+            app.remove_function()
+        root.update()
+        _check_curves(app, 0)
+
+    def redraw():
+        app.redraw_graph()
+        root.update()
+
+    for n in counts:
+        plot_times, redraw_times, remove_times = [], [], []
+        for _ in range(repeat):
+            app.clear_graph()
+            plot_times.append(_timed(lambda: plot(n), 1)[0])
+            redraw_times.append(_timed(redraw, 1)[0])
+            remove_times.append(_timed(remove_all, 1)[0])
+        for name, times in (('plot', plot_times), ('redraw', redraw_times),
+                            ('remove', remove_times)):
+            _record(results, f'graph.{name}@{n}',
+                    (min(times), statistics.median(times)), repeat, n if name != 'redraw' else 1)
+
+    def plot_family():
+        app.clear_graph()
+        app.function_entry.delete(0, 'end')
+        app.function_entry.insert(0, GRAPH_FAMILY)
+        app.plot_function()
+        root.update()
+        _check_curves(app, 1)
+
+    _record(results, 'graph.family@200', _timed(plot_family, repeat), repeat)
+    app.clear_graph()
+
+    import numpy as np
+    from calculator_graph import compile_graph_function
+
+    func = compile_graph_function(GRAPH_REPEATED, app.core.angle_mode)
+    x = np.linspace(-10, 10, REPEATED_SAMPLES)
+    _record(results, 'graph.repeated@1e6', _timed(lambda: func(x), repeat), repeat)
+
+
+def bench_history(app, results, sizes):
+    core = app.core
+
+    def item(i):
+        return f"{i}*{i % 97}+{i % 13} = {i * (i % 97) + i % 13}"
+
+    done = 0
+    for size in sizes:
+        window = min(HISTORY_WINDOW, size - done)
+        for i in range(done, size - window):
+            core.add_to_history(item(i))
+        start = time.perf_counter()
+        for i in range(size - window, size):
+            core.add_to_history(item(i))
+        elapsed = time.perf_counter() - start
+        results[f'history.add@{size}'] = {'seconds': elapsed / window, 'min': elapsed / window,
+                                          'repeat': window}
+        done = size
+
+
+def bench_big_numbers(app, results, repeat):
+    core = app.core
+    for text in FACTORIAL_INPUTS:
+        def factorial(text=text):
+            core.clear()
+            core.add_to_expression(text)
+            core.factorial()
+        _record(results, f'factorial@{text}', _timed(factorial, repeat), repeat)
+    for text in CONVERSION_INPUTS:
+        _record(results, f'hex@{text}', _timed(lambda: core.convert_to_hex(text), repeat), repeat)
+        _record(results, f'bin@{text}', _timed(lambda: core.convert_to_bin(text), repeat), repeat)
+
+
+def bench_startup(results, repeat, headless):
+    """Cold start in fresh interpreters: the core alone and the whole GUI"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    programs = {
+        'startup.core_import': "import calculator_core",
+        'startup.app': f"import calculator_bench as b; b.build_app(headless={headless!r})",
+    }
+    for name, program in programs.items():
+        command = [sys.executable, '-c', program]
+        _record(results, name,
+                _timed(lambda: subprocess.run(command, cwd=here, check=True), repeat), repeat)
+
+
+def run_benchmarks(quick=False, headless=None):
+    """Run the suite and return its results document"""
+    if headless is None:
+        headless = not _display_available()
+    repeat = 3 if quick else 7
+    graph_counts = (1, 10) if quick else (1, 10, 50)
+    history_sizes = (10 ** 3, 10 ** 4) if quick else (10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as home:
+        # Keep the benchmark's history out of the user's data directory
+        previous_home = os.environ.get('SCICALC_HOME')
+        os.environ['SCICALC_HOME'] = home
+        try:
+            app, root = build_app(headless)
+            try:
+                bench_evaluate(app, root, results, repeat)
+                bench_graph(app, root, results, repeat, graph_counts)
+                bench_big_numbers(app, results, repeat)
+                bench_history(app, results, history_sizes)
+            finally:
+                app.on_close()
+            bench_startup(results, repeat, headless)
+        finally:
+            if previous_home is None:
+                os.environ.pop('SCICALC_HOME', None)
+            else:
+                os.environ['SCICALC_HOME'] = previous_home
+
+    return {
+        'format': BENCH_FORMAT,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'headless': headless,
+        'quick': quick,
+        'results': results,
+    }
+
+
+# Baselines
+
+def load_results(path):
+    with open(path) as f:
+        document = json.load(f)
+    if document.get('format') != BENCH_FORMAT:
+        raise ValueError(f"{path}: unsupported benchmark format {document.get('format')!r}")
+    return document
+
+
+def save_results(document, path):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+        f.write('\n')
+    os.replace(tmp_path, path)
+
+
+def compare(document, baseline, tolerance=TOLERANCE):
+    """Return [(name, seconds, baseline_seconds or None, ratio or None, regressed)]"""
+    rows = []
+    previous = baseline['results'] if baseline else {}
+    for name, result in document['results'].items():
+        seconds = result['seconds']
+        before = previous.get(name, {}).get('seconds')
+        ratio = seconds / before if before else None
+        rows.append((name, seconds, before, ratio,
+                     ratio is not None and ratio > 1 + tolerance))
+    return rows
+
+
+def _format_seconds(seconds):
+    if seconds is None:
+        return '-'
+    for unit, scale in (('s', 1), ('ms', 1e3), ('us', 1e6)):
+        if seconds * scale >= 1:
+            return f"{seconds * scale:.3g} {unit}"
+    return f"{seconds * 1e9:.3g} ns"
+
+
+def format_report(rows):
+    lines = [f"{'benchmark':32} {'time':>10} {'baseline':>10} {'ratio':>7}"]
+    for name, seconds, before, ratio, regressed in rows:
+        ratio_text = f"{ratio:.2f}" if ratio is not None else '-'
+        flag = '  REGRESSION' if regressed else ''
+        lines.append(f"{name:32} {_format_seconds(seconds):>10} "
+                     f"{_format_seconds(before):>10} {ratio_text:>7}{flag}")
+    return '\n'.join(lines)
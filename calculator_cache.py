@@ -0,0 +1,213 @@
+"""On-disk cache of compiled expressions for the Ultimate Scientific Calculator.
+
+Compiling an expression means parsing, checking it against the whitelist,
+rewriting and generating bytecode; loading the result back is one small
+file read. Each entry is a file named by a hash of its key: the kind of
+entry, the engine version, the interpreter's bytecode tag and the caller's
+key (source text, angle mode, ...). The file holds a magic number, a CRC32
+of the body, then the marshalled key and payload. An entry that fails any
+of those checks is deleted and the caller compiles afresh, so corrupt or
+stale files are rebuilt on their next use.
+
+Loading runs the stored code without the expression whitelist, so entries
+are only trusted from a directory and files that belong to this user and
+that nobody else can write to; otherwise the cache is bypassed.
+
+The directory is bounded in bytes actually allocated on disk. When a store
+takes it past the bound, the least recently used entries are deleted down
+to PRUNE_RATIO of it; loading an entry refreshes its modification time.
+
+Stores are written at once by default. Processes that answer requests can
+defer them until flush(), after the answer has gone out, and batch runs,
+whose expressions rarely repeat, can turn them off.
+"""
+import hashlib
+import marshal
+import os
+import struct
+import sys
+import threading
+import zlib
+
+from calculator_stats import STATS
+
+CACHE_BYTES = 8 << 20
+PRUNE_RATIO = 0.75  # fraction of the bound kept after eviction
+MAGIC = b'SCC1'
+HEADER = struct.Struct('<4sI')  # magic, CRC32 of the body
+BLOCK_SIZE = 4096  # allocation unit assumed where st_blocks is unavailable
+STORE_MODES = ('now', 'deferred', 'off')
+
+
+def _disk_bytes(stat):
+    """Bytes a file occupies on disk, not its length"""
+    blocks = getattr(stat, 'st_blocks', None)
+    if blocks is not None:
+        return blocks * 512
+    return -(-stat.st_size // BLOCK_SIZE) * BLOCK_SIZE
+
+
+def _private(stat):
+    """Whether a file or directory is ours and not writable by anyone else"""
+    if not hasattr(os, 'getuid'):
+        return True  # no POSIX owners; the per-user profile directory protects it
+    return stat.st_uid == os.getuid() and not stat.st_mode & 0o022
+
+
+def cache_bytes():
+    """Configured size bound: SCICALC_CACHE_BYTES, else CACHE_BYTES (0 disables)"""
+    try:
+        return max(int(os.environ.get('SCICALC_CACHE_BYTES', CACHE_BYTES)), 0)
+    except ValueError:
+        return CACHE_BYTES
+
+
+class CompileCache:
+    """Size-bounded directory of marshalled compile results
+
+    Payloads are anything marshal can store: code objects, numbers,
+    strings and tuples of them.
+    """
+
+    def __init__(self, directory, version, max_bytes=CACHE_BYTES, stores='now'):
+        if stores not in STORE_MODES:
+            raise ValueError(f"stores must be one of {', '.join(STORE_MODES)}")
+        self.directory = directory
+        self.version = version
+        self.max_bytes = max_bytes
+        self.stores = stores
+        self._size = None  # bytes on disk, counted on the first store
+        self._trusted = False  # directory checked by _directory_trusted()
+        self._deferred = []
+        self._lock = threading.Lock()
+
+    def _directory_trusted(self):
+        if not self._trusted:
+            try:
+                self._trusted = _private(os.stat(self.directory))
+            except OSError:
+                return False
+        return self._trusted
+
+    def _key(self, kind, parts):
+        key = repr((kind, self.version, sys.implementation.cache_tag) + parts)
+        name = hashlib.sha256(key.encode('utf-8', 'surrogatepass')).hexdigest()
+        return key, os.path.join(self.directory, name[:32])
+
+    def load(self, kind, *parts):
+        """Return the payload stored under (kind, *parts), or None"""
+        if not self.max_bytes:
+            return None
+        key, path = self._key(kind, parts)
+        try:
+            with open(path, 'rb') as f:
+                if not (self._directory_trusted() and _private(os.fstat(f.fileno()))):
+                    STATS.count('compile_cache.untrusted')
+                    return None
+                data = f.read()
+        except OSError:
+            STATS.count('compile_cache.misses')
+            return None
+        try:
+            magic, checksum = HEADER.unpack_from(data)
+            body = data[HEADER.size:]
+            if magic != MAGIC or zlib.crc32(body) != checksum:
+                raise ValueError("Bad header")
+            stored_key, payload = marshal.loads(body)
+        except (ValueError, EOFError, TypeError, struct.error):
+            STATS.count('compile_cache.corrupt')
+            self._remove(path)
+            return None
+        if stored_key != key:  # a hash collision
+            STATS.count('compile_cache.misses')
+            return None
+        STATS.count('compile_cache.hits')
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return payload
+
+    def store(self, kind, payload, *parts):
+        """Save payload under (kind, *parts); failures only cost the cache
+
+        With stores='deferred' the entry is kept until flush().
+        """
+        if not self.max_bytes or self.stores == 'off':
+            return
+        if self.stores == 'deferred':
+            with self._lock:
+                self._deferred.append((kind, payload, parts))
+            return
+        self._write(kind, payload, parts)
+
+    def flush(self):
+        """Write the entries held back by stores='deferred'"""
+        with self._lock:
+            deferred, self._deferred = self._deferred, []
+        for kind, payload, parts in deferred:
+            self._write(kind, payload, parts)
+
+    def _write(self, kind, payload, parts):
+        key, path = self._key(kind, parts)
+        body = marshal.dumps((key, payload))
+        data = HEADER.pack(MAGIC, zlib.crc32(body)) + body
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.directory, mode=0o700, exist_ok=True)
+            fd = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with open(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temporary, path)
+        except OSError:
+            self._remove(temporary)
+            return
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._entries())
+            else:
+                self._size += -(-len(data) // BLOCK_SIZE) * BLOCK_SIZE
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        """(mtime, bytes on disk, path) of every file in the cache directory"""
+        entries = []
+        try:
+            with os.scandir(self.directory) as scan:
+                for entry in scan:
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, _disk_bytes(stat), entry.path))
+        except OSError:
+            pass
+        return entries
+
+    def _evict(self):
+        entries = sorted(self._entries())
+        size = sum(size for _, size, _ in entries)
+        target = self.max_bytes * PRUNE_RATIO
+        for _, entry_size, path in entries:
+            if size <= target:
+                break
+            if self._remove(path):
+                size -= entry_size
+                STATS.count('compile_cache.evictions')
+        self._size = size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def clear(self):
+        with self._lock:
+            self._deferred = []
+            for _, _, path in self._entries():
+                self._remove(path)
+            self._size = 0
@@ -0,0 +1,203 @@
+"""Command-line modes for the Ultimate Scientific Calculator.
+
+Running scientific-calculator.py with arguments dispatches here before any
+GUI module is imported. A plain --repl skips argparse too, to keep the
+terminal prompt's startup short.
+"""
+import os
+import sys
+
+from calculator_core import ANGLE_MODES
+
+
+def positive_int(text):
+    """argparse type: an integer of at least 1"""
+    import argparse
+
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {text!r}") from None
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, not {value}")
+    return value
+
+
+def build_parser():
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog='scientific-calculator.py',
+        description="Ultimate Scientific Calculator. Without arguments the GUI is started.")
+    parser.add_argument('--angle-mode', choices=ANGLE_MODES, default='deg',
+                        help="angle unit for trigonometric functions (default: deg)")
+    parser.add_argument('--exact', action='store_true',
+                        help="always build exact integers, however large, instead of "
+                             "approximating huge results")
+
+    parser.add_argument('--repl', action='store_true',
+                        help="evaluate expressions typed at a terminal prompt")
+
+    batch = parser.add_argument_group('batch evaluation')
+    batch.add_argument('--batch', metavar='FILE', nargs='?', const='-',
+                       help="evaluate one expression per line from FILE (or stdin) "
+                            "and write JSONL results")
+    batch.add_argument('-o', '--output', metavar='FILE', default='-',
+                       help="where to write results, for batch and benchmark runs "
+                            "(default: stdout)")
+    batch.add_argument('--workers', type=positive_int, default=None,
+                       help="number of worker processes (default: CPU count)")
+    batch.add_argument('--chunk-size', type=positive_int, default=None,
+                       help="expressions sent to a worker at a time")
+
+    bench = parser.add_argument_group('benchmarks')
+    bench.add_argument('--bench', action='store_true',
+                       help="run the benchmark suite and write JSON results to --output; "
+                            "a report goes to stderr")
+    bench.add_argument('--quick', action='store_true',
+                       help="use fewer repeats and smaller sizes")
+    bench.add_argument('--headless', action='store_true',
+                       help="stub out Tk even when a display is available")
+    bench.add_argument('--baseline', metavar='FILE',
+                       help="results to compare against (default: bench-baseline.json "
+                            "in the data directory)")
+    bench.add_argument('--save-baseline', action='store_true',
+                       help="store these results as the new baseline")
+    bench.add_argument('--tolerance', type=float, default=None,
+                       help="slowdown ratio above 1 that counts as a regression "
+                            "(default: 0.25)")
+
+    service = parser.add_argument_group('HTTP service')
+    service.add_argument('--serve', action='store_true',
+                         help="answer JSON requests on /evaluate, /batch and /sample")
+    service.add_argument('--host', default='127.0.0.1',
+                         help="address to listen on (default: 127.0.0.1)")
+    service.add_argument('--port', type=int, default=8765,
+                         help="port to listen on (default: 8765)")
+    service.add_argument('--timeout', type=float, default=10.0,
+                         help="seconds a request may take (default: 10)")
+    return parser
+
+
+def _open(path, mode):
+    if path == '-':
+        return sys.stdin if 'r' in mode else sys.stdout
+    return open(path, mode)
+
+
+def run_batch_mode(args):
+    from calculator_batch import CHUNK_SIZE, run_batch
+
+    infile = _open(args.batch, 'r')
+    outfile = _open(args.output, 'w')
+    try:
+        run_batch(infile, outfile, args.angle_mode, args.workers,
+                  args.chunk_size or CHUNK_SIZE, args.exact)
+    except BrokenPipeError:  # output closed early, e.g. piped into head
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    finally:
+        if infile is not sys.stdin:
+            infile.close()
+        if outfile is not sys.stdout:
+            outfile.close()
+    return 0
+
+
+def run_bench_mode(args):
+    from calculator_bench import (TOLERANCE, BenchmarkError, compare, format_report,
+                                  load_results, run_benchmarks, save_results)
+    import json
+
+    from calculator_core import data_dir
+
+    baseline_path = args.baseline or os.path.join(data_dir(), 'bench-baseline.json')
+    try:
+        baseline = load_results(baseline_path)
+    except FileNotFoundError:
+        baseline = None
+    except (OSError, ValueError) as e:
+        print(f"Ignoring baseline: {e}", file=sys.stderr)
+        baseline = None
+
+    try:
+        document = run_benchmarks(args.quick, True if args.headless else None)
+    except BenchmarkError as e:
+        print(f"Benchmark failed: {e}", file=sys.stderr)
+        return 1
+    rows = compare(document, baseline, TOLERANCE if args.tolerance is None else args.tolerance)
+    print(format_report(rows), file=sys.stderr)
+
+    outfile = _open(args.output, 'w')
+    try:
+        json.dump(document, outfile, indent=2, sort_keys=True)
+        outfile.write('\n')
+    finally:
+        if outfile is not sys.stdout:
+            outfile.close()
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(baseline_path)), exist_ok=True)
+        save_results(document, baseline_path)
+        print(f"Baseline saved to {baseline_path}", file=sys.stderr)
+    elif baseline is None:
+        print("No baseline to compare against; rerun with --save-baseline to store one",
+              file=sys.stderr)
+    return 1 if any(row[-1] for row in rows) else 0
+
+
+def run_repl_mode(args):
+    from calculator_repl import run_repl
+
+    return run_repl(args.angle_mode, args.exact)
+
+
+def run_serve_mode(args):
+    from calculator_server import serve
+
+    serve(args.host, args.port, args.workers, args.timeout)
+    return 0
+
+
+def quick_repl_args(argv):
+    """(angle_mode, exact) if argv only asks for --repl, else None
+
+    Anything else, including --help, abbreviations and mistakes, is left to
+    the full parser.
+    """
+    repl, angle_mode, exact = False, 'deg', False
+    args = iter(argv)
+    for arg in args:
+        if arg == '--repl':
+            repl = True
+        elif arg == '--exact':
+            exact = True
+        elif arg == '--angle-mode':
+            angle_mode = next(args, None)
+        elif arg.startswith('--angle-mode='):
+            angle_mode = arg.partition('=')[2]
+        else:
+            return None
+        if angle_mode not in ANGLE_MODES:
+            return None
+    return (angle_mode, exact) if repl else None
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    quick = quick_repl_args(argv)
+    if quick is not None:
+        from calculator_repl import run_repl
+
+        return run_repl(*quick)
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.repl:
+        return run_repl_mode(args)
+    if args.batch is not None:
+        return run_batch_mode(args)
+    if args.bench:
+        return run_bench_mode(args)
+    if args.serve:
+        return run_serve_mode(args)
+    parser.error("no command-line mode selected")
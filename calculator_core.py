@@ -0,0 +1,1294 @@
+"""Headless calculator core for the Ultimate Scientific Calculator.
+
+Holds the expression engine, memory, number formatting, base conversion and
+history logic. Importing this module pulls in no GUI toolkit; NumPy is only
+imported when an expression refers to 'np'.
+"""
+import ast
+import importlib
+import math
+import operator
+import os
+import re
+from collections import deque
+from functools import lru_cache
+from types import SimpleNamespace
+
+from calculator_memory import MemoryBank
+from calculator_stats import STATS
+
+# Expression engine
+#
+# Expressions are parsed once into a Python AST, checked against a whitelist
+# of node types and names, compiled to a code object and cached per
+# (expression, angle_mode). Angle handling lives in the evaluation namespace
+# rather than in string rewrites, so 'sin(' never clobbers 'asin('. Compiled
+# code also goes to an on-disk cache (calculator_cache), so later sessions
+# skip compilation for expressions they have seen before.
+
+ENGINE_VERSION = 2  # bump whenever compiled code or its payload changes meaning
+EXPRESSION_CACHE_SIZE = 1024
+HISTORY_LIMIT = 100
+DISPLAY_DIGITS = 1000  # longer integer results are shown as mantissa/exponent
+EXACT_DIGIT_LIMIT = 100000  # costlier integer work is done in log space
+
+ANGLE_MODES = ('deg', 'rad')
+ANGLE_FUNCTIONS = ('sin', 'cos', 'tan')
+INVERSE_ANGLE_FUNCTIONS = ('asin', 'acos', 'atan')
+
+# NumPy attributes reachable through 'np.' in calculator expressions
+NUMPY_ATTRIBUTES = frozenset({
+    'sin', 'cos', 'tan', 'arcsin', 'arccos', 'arctan', 'sinh', 'cosh', 'tanh',
+    'exp', 'log', 'log10', 'log2', 'sqrt', 'abs', 'floor', 'ceil', 'round',
+    'deg2rad', 'rad2deg', 'pi', 'e', 'sum', 'mean', 'min', 'max', 'prod',
+})
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Constant, ast.Name, ast.Load,
+    ast.Call, ast.Attribute, ast.List,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
+    ast.USub, ast.UAdd,
+)
+
+_MOD_RE = re.compile(r'(?<![A-Za-z_])mod(?![A-Za-z_])')
+
+# A pasted list of numbers: separated by commas, semicolons or line breaks
+_NUMBER = r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?'
+_COLUMN_RE = re.compile(rf'\s*{_NUMBER}(?:\s*[,;\s]\s*{_NUMBER})+\s*[,;]?\s*')
+_NUMBER_RE = re.compile(_NUMBER)
+
+
+def data_dir():
+    """Per-user directory for history, memory and cache files
+
+    Defaults to ~/.scientific-calculator; override with SCICALC_HOME.
+    """
+    return os.environ.get('SCICALC_HOME') or os.path.join(
+        os.path.expanduser('~'), '.scientific-calculator')
+
+
+_COMPILE_CACHES = {}
+_CACHE_STORES = 'now'  # see set_compile_cache_stores()
+
+
+def compile_cache():
+    """The on-disk compile cache under the current data directory"""
+    from calculator_cache import CompileCache, cache_bytes  # hashlib etc. on first compile
+
+    directory = os.path.join(data_dir(), 'cache')
+    cache = _COMPILE_CACHES.get(directory)
+    if cache is None:
+        cache = _COMPILE_CACHES[directory] = CompileCache(directory, ENGINE_VERSION,
+                                                          cache_bytes(), _CACHE_STORES)
+    return cache
+
+
+def set_compile_cache_stores(stores):
+    """Choose when compile results reach the disk cache; return the previous choice
+
+    'now' writes them as they are compiled, 'deferred' holds them until
+    flush_compile_cache(), 'off' only reads the cache.
+    """
+    global _CACHE_STORES
+    from calculator_cache import STORE_MODES
+
+    if stores not in STORE_MODES:
+        raise ValueError(f"stores must be one of {', '.join(STORE_MODES)}")
+    previous, _CACHE_STORES = _CACHE_STORES, stores
+    for cache in _COMPILE_CACHES.values():
+        cache.flush()
+        cache.stores = stores
+    return previous
+
+
+def flush_compile_cache():
+    """Write compile results held back by set_compile_cache_stores('deferred')"""
+    for cache in _COMPILE_CACHES.values():
+        cache.flush()
+
+
+class ExpressionError(ValueError):
+    """Raised when an expression cannot be parsed or uses disallowed syntax"""
+
+
+def _load_numpy():
+    """Import NumPy on first use so the core stays cheap to import"""
+    return importlib.import_module('numpy')
+
+
+def _degree_trig(func):
+    return lambda x: func(math.radians(x))
+
+
+def _degree_inverse(func):
+    return lambda x: math.degrees(func(x))
+
+
+# Modular arithmetic
+#
+# 'a ** b % m' is compiled to a call of _power_mod, which uses three-argument
+# pow() instead of building a ** b. In modular mode (a modulus passed to
+# compile_expression) every operation is reduced modulo m as it happens and
+# division multiplies by the modular inverse.
+
+def _power_mod(base, exponent, modulus):
+    """a ** b % m, without building a ** b when all three are integers"""
+    if isinstance(base, int) and isinstance(exponent, int) and isinstance(modulus, int) \
+            and exponent >= 0:
+        if modulus == 0:
+            raise ZeroDivisionError("integer division or modulo by zero")
+        return pow(base, exponent, modulus)
+    return base ** exponent % modulus
+
+
+def _modular_int(value):
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if not isinstance(value, int):
+        raise ValueError(f"Modular arithmetic needs integers, not {value!r}")
+    return value
+
+
+def _modular_power(base, exponent, modulus):
+    """a ** b mod m; negative exponents use the modular inverse"""
+    return pow(_modular_int(base), _modular_int(exponent), modulus)
+
+
+def _modular_divide(a, b, modulus):
+    return _modular_int(a) * modinv(_modular_int(b), modulus) % modulus
+
+
+def modinv(a, m):
+    """Inverse of a modulo m"""
+    try:
+        return pow(a, -1, m)
+    except ValueError:
+        raise ValueError(f"{a} has no inverse modulo {m}") from None
+
+
+def lcm(*values):
+    """Least common multiple of integers"""
+    result = 1
+    for value in values:
+        result = result * value // math.gcd(result, value) if value else 0
+    return abs(result)
+
+
+def crt(*pairs):
+    """Chinese remainder theorem: crt(r1, m1, r2, m2, ...)
+
+    Returns the smallest x >= 0 with x = r_i (mod m_i) for every pair; the
+    moduli need not be coprime. Raises ValueError when there is no solution.
+    """
+    if not pairs or len(pairs) % 2:
+        raise ValueError("crt takes residue, modulus pairs")
+    x, m = 0, 1
+    for r, n in zip(pairs[::2], pairs[1::2]):
+        if not isinstance(n, int) or n < 1:
+            raise ValueError(f"crt moduli must be integers >= 1, not {n!r}")
+        if not isinstance(r, int):
+            raise ValueError(f"crt residues must be integers, not {r!r}")
+        g = math.gcd(m, n)
+        if (r - x) % g:
+            raise ValueError("crt: the congruences have no common solution")
+        step = n // g
+        t = (r - x) // g * pow(m // g, -1, step) % step if step > 1 else 0
+        x += m * t
+        m *= step
+        x %= m
+    return x
+
+
+def _build_namespace(angle_mode):
+    """Build the evaluation namespace for the given angle mode"""
+    functions = {name: getattr(math, name) for name in dir(math)
+                 if not name.startswith('_')}
+    if angle_mode == 'deg':
+        for name in ANGLE_FUNCTIONS:
+            functions[name] = _degree_trig(getattr(math, name))
+        for name in INVERSE_ANGLE_FUNCTIONS:
+            functions[name] = _degree_inverse(getattr(math, name))
+
+    # 'math.' keeps Python's meaning (math.log is natural log), bare names
+    # follow the calculator buttons (log is base 10, ln is natural)
+    namespace = dict(functions)
+    namespace['math'] = SimpleNamespace(ln=math.log, **functions)
+    namespace.update({'log': math.log10, 'ln': math.log, 'abs': abs,
+                      'round': round, 'min': min, 'max': max,
+                      'modinv': modinv, 'lcm': lcm, 'crt': crt})
+    # Targets of the modular rewrites; user input cannot name them
+    namespace.update({'_power_mod': _power_mod, '_modular_power': _modular_power,
+                      '_modular_divide': _modular_divide})
+    namespace['__builtins__'] = {}
+    return namespace
+
+
+_NAMESPACES = {mode: _build_namespace(mode) for mode in ANGLE_MODES}
+_NUMPY_NAMESPACES = {}
+
+
+def _namespace_for(angle_mode, uses_numpy):
+    if not uses_numpy:
+        return _NAMESPACES[angle_mode]
+    namespace = _NUMPY_NAMESPACES.get(angle_mode)
+    if namespace is None:
+        namespace = dict(_NAMESPACES[angle_mode], np=_load_numpy())
+        _NUMPY_NAMESPACES[angle_mode] = namespace
+    return namespace
+
+
+def column_to_list(text):
+    """'1, 2, 3' or a pasted column of numbers as a list literal, else None"""
+    if not _COLUMN_RE.fullmatch(text) or not any(c in text for c in ',;\n\t'):
+        return None
+    return '[' + ', '.join(_NUMBER_RE.findall(text)) + ']'
+
+
+# Arrays
+#
+# List literals ([1, 2, 3], or a pasted column of numbers) and the array
+# functions below switch an expression to a NumPy namespace in which every
+# calculator function works elementwise, so a whole range of inputs is
+# evaluated in one pass.
+
+ARRAY_FUNCTIONS = ('range', 'linspace', 'sum', 'mean')
+SUMMARY_ELEMENTS = 3  # elements shown at each end of an array summary
+MAX_ARRAY_ELEMENTS = 10 ** 7
+_ARRAY_NAMESPACES = {}
+
+
+def _check_array_size(count):
+    if count > MAX_ARRAY_ELEMENTS:
+        raise ValueError(f"Arrays are limited to {MAX_ARRAY_ELEMENTS} elements")
+
+
+def _array_range(start, stop=None, step=1):
+    """range() with float steps: range(0, 360, 0.01)"""
+    np = _load_numpy()
+    if stop is None:
+        start, stop = 0, start
+    if step == 0:
+        raise ValueError("range() step must not be zero")
+    _check_array_size(math.ceil((stop - start) / step))
+    return np.arange(start, stop, step, dtype=float)
+
+
+def _array_linspace(start, stop, num=50):
+    _check_array_size(num)
+    return _load_numpy().linspace(start, stop, num)
+
+
+def _array_literal(values):
+    return _load_numpy().array(values, dtype=float)
+
+
+def _elementwise(func):
+    """Apply a scalar function per element; whole floats pass as ints"""
+    def function(*args):
+        return func(*[int(arg) if isinstance(arg, float) and arg.is_integer() else arg
+                      for arg in args])
+    return _load_numpy().vectorize(function, otypes=[float])
+
+
+def _array_reduction(reduce, combine):
+    """min/max: reduce one array, combine several arguments elementwise"""
+    def function(*args):
+        if len(args) == 1:
+            return reduce(args[0])
+        result = args[0]
+        for arg in args[1:]:
+            result = combine(result, arg)
+        return result
+    return function
+
+
+def _build_array_namespace(angle_mode):
+    """Calculator namespace with NumPy's elementwise functions"""
+    np = _load_numpy()
+    functions = {
+        'sin': np.sin, 'cos': np.cos, 'tan': np.tan,
+        'asin': np.arcsin, 'acos': np.arccos, 'atan': np.arctan, 'atan2': np.arctan2,
+        'sinh': np.sinh, 'cosh': np.cosh, 'tanh': np.tanh,
+        'asinh': np.arcsinh, 'acosh': np.arccosh, 'atanh': np.arctanh,
+        'sqrt': np.sqrt, 'exp': np.exp, 'expm1': np.expm1, 'log1p': np.log1p,
+        'log10': np.log10, 'log2': np.log2, 'fabs': np.abs, 'hypot': np.hypot,
+        'floor': np.floor, 'ceil': np.ceil, 'trunc': np.trunc,
+        'degrees': np.rad2deg, 'radians': np.deg2rad,
+    }
+    if angle_mode == 'deg':
+        for name in ANGLE_FUNCTIONS:
+            functions[name] = (lambda func: lambda x: func(np.deg2rad(x)))(functions[name])
+        for name in INVERSE_ANGLE_FUNCTIONS + ('atan2',):
+            functions[name] = (lambda func: lambda *x: np.rad2deg(func(*x)))(functions[name])
+
+    # Scalar-only functions such as factorial or gcd are applied per element
+    scalar = _NAMESPACES[angle_mode]
+    vectorized = {name: _elementwise(value) for name, value in vars(scalar['math']).items()
+                  if callable(value) and name not in functions}
+    vectorized.update(functions)
+    namespace = dict(scalar, **vectorized)
+    for name in ('modinv', 'lcm', 'crt'):
+        namespace[name] = _elementwise(scalar[name])
+    math_functions = dict(vars(scalar['math']), **vectorized)
+    math_functions.update(log=np.log, ln=np.log)  # math.log stays natural
+    namespace['math'] = SimpleNamespace(**math_functions)
+    namespace.update({
+        'log': np.log10, 'ln': np.log, 'abs': np.abs, 'round': np.round,
+        'min': _array_reduction(np.min, np.minimum), 'max': _array_reduction(np.max, np.maximum),
+        'range': _array_range, 'linspace': _array_linspace, 'sum': np.sum, 'mean': np.mean,
+        '_array': _array_literal, 'np': np,
+    })
+    return namespace
+
+
+def _array_namespace(angle_mode):
+    namespace = _ARRAY_NAMESPACES.get(angle_mode)
+    if namespace is None:
+        namespace = _ARRAY_NAMESPACES[angle_mode] = _build_array_namespace(angle_mode)
+    return namespace
+
+
+def _uses_arrays(tree):
+    return any(isinstance(node, ast.List)
+               or (isinstance(node, ast.Name) and node.id in ARRAY_FUNCTIONS)
+               for node in ast.walk(tree))
+
+
+class _ArrayLiteralRewriter(ast.NodeTransformer):
+    """Turn list literals into float arrays so arithmetic is elementwise"""
+
+    def visit_List(self, node):
+        self.generic_visit(node)
+        return ast.copy_location(_helper_call('_array', [node]), node)
+
+
+def is_array(value):
+    """True for NumPy array results (checked without importing NumPy)"""
+    return getattr(value, 'ndim', 0) > 0
+
+
+def _short(value):
+    return f"{value:.6g}" if isinstance(value, float) else str(value)
+
+
+def summarize_array(values):
+    """One-line summary of an array result: length, range, mean and ends"""
+    np = _load_numpy()
+    flat = np.ravel(values)
+    n = flat.size
+    if n <= 2 * SUMMARY_ELEMENTS:
+        elements = ', '.join(_short(v) for v in flat.tolist())
+    else:
+        head = ', '.join(_short(v) for v in flat[:SUMMARY_ELEMENTS].tolist())
+        tail = ', '.join(_short(v) for v in flat[-SUMMARY_ELEMENTS:].tolist())
+        elements = f"{head}, …, {tail}"
+    parts = [f"n={n}"]
+    if n and np.isrealobj(flat):
+        finite = flat[np.isfinite(flat)]
+        if finite.size:
+            parts.append(f"min={_short(float(finite.min()))}")
+            parts.append(f"max={_short(float(finite.max()))}")
+            parts.append(f"mean={_short(float(finite.mean()))}")
+        if finite.size < n:
+            parts.append(f"non-finite={n - finite.size}")
+    if values.ndim > 1:
+        parts.insert(0, 'shape=' + '×'.join(map(str, values.shape)))
+    return f"[{elements}]  " + '  '.join(parts)
+
+
+def normalize_expression(expression):
+    """Rewrite calculator notation into Python syntax and balance parentheses"""
+    expression = column_to_list(expression) or expression
+    expression = ' '.join(expression.split())
+    expression = expression.replace('^', '**').replace('π', 'pi')
+    expression = _MOD_RE.sub('%', expression)
+
+    # Add closing parentheses for functions that might be missing them
+    missing = expression.count('(') - expression.count(')')
+    if missing > 0:
+        expression += ')' * missing
+    return expression
+
+
+def _check_node(node, namespace, local_names=()):
+    """Reject any AST node outside the calculator whitelist"""
+    if not isinstance(node, _ALLOWED_NODES):
+        raise ExpressionError(f"Unsupported syntax: {type(node).__name__}")
+    if isinstance(node, ast.Constant):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float, complex)):
+            raise ExpressionError(f"Unsupported constant: {node.value!r}")
+    elif isinstance(node, ast.Name):
+        known = node.id in namespace or node.id in local_names or node.id == 'np'
+        if node.id.startswith('_') or not known:
+            raise ExpressionError(f"Unknown name: {node.id}")
+    elif isinstance(node, ast.Attribute):
+        owner = node.value
+        if not isinstance(owner, ast.Name) or owner.id not in ('math', 'np'):
+            raise ExpressionError("Attribute access is only allowed on math and np")
+        if owner.id == 'math':
+            allowed = not node.attr.startswith('_') and hasattr(namespace['math'], node.attr)
+        else:
+            allowed = node.attr in NUMPY_ATTRIBUTES
+        if not allowed:
+            raise ExpressionError(f"Unknown name: {owner.id}.{node.attr}")
+    elif isinstance(node, ast.Call):
+        if node.keywords:
+            raise ExpressionError("Keyword arguments are not supported")
+        if not isinstance(node.func, (ast.Name, ast.Attribute)):
+            raise ExpressionError("Only named functions can be called")
+    for child in ast.iter_child_nodes(node):
+        _check_node(child, namespace, local_names)
+
+
+def parse_expression(expression, namespace, local_names=()):
+    """Normalize, parse and validate an expression; return its AST
+
+    Names must come from namespace or local_names (variables supplied at
+    evaluation time, such as 'x' for graph functions).
+    """
+    source = normalize_expression(expression)
+    try:
+        tree = ast.parse(source, mode='eval')
+    except SyntaxError as e:
+        raise ExpressionError(f"Invalid expression: {e.msg}") from None
+    _check_node(tree, namespace, local_names)
+    return tree
+
+
+def _helper_call(name, args):
+    return ast.Call(func=ast.Name(id=name, ctx=ast.Load()), args=args, keywords=[])
+
+
+class _PowerModRewriter(ast.NodeTransformer):
+    """Rewrite 'a ** b % m' as _power_mod(a, b, m)"""
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        left = node.left
+        if isinstance(node.op, ast.Mod) and isinstance(left, ast.BinOp) \
+                and isinstance(left.op, ast.Pow):
+            return ast.copy_location(
+                _helper_call('_power_mod', [left.left, left.right, node.right]), node)
+        return node
+
+
+class _ModularRewriter(ast.NodeTransformer):
+    """Reduce every operation modulo a fixed modulus"""
+
+    def __init__(self, modulus):
+        self.modulus = modulus
+
+    def visit_Expression(self, node):
+        self.generic_visit(node)
+        node.body = self._reduce(node.body)
+        return node
+
+    def visit_BinOp(self, node):
+        modulus = ast.Constant(value=self.modulus)
+        if isinstance(node.op, ast.Pow):
+            # Exponents are not residues, so they keep ordinary arithmetic
+            base = self.visit(node.left)
+            exponent = _PowerModRewriter().visit(node.right)
+            return _helper_call('_modular_power', [base, exponent, modulus])
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Div):
+            return _helper_call('_modular_divide', [node.left, node.right, modulus])
+        if isinstance(node.op, ast.Mod):
+            return node
+        return self._reduce(node)
+
+    def _reduce(self, node):
+        return ast.BinOp(left=node, op=ast.Mod(), right=ast.Constant(value=self.modulus))
+
+
+def _uses_numpy(tree):
+    return any(isinstance(node, ast.Name) and node.id == 'np'
+               for node in ast.walk(tree))
+
+
+class CompiledExpression:
+    """A parsed, validated and compiled calculator expression
+
+    `cost` is the estimated number of digits of the largest integer the
+    expression builds (see estimate_digits). Array expressions return NaN
+    for elements outside a function's domain instead of raising. Entries
+    loaded from the disk cache have no tree until approximate() needs one.
+    """
+
+    __slots__ = ('source', 'angle_mode', 'code', 'namespace', 'tree', 'cost', 'uses_arrays',
+                 'modulus')
+
+    def __init__(self, source, angle_mode, code, namespace, tree, cost, uses_arrays=False,
+                 modulus=None):
+        self.source = source
+        self.angle_mode = angle_mode
+        self.code = code
+        self.namespace = namespace
+        self.tree = tree
+        self.cost = cost
+        self.uses_arrays = uses_arrays
+        self.modulus = modulus
+
+    def __call__(self):
+        if self.uses_arrays:
+            with _load_numpy().errstate(all='ignore'):
+                return eval(self.code, self.namespace)
+        return eval(self.code, self.namespace)
+
+    def approximate(self):
+        """Evaluate with oversized intermediate results kept in log space"""
+        if self.tree is None:
+            self.tree = _build_tree(self.source, self.angle_mode, self.modulus)[0]
+        return _settle(_approximate(self.tree, self.namespace))
+
+
+def _build_tree(expression, angle_mode, modulus):
+    """Parse expression and apply the array and modular rewrites; return (tree, uses_arrays)"""
+    with STATS.time('compile.parse'):
+        tree = parse_expression(expression, _NAMESPACES[angle_mode], ARRAY_FUNCTIONS)
+    with STATS.time('compile.codegen'):
+        uses_arrays = _uses_arrays(tree)
+        if uses_arrays:
+            tree = _ArrayLiteralRewriter().visit(tree)
+        if modulus is None:
+            tree = _PowerModRewriter().visit(tree)
+        else:
+            tree = _ModularRewriter(modulus).visit(tree)
+    return ast.fix_missing_locations(tree), uses_arrays
+
+
+def _expression_namespace(angle_mode, uses_arrays, uses_numpy):
+    if uses_arrays:
+        return _array_namespace(angle_mode)
+    return _namespace_for(angle_mode, uses_numpy)
+
+
+@lru_cache(maxsize=EXPRESSION_CACHE_SIZE)
+def _compile_cached(expression, angle_mode, modulus):
+    source = normalize_expression(expression)
+    cache = compile_cache()
+    entry = cache.load('expression', expression, angle_mode, modulus)
+    if entry is not None:
+        code, cost, uses_arrays, uses_numpy = entry
+        namespace = _expression_namespace(angle_mode, uses_arrays, uses_numpy)
+        return CompiledExpression(source, angle_mode, code, namespace, None, cost,
+                                  uses_arrays, modulus)
+
+    tree, uses_arrays = _build_tree(expression, angle_mode, modulus)
+    with STATS.time('compile.codegen'):
+        uses_numpy = _uses_numpy(tree)
+        namespace = _expression_namespace(angle_mode, uses_arrays, uses_numpy)
+        code = compile(tree, '<expression>', 'eval')
+        cost = estimate_digits(tree)
+    cache.store('expression', (code, cost, uses_arrays, uses_numpy),
+                expression, angle_mode, modulus)
+    return CompiledExpression(source, angle_mode, code, namespace, tree, cost,
+                              uses_arrays, modulus)
+
+
+def check_modulus(modulus):
+    """Validate a modular-mode modulus (None means ordinary arithmetic)"""
+    if modulus is not None and (not isinstance(modulus, int) or modulus < 2):
+        raise ValueError(f"Modulus must be an integer >= 2, not {modulus!r}")
+    return modulus
+
+
+def compile_expression(expression, angle_mode='deg', modulus=None):
+    """Return the cached compiled form of expression for angle_mode
+
+    With a modulus, the expression is compiled for modular arithmetic.
+    """
+    if angle_mode not in ANGLE_MODES:
+        raise ValueError(f"Unknown angle mode: {angle_mode}")
+    expression = column_to_list(expression) or ' '.join(expression.split())
+    return _compile_cached(expression, angle_mode, check_modulus(modulus))
+
+
+def evaluate_expression(expression, angle_mode='deg', exact=False, modulus=None):
+    """Evaluate a calculator expression and return the result
+
+    Expressions estimated to build integers of more than EXACT_DIGIT_LIMIT
+    digits, or whose floats overflow, are evaluated approximately and may
+    return a LogNumber, unless exact is true.
+    """
+    with STATS.time('evaluate.compile'):
+        compiled = compile_expression(expression, angle_mode, modulus)
+    with STATS.time('evaluate.eval'):
+        if exact:
+            return compiled()
+        if compiled.cost > EXACT_DIGIT_LIMIT:
+            STATS.count('evaluate.approximate')
+            return compiled.approximate()
+        try:
+            return compiled()
+        except OverflowError:  # float overflow, e.g. exp(1000)
+            STATS.count('evaluate.approximate')
+            return compiled.approximate()
+
+
+# Number formatting and base conversion
+
+def format_number(value, number_format='normal'):
+    """Format a number for the display in 'normal' or 'scientific' notation"""
+    if number_format == 'scientific':
+        return "{:.4e}".format(value)
+    return str(value)
+
+
+def to_hex(value):
+    """Convert a display value to a hexadecimal string"""
+    return hex(int(float(value)))
+
+
+def to_bin(value):
+    """Convert a display value to a binary string"""
+    return bin(int(float(value)))
+
+
+# Big numbers
+#
+# Integers with more than DISPLAY_DIGITS digits are shown as leading digits
+# and an exponent computed from their logarithm (lgamma for factorials), so
+# no exact value has to exist. Exact digits are produced on request with
+# decimal arithmetic, whose large multiplications are subquadratic, which
+# also sidesteps Python's int-to-str digit limit.
+
+def _significant_digits(log10_value):
+    """Digits of a mantissa that a double-precision log10 still pins down"""
+    return max(3, min(12, 14 - len(str(int(abs(log10_value))))))
+
+
+def _scientific_from_log10(log10_value, negative=False):
+    exponent = math.floor(log10_value)
+    digits = _significant_digits(log10_value)
+    mantissa = round(10 ** (log10_value - exponent), digits - 1)
+    if mantissa >= 10:
+        mantissa /= 10
+        exponent += 1
+    return f"{'-' if negative else ''}{mantissa:.{digits - 1}f}e{exponent:+d}"
+
+
+def log10_factorial(n):
+    return math.lgamma(n + 1) / math.log(10)
+
+
+def approximate_factorial(n):
+    """n! as leading digits and exponent, without computing n!"""
+    return _scientific_from_log10(log10_factorial(n))
+
+
+def approximate_int(n):
+    """A big integer as leading digits and exponent"""
+    return _scientific_from_log10(math.log10(abs(n)), n < 0)
+
+
+def is_big_int(value, digits=DISPLAY_DIGITS):
+    """True for integers too long to show digit by digit"""
+    return (isinstance(value, int) and not isinstance(value, bool)
+            and value.bit_length() * 0.30103 > digits)
+
+
+def is_approximate(value):
+    """True for results shown as leading digits and an exponent"""
+    return isinstance(value, LogNumber) or is_big_int(value)
+
+
+def format_result(value):
+    """Display text for an evaluation result"""
+    if is_big_int(value):
+        return approximate_int(value)
+    if is_array(value):
+        return summarize_array(value)
+    return str(value)
+
+
+def _exact_context():
+    import decimal
+    return decimal.Context(prec=decimal.MAX_PREC, Emax=decimal.MAX_EMAX,
+                           Emin=decimal.MIN_EMIN, traps=[decimal.Inexact])
+
+
+_SMALL_BITS = 4096  # below this Decimal(int) is cheap and within str limits
+
+
+def int_to_digits(n):
+    """Exact decimal digits of any integer in subquadratic time"""
+    import decimal
+    powers = {}
+
+    def power_of_two(bits):
+        if bits not in powers:
+            powers[bits] = decimal.Decimal(2) ** bits
+        return powers[bits]
+
+    def convert(value, bits):
+        if bits <= _SMALL_BITS:
+            return decimal.Decimal(value)
+        half = 1 << ((bits - 1).bit_length() - 1)
+        high, low = value >> half, value & ((1 << half) - 1)
+        return convert(high, bits - half) * power_of_two(half) + convert(low, half)
+
+    with decimal.localcontext(_exact_context()):
+        digits = str(convert(abs(n), n.bit_length()))
+    return '-' + digits if n < 0 else digits
+
+
+def factorial_digits(n):
+    """Exact decimal digits of n! via a product tree in decimal arithmetic"""
+    import decimal
+
+    def product(low, high):
+        if high - low < 64:
+            result = 1
+            for k in range(low, high + 1):
+                result *= k
+            return decimal.Decimal(result)
+        mid = (low + high) // 2
+        return product(low, mid) * product(mid + 1, high)
+
+    if n < 2:
+        return '1'
+    with decimal.localcontext(_exact_context()):
+        return str(product(2, n))
+
+
+def exact_digits(request):
+    """Digits for an exact request as recorded by CalculatorCore"""
+    kind, value = request
+    if kind == 'factorial':
+        return factorial_digits(value)
+    if kind == 'expression':
+        expression, angle_mode = value
+        value = evaluate_expression(expression, angle_mode, exact=True)
+        if not isinstance(value, int):
+            return str(value)
+    return int_to_digits(value)
+
+
+# Cost model
+#
+# Before an expression runs, its AST is walked once to bound the number of
+# decimal digits of every integer it would build: a ** b has about
+# digits(a) * b digits, a * b about digits(a) + digits(b), n! about
+# log10(n!). When the largest bound exceeds EXACT_DIGIT_LIMIT the same AST
+# is interpreted instead, doing each operation exactly while that is cheap
+# and otherwise in log space with LogNumber, so a single keystroke can no
+# longer ask for an integer with billions of digits.
+
+_LOG10_2 = math.log10(2)
+_LN10 = math.log(10)
+_MAX_LOG10 = 300  # LogNumbers inside this range settle back into floats
+
+_OPERATORS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+    ast.Div: operator.truediv, ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod, ast.Pow: operator.pow,
+}
+
+
+def _int_digits(value):
+    return value.bit_length() * _LOG10_2
+
+
+def _power_digits(base_digits, exponent_digits):
+    """Digits of a ** b from the digits of a and b"""
+    if base_digits == 0:
+        return 0.0
+    if exponent_digits > _MAX_LOG10:
+        return math.inf
+    return base_digits * 10.0 ** exponent_digits
+
+
+def _factorial_digits(n_digits):
+    """Digits of n! for n with the given number of digits"""
+    try:
+        return log10_factorial(10.0 ** n_digits)
+    except OverflowError:
+        return math.inf
+
+
+def _call_name(node):
+    return node.func.id if isinstance(node.func, ast.Name) else node.func.attr
+
+
+def _estimate(node, largest):
+    """Digit bound of an integer-valued node, or None for other values
+
+    The largest bound seen anywhere in the tree is kept in largest[0].
+    """
+    digits = None
+    if isinstance(node, ast.Expression):
+        return _estimate(node.body, largest)
+    if isinstance(node, ast.Constant):
+        if isinstance(node.value, int):
+            digits = _int_digits(node.value)
+    elif isinstance(node, ast.UnaryOp):
+        digits = _estimate(node.operand, largest)
+    elif isinstance(node, ast.BinOp):
+        left = _estimate(node.left, largest)
+        right = _estimate(node.right, largest)
+        if left is not None and right is not None:
+            op = node.op
+            if isinstance(op, ast.Pow):
+                digits = _power_digits(left, right)
+            elif isinstance(op, ast.Mult):
+                digits = left + right
+            elif isinstance(op, (ast.Add, ast.Sub)):
+                digits = max(left, right) + _LOG10_2
+            elif isinstance(op, ast.FloorDiv):
+                digits = left
+            elif isinstance(op, ast.Mod):
+                digits = right
+    elif isinstance(node, ast.Call):
+        args = [_estimate(arg, largest) for arg in node.args]
+        name = _call_name(node)
+        if name in ('_power_mod', '_modular_power', '_modular_divide'):
+            digits = args[2]
+        elif len(args) == 1 and args[0] is not None:
+            if name == 'factorial':
+                digits = _factorial_digits(args[0])
+            elif name == 'abs':
+                digits = args[0]
+    if digits is not None:
+        largest[0] = max(largest[0], digits)
+    return digits
+
+
+def estimate_digits(tree):
+    """Upper bound on the decimal digits of the largest integer tree builds"""
+    largest = [0.0]
+    _estimate(tree, largest)
+    return largest[0]
+
+
+class LogNumber:
+    """A real number stored as its sign and the log10 of its magnitude
+
+    Stands in for results too large to build exactly; str() gives the
+    leading digits and the exponent.
+    """
+
+    __slots__ = ('sign', 'log10')
+
+    def __init__(self, sign, log10):
+        self.sign = sign
+        self.log10 = log10
+
+    @classmethod
+    def from_value(cls, value):
+        if isinstance(value, LogNumber):
+            return value
+        if value == 0:
+            return cls(0, -math.inf)
+        return cls(1 if value > 0 else -1, math.log10(abs(value)))
+
+    def __float__(self):
+        if self.log10 > 308.25:
+            raise OverflowError("Result too large")
+        return self.sign * 10.0 ** self.log10
+
+    def __repr__(self):
+        return f"LogNumber({self.sign}, {self.log10!r})"
+
+    def __str__(self):
+        if self.sign == 0:
+            return '0'
+        return _scientific_from_log10(self.log10, self.sign < 0)
+
+
+def _settle(value):
+    """Turn a LogNumber that fits in a float back into a float"""
+    if isinstance(value, LogNumber) and abs(value.log10) < _MAX_LOG10:
+        return float(value)
+    return value
+
+
+def _exact_cost(op, left, right):
+    """Digits of the integer an exact left <op> right would build"""
+    if not (isinstance(left, int) and isinstance(right, int)):
+        return 0.0
+    if isinstance(op, ast.Pow) and right > 0:
+        if abs(left) <= 1:
+            return 0.0
+        if right.bit_length() > 1000:
+            return math.inf
+        return math.log10(abs(left)) * right
+    if isinstance(op, ast.Mult):
+        return _int_digits(left) + _int_digits(right)
+    return 0.0
+
+
+def _log_power(base, exponent):
+    try:
+        power = float(exponent)
+    except OverflowError:
+        raise OverflowError("Result too large even to approximate") from None
+    if base.sign == 0:
+        if power < 0:
+            raise ZeroDivisionError("0.0 cannot be raised to a negative power")
+        return 0
+    sign = 1
+    if base.sign < 0:
+        if not isinstance(exponent, int):
+            raise ValueError("math domain error")
+        sign = -1 if exponent % 2 else 1
+    log10 = base.log10 * power
+    if math.isinf(log10):
+        raise OverflowError("Result too large even to approximate")
+    return LogNumber(sign, log10)
+
+
+def _log_add(a, b):
+    if a.sign == 0:
+        return b
+    if b.sign == 0:
+        return a
+    if a.log10 < b.log10:
+        a, b = b, a
+    ratio = 10.0 ** (b.log10 - a.log10)
+    if a.sign == b.sign:
+        return LogNumber(a.sign, a.log10 + math.log1p(ratio) / _LN10)
+    if ratio == 1.0:
+        return 0
+    return LogNumber(a.sign, a.log10 + math.log1p(-ratio) / _LN10)
+
+
+def _log_binop(op, left, right):
+    if not isinstance(left, LogNumber) and not isinstance(right, LogNumber):
+        if _exact_cost(op, left, right) <= EXACT_DIGIT_LIMIT:
+            try:
+                return _OPERATORS[type(op)](left, right)
+            except OverflowError:  # float overflow; continue in log space
+                pass
+    a, b = LogNumber.from_value(left), LogNumber.from_value(right)
+    if isinstance(op, ast.Pow):
+        return _log_power(a, right)
+    if isinstance(op, ast.Mult):
+        return LogNumber(a.sign * b.sign, a.log10 + b.log10)
+    if isinstance(op, (ast.Div, ast.FloorDiv)):
+        if b.sign == 0:
+            raise ZeroDivisionError("division by zero")
+        return LogNumber(a.sign * b.sign, a.log10 - b.log10)
+    if isinstance(op, ast.Sub):
+        b = LogNumber(-b.sign, b.log10)
+    if isinstance(op, (ast.Add, ast.Sub)):
+        return _log_add(a, b)
+    raise ExpressionError("Result too large to reduce exactly")
+
+
+def _log_call(func, args):
+    if not any(isinstance(arg, LogNumber) for arg in args):
+        if func is math.factorial and len(args) == 1 and isinstance(args[0], int) \
+                and args[0] >= 0 and log10_factorial(args[0]) > EXACT_DIGIT_LIMIT:
+            return LogNumber(1, log10_factorial(args[0]))
+        try:
+            return func(*args)
+        except OverflowError:
+            if func is math.exp and len(args) == 1:
+                return LogNumber(1, args[0] / _LN10)
+            if not any(isinstance(arg, int) for arg in args):
+                raise
+            # An int too large for a float; retry in log space
+            args = [LogNumber.from_value(arg) if isinstance(arg, int) else arg
+                    for arg in args]
+    value = args[0]
+    if len(args) == 1 and func is abs:
+        return LogNumber(abs(value.sign), value.log10)
+    if func in (math.log10, math.log, math.log2, math.sqrt) and isinstance(value, LogNumber):
+        if value.sign <= 0:
+            raise ValueError("math domain error")
+        if func is math.sqrt:
+            return LogNumber(1, value.log10 / 2)
+        if func is math.log10:
+            return value.log10
+        if func is math.log2:
+            return value.log10 / _LOG10_2
+        if len(args) == 2:
+            return value.log10 / math.log10(float(args[1]))
+        return value.log10 * _LN10
+    if func is math.factorial:
+        raise OverflowError("Result too large even to approximate")
+    return func(*[float(arg) if isinstance(arg, LogNumber) else arg for arg in args])
+
+
+def _approximate(node, namespace):
+    """Interpret a checked AST, falling back to LogNumber for huge values"""
+    if isinstance(node, ast.Expression):
+        return _approximate(node.body, namespace)
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, ast.Name):
+        return namespace[node.id]
+    if isinstance(node, ast.Attribute):
+        return getattr(namespace[node.value.id], node.attr)
+    if isinstance(node, ast.UnaryOp):
+        value = _approximate(node.operand, namespace)
+        if isinstance(node.op, ast.UAdd):
+            return value
+        if isinstance(value, LogNumber):
+            return LogNumber(-value.sign, value.log10)
+        return -value
+    if isinstance(node, ast.BinOp):
+        return _log_binop(node.op, _approximate(node.left, namespace),
+                          _approximate(node.right, namespace))
+    if isinstance(node, ast.Call):
+        return _log_call(_approximate(node.func, namespace),
+                         [_approximate(arg, namespace) for arg in node.args])
+    raise ExpressionError(f"Unsupported syntax: {type(node).__name__}")
+
+
+class CalculatorCore:
+    """Calculator state and operations without any GUI dependencies
+
+    The display text is kept in `display`; front ends render it and may pass
+    their own (possibly user-edited) display text to the operations that
+    read it. History listeners are called with (item, evicted) whenever an
+    entry is added, where evicted is the number of old entries dropped.
+
+    Recent history lives in a fixed-capacity ring buffer. When a HistoryLog
+    is given, every entry is also appended to it and the buffer starts out
+    with the log's most recent entries; a HistoryIndex over that log makes
+    the whole log searchable.
+    """
+
+    def __init__(self, angle_mode='deg', history_limit=HISTORY_LIMIT, history_log=None,
+                 history_index=None, memory_bank=None):
+        self.current_expression = ""
+        self.display = ""
+        # ('factorial', n), ('int', value) or ('expression', (text, angle_mode))
+        # while the display is approximate
+        self.exact_request = None
+        self.angle_mode = angle_mode
+        self.modulus = None  # set for modular mode
+        self.number_format = 'normal'  # 'normal' or 'scientific'
+        self.memory_bank = memory_bank if memory_bank is not None else MemoryBank()
+        self.memory_slot = 0  # slot the memory keys act on
+        self.history = deque(maxlen=history_limit)
+        self.history_limit = history_limit
+        self.history_log = history_log
+        self.history_index = history_index
+        self.history_listeners = []
+        if history_log is not None:
+            self.history.extend(history_log.tail(history_limit))
+
+    def _set_expression(self, expression):
+        self.current_expression = expression
+        self.display = expression
+        self.exact_request = None
+
+    def _set_error(self, message="Error"):
+        self.current_expression = ""
+        self.display = message
+        self.exact_request = None
+
+    # Expression editing
+    def add_to_expression(self, value):
+        self._set_expression(self.current_expression + str(value))
+
+    def clear(self):
+        self._set_expression("")
+
+    def backspace(self):
+        self._set_expression(self.current_expression[:-1])
+
+    def negate(self):
+        if self.current_expression:
+            if self.current_expression[0] == '-':
+                self._set_expression(self.current_expression[1:])
+            else:
+                self._set_expression('-' + self.current_expression)
+
+    def set_angle_mode(self, angle_mode):
+        if angle_mode not in ANGLE_MODES:
+            raise ValueError(f"Unknown angle mode: {angle_mode}")
+        self.angle_mode = angle_mode
+
+    def set_modulus(self, modulus):
+        """Enter modular mode with the given modulus, or leave it with None"""
+        self.modulus = check_modulus(modulus)
+
+    # Evaluation
+    def evaluate(self):
+        """Evaluate the current expression and return the new display text"""
+        expression = self.current_expression
+        try:
+            result = evaluate_expression(expression, self.angle_mode, modulus=self.modulus)
+        except Exception:
+            return self.fail_evaluation(expression)
+        return self.finish_evaluation(expression, result)
+
+    def finish_evaluation(self, expression, result):
+        """Show the result of expression, evaluated here or by a worker, and log it"""
+        with STATS.time('evaluate.format'):
+            self._set_expression(format_result(result))
+        if isinstance(result, LogNumber):
+            self.exact_request = ('expression', (expression, self.angle_mode))
+        elif is_big_int(result):
+            self.exact_request = ('int', result)
+        if self.modulus is not None:
+            expression = f"{expression} (mod {self.modulus})"
+        STATS.count('evaluate.ok')
+        with STATS.time('evaluate.history'):
+            if self.exact_request is not None:
+                self.add_to_history(f"{expression} ≈ {self.display}")
+            else:
+                self.add_to_history(f"{expression} = {self.display}")
+        return self.display
+
+    def fail_evaluation(self, expression, message="Error"):
+        """Record that expression could not be evaluated"""
+        self._set_error(message)
+        STATS.count('evaluate.error')
+        with STATS.time('evaluate.history'):
+            self.add_to_history(f"Error evaluating: {expression}")
+        return self.display
+
+    def factorial(self):
+        """Factorial of the display; huge results are shown approximately at once"""
+        try:
+            num = float(self.current_expression)
+            if num.is_integer() and num >= 0:
+                n = int(num)
+                if log10_factorial(n) < DISPLAY_DIGITS:
+                    result = math.factorial(n)
+                    self._set_expression(str(result))
+                    self.add_to_history(f"{n}! = {result}")
+                else:
+                    self._set_expression(approximate_factorial(n))
+                    self.exact_request = ('factorial', n)
+                    self.add_to_history(f"{n}! ≈ {self.display}")
+            else:
+                self._set_error("Error: Integer >= 0 required")
+        except Exception:
+            self._set_error()
+        return self.display
+
+    def reciprocal(self):
+        try:
+            num = float(self.current_expression)
+            if num != 0:
+                result = 1 / num
+                self._set_expression(str(result))
+                self.add_to_history(f"1/{num} = {result}")
+            else:
+                self._set_error("Error: Division by zero")
+        except Exception:
+            self._set_error()
+        return self.display
+
+    def exact_digits(self):
+        """Exact digits of the approximate result on display (may be slow)"""
+        if self.exact_request is None:
+            return self.display
+        return exact_digits(self.exact_request)
+
+    def show_exact(self, digits):
+        """Replace the approximate display with exact digits computed elsewhere"""
+        self._set_expression(digits)
+
+    # Formatting and conversion
+    def toggle_number_format(self, text=None):
+        """Switch between normal and scientific notation; invalid input is ignored"""
+        try:
+            num = float(self.display if text is None else text)
+        except ValueError:
+            return self.display
+        self.number_format = 'scientific' if self.number_format == 'normal' else 'normal'
+        self.display = format_number(num, self.number_format)
+        return self.display
+
+    def convert_to_hex(self, text=None):
+        return self._convert(to_hex, "hex", text)
+
+    def convert_to_bin(self, text=None):
+        return self._convert(to_bin, "binary", text)
+
+    def _convert(self, converter, name, text):
+        try:
+            value = self.display if text is None else text
+            num = int(float(value))
+            self.display = converter(num)
+            self.add_to_history(f"{num} in {name} = {self.display}")
+        except Exception:
+            self._set_error()
+        return self.display
+
+    # Memory
+    @property
+    def memory(self):
+        """Value of the selected memory slot"""
+        return self.memory_bank[self.memory_slot]
+
+    def select_memory_slot(self, slot):
+        """Make slot (0-based) the target of the memory keys"""
+        self.memory_bank[slot]  # IndexError for a slot the bank does not have
+        self.memory_slot = slot
+
+    def memory_operation(self, op, text=None, slot=None):
+        """Apply a memory key to slot (default: the selected one); return its value
+
+        MC/MR/M+/M-/MS act on one slot; 'MC all' and 'M+ all' on every slot,
+        and 'MΣ'/'Mx̄' recall the sum/mean of all slots into the expression.
+        Raises ValueError when the display does not hold a number.
+        """
+        value = self.display if text is None else text
+        bank = self.memory_bank
+        slot = self.memory_slot if slot is None else slot
+        if op == 'MC':  # Memory Clear
+            bank[slot] = 0
+        elif op == 'MR':  # Memory Recall
+            self.add_to_expression(str(bank[slot]))
+        elif op == 'M+':  # Memory Add
+            bank[slot] += float(value)
+        elif op == 'M-':  # Memory Subtract
+            bank[slot] -= float(value)
+        elif op == 'MS':  # Memory Store
+            bank[slot] = float(value)
+        elif op == 'MC all':
+            bank.clear()
+        elif op == 'M+ all':
+            bank.add_all(float(value))
+        elif op == 'MΣ':
+            self.add_to_expression(str(bank.total()))
+        elif op == 'Mx̄':
+            self.add_to_expression(str(bank.mean()))
+        return bank[slot]
+
+    # History
+    def add_to_history(self, item):
+        evicted = 1 if len(self.history) == self.history_limit else 0
+        self.history.append(item)
+        if self.history_log is not None:
+            with STATS.time('history.log'):
+                entry_id = self.history_log.append(item)
+            if self.history_index is not None:
+                with STATS.time('history.index'):
+                    self.history_index.add(entry_id, item)
+        with STATS.time('history.listeners'):
+            for listener in self.history_listeners:
+                listener(item, evicted)
+
+    def search_history(self, query, limit=100):
+        """Return up to limit history entries matching query, newest first
+
+        Uses the history index when there is one, so the full on-disk log
+        is searched; otherwise only the recent entries are scanned.
+        """
+        if self.history_index is not None:
+            return [item for _, item in self.history_index.search(query, limit)]
+        from calculator_history import search_items
+        return [item for _, item in search_items(list(self.history), query, limit)]
+
+    def clear_history(self):
+        """Delete the history, including the on-disk log and its search index"""
+        self.history.clear()
+        if self.history_log is not None:
+            self.history_log.clear()
+        if self.history_index is not None:
+            self.history_index.clear()
+
+    def save_history(self, path='calculator_history.txt'):
+        with open(path, 'w') as f:
+            for item in self.history:
+                f.write(item + "\n")
+        return path
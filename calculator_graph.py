@@ -0,0 +1,1022 @@
+"""Graph function compilation for the Ultimate Scientific Calculator.
+
+Each function typed into the graphing tab is parsed with the calculator's
+expression whitelist once, compiled to a code object bound to a NumPy
+namespace and cached, so redraws only pay for the array math. Before it is
+compiled the tree is optimized: constants are folded, repeated
+subexpressions are computed once and temporaries are reused as outputs.
+
+A function may carry a parameter range, as in 'sin(k*x), k=1..200' or
+'x**a, a=0..2:0.25'; it compiles to a GraphFamily that evaluates every
+member in one broadcast pass. A function of x and y compiles to a
+PlaneFunction: an implicit curve when it is an equation ('x^2 + y^2 = 1'),
+otherwise a heat map. Compiled functions are also kept in the calculator's
+on-disk compile cache, so a formula plotted in an earlier session is not
+compiled again.
+"""
+import ast
+import copy
+import math
+import operator
+import re
+import warnings
+from collections import OrderedDict
+from functools import lru_cache
+from types import SimpleNamespace
+
+import numpy as np
+
+from calculator_core import ANGLE_MODES, compile_cache, estimate_digits, parse_expression
+
+GRAPH_CACHE_SIZE = 256
+MAX_FAMILY_CURVES = 1000
+
+
+def _degree_trig(func):
+    return lambda x: func(np.deg2rad(x))
+
+
+def _degree_inverse(func):
+    return lambda x: np.rad2deg(func(x))
+
+
+# Targets of the optimizer's rewrites (see optimize_graph_tree)
+
+IN_PLACE_SIZE = 4096  # smaller arrays are cheaper to allocate than to check
+_BINARY_OPERATIONS = {
+    ast.Add: (np.add, operator.add), ast.Sub: (np.subtract, operator.sub),
+    ast.Mult: (np.multiply, operator.mul), ast.Div: (np.true_divide, operator.truediv),
+    ast.FloorDiv: (np.floor_divide, operator.floordiv), ast.Mod: (np.remainder, operator.mod),
+    ast.Pow: (np.power, operator.pow),
+}
+
+
+def _in_place_binary(ufunc, operation, into_right):
+    """operation(a, b), written into a (or b) when it is a large enough array"""
+    def apply(a, b):
+        out, other = (b, a) if into_right else (a, b)
+        if type(out) is np.ndarray and out.size >= IN_PLACE_SIZE \
+                and (np.ndim(other) == 0 or np.shape(other) == out.shape):
+            try:
+                return ufunc(a, b, out=out)
+            except TypeError:  # the result needs a wider dtype than out
+                pass
+        return operation(a, b)
+    return apply
+
+
+def _in_place_call(func, a):
+    """func(a) for a one-argument ufunc, written into a when it is a large enough array"""
+    if type(a) is np.ndarray and a.size >= IN_PLACE_SIZE:
+        try:
+            return func(a, out=a)
+        except TypeError:
+            pass
+    return func(a)
+
+
+def _optimizer_names():
+    """Functions the optimized trees call; user input cannot name them"""
+    names = {'_icall': _in_place_call, '_negative': np.negative,
+             '_sin': np.sin, '_cos': np.cos, '_tan': np.tan,
+             '_asin': np.arcsin, '_acos': np.arccos, '_atan': np.arctan}
+    for op, (ufunc, operation) in _BINARY_OPERATIONS.items():
+        name = f'_i{op.__name__.lower()}'
+        names[name] = _in_place_binary(ufunc, operation, False)
+        names[name + '_r'] = _in_place_binary(ufunc, operation, True)
+    return names
+
+
+def _build_namespace(angle_mode):
+    """Build the NumPy evaluation namespace for the given angle mode"""
+    functions = {
+        'sin': np.sin, 'cos': np.cos, 'tan': np.tan,
+        'asin': np.arcsin, 'acos': np.arccos, 'atan': np.arctan,
+        'sinh': np.sinh, 'cosh': np.cosh, 'tanh': np.tanh,
+        'asinh': np.arcsinh, 'acosh': np.arccosh, 'atanh': np.arctanh,
+        'sqrt': np.sqrt, 'exp': np.exp, 'abs': np.abs, 'fabs': np.abs,
+        'log': np.log10, 'ln': np.log, 'log10': np.log10, 'log2': np.log2,
+        'floor': np.floor, 'ceil': np.ceil,
+        'radians': np.deg2rad, 'degrees': np.rad2deg,
+        'pi': np.pi, 'e': np.e, 'tau': 2 * np.pi, 'inf': np.inf,
+    }
+    if angle_mode == 'deg':
+        for name in ('sin', 'cos', 'tan'):
+            functions[name] = _degree_trig(functions[name])
+        for name in ('asin', 'acos', 'atan'):
+            functions[name] = _degree_inverse(functions[name])
+
+    namespace = dict(functions)
+    namespace['math'] = SimpleNamespace(**functions)
+    namespace['np'] = np
+    namespace.update(_optimizer_names())
+    namespace['__builtins__'] = {}
+    return namespace
+
+
+_NAMESPACES = {mode: _build_namespace(mode) for mode in ANGLE_MODES}
+
+
+class GraphFunction:
+    """A compiled graph function y = f(x) evaluated over NumPy arrays"""
+
+    __slots__ = ('text', 'angle_mode', 'code', 'namespace')
+    rows = 1
+
+    def __init__(self, text, angle_mode, code, namespace):
+        self.text = text
+        self.angle_mode = angle_mode
+        self.code = code
+        self.namespace = namespace
+
+    def __call__(self, x):
+        """Evaluate at every point of x; invalid points come back as NaN"""
+        with np.errstate(all='ignore'):
+            y = eval(self.code, self.namespace, {'x': x})
+        y = np.asarray(y, dtype=float)
+        if y.shape != np.shape(x):  # constant functions such as 'y = 2'
+            y = np.broadcast_to(y, np.shape(x))
+        return y
+
+
+class GraphFamily:
+    """A graph function y = f(x, k) plotted once for each value of k"""
+
+    __slots__ = ('text', 'angle_mode', 'code', 'namespace', 'parameter', 'values')
+
+    def __init__(self, text, angle_mode, code, namespace, parameter, values):
+        self.text = text
+        self.angle_mode = angle_mode
+        self.code = code
+        self.namespace = namespace
+        self.parameter = parameter
+        self.values = values
+
+    @property
+    def rows(self):
+        return len(self.values)
+
+    def __call__(self, x):
+        """Evaluate every member at every point of x: one row per parameter value"""
+        x = np.asarray(x, dtype=float)
+        local_names = {'x': x[np.newaxis, :], self.parameter: self.values[:, np.newaxis]}
+        with np.errstate(all='ignore'):
+            y = eval(self.code, self.namespace, local_names)
+        return np.broadcast_to(np.asarray(y, dtype=float), (self.rows, len(x)))
+
+
+class PlaneFunction:
+    """A compiled function of x and y: an implicit curve F(x, y) = 0 or a heat map"""
+
+    __slots__ = ('text', 'angle_mode', 'code', 'namespace', 'implicit')
+
+    def __init__(self, text, angle_mode, code, namespace, implicit):
+        self.text = text
+        self.angle_mode = angle_mode
+        self.code = code
+        self.namespace = namespace
+        self.implicit = implicit
+
+    def __call__(self, x, y):
+        """Evaluate at every pair of points of x and y; invalid points come back as NaN"""
+        with np.errstate(all='ignore'):
+            z = eval(self.code, self.namespace, {'x': x, 'y': y})
+        return np.broadcast_to(np.asarray(z, dtype=float), np.broadcast(x, y).shape)
+
+
+_EQUALS = re.compile(r'(?<![<>=!])=(?!=)')
+_NUMBER = r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?'
+_FAMILY = re.compile(
+    rf'^(?P<body>.+),\s*(?P<name>[A-Za-z_]\w*)\s*=\s*(?P<start>{_NUMBER})\s*\.\.\s*'
+    rf'(?P<stop>{_NUMBER})(?:\s*:\s*(?P<step>{_NUMBER}))?$')
+
+
+def _family_values(start, stop, step):
+    start, stop = float(start), float(stop)
+    step = float(step) if step else 1.0
+    if step <= 0:
+        raise ValueError("Parameter step must be positive")
+    count = math.floor((stop - start) / step + 1e-9) + 1
+    if count < 1:
+        raise ValueError("Parameter range is empty")
+    if count > MAX_FAMILY_CURVES:
+        raise ValueError(f"At most {MAX_FAMILY_CURVES} curves per family")
+    return start + step * np.arange(count)
+
+
+# Optimization
+#
+# Before a graph function's tree is compiled it is rewritten so each sample
+# array does as little work as possible:
+#   - degree-mode trig becomes a radian call with an explicit pi/180 factor,
+#     which then folds into any constant already multiplying the argument;
+#   - subtrees without a variable are evaluated once at compile time, and
+#     chains of constant factors such as 'x*pi/180' merge into one;
+#   - small integer powers become multiplications;
+#   - a subtree that occurs more than once is computed once per call and
+#     reused through an assignment expression;
+#   - arithmetic whose operand is a temporary of this call writes its result
+#     into that temporary instead of allocating another array.
+
+FOLD_DIGITS = 400  # integer constants beyond float range are left to run time
+_DEGREE_FUNCTIONS = {'sin': '_sin', 'cos': '_cos', 'tan': '_tan'}
+_INVERSE_DEGREE_FUNCTIONS = {'asin': '_asin', 'acos': '_acos', 'atan': '_atan'}
+
+
+def _is_constant(node):
+    return isinstance(node, ast.Constant)
+
+
+def _number(value):
+    """value as a plain Python number, or None if it is not one"""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, (int, float, complex)) and not isinstance(value, bool):
+        return value
+    return None
+
+
+class _GraphOptimizer(ast.NodeTransformer):
+    """Expand degree trig, fold constants and reduce small powers"""
+
+    def __init__(self, namespace, local_names, angle_mode):
+        self.namespace = namespace
+        self.local_names = frozenset(local_names)
+        self.degrees = angle_mode == 'deg'
+
+    def _fold(self, node):
+        """node as a Constant if it can be evaluated now, else node unchanged"""
+        if _is_constant(node) or any(isinstance(child, ast.Name) and child.id in self.local_names
+                                     for child in ast.walk(node)):
+            return node
+        if estimate_digits(node) > FOLD_DIGITS:
+            return node
+        try:
+            with np.errstate(all='ignore'):
+                code = compile(ast.fix_missing_locations(ast.Expression(body=node)),
+                               '<constant>', 'eval')
+                value = _number(eval(code, self.namespace))
+        except Exception:  # raise when the function is evaluated, as before
+            return node
+        return node if value is None else ast.Constant(value=value)
+
+    def _scale(self, node, factor):
+        """node * factor, merged with a constant factor or divisor already on node"""
+        if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.Mult, ast.Div)):
+            if _is_constant(node.right):
+                constant, rest = node.right.value, node.left
+                if isinstance(node.op, ast.Div):
+                    constant = 1 / constant if constant != 0 else None
+            elif _is_constant(node.left) and isinstance(node.op, ast.Mult):
+                constant, rest = node.left.value, node.right
+            else:
+                constant = None
+            if constant is not None:
+                try:
+                    return self._scale(rest, constant * factor)
+                except (ArithmeticError, TypeError):
+                    pass
+        return ast.BinOp(left=node, op=ast.Mult(), right=ast.Constant(value=factor))
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        folded = self._fold(node)
+        if folded is not node:
+            return folded
+        if isinstance(node.op, (ast.Mult, ast.Div)) and _is_constant(node.right):
+            if isinstance(node.op, ast.Div):
+                if node.right.value == 0:
+                    return node
+                return self._scale(node.left, 1 / node.right.value)
+            return self._scale(node.left, node.right.value)
+        if isinstance(node.op, ast.Mult) and _is_constant(node.left):
+            return self._scale(node.right, node.left.value)
+        if isinstance(node.op, ast.Pow) and _is_constant(node.right) \
+                and node.right.value in (3, 4):
+            # The repeated operand is shared by common-subexpression elimination
+            square = ast.BinOp(left=node.left, op=ast.Mult(), right=copy.deepcopy(node.left))
+            if node.right.value == 3:
+                return ast.BinOp(left=square, op=ast.Mult(), right=copy.deepcopy(node.left))
+            return ast.BinOp(left=square, op=ast.Pow(), right=ast.Constant(value=2))
+        return node
+
+    def visit_Name(self, node):  # constants such as pi
+        return self._fold(node)
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        return self._fold(node)
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        name = node.func.id if isinstance(node.func, ast.Name) else None
+        if self.degrees and len(node.args) == 1:
+            if name in _DEGREE_FUNCTIONS:
+                node = ast.Call(func=ast.Name(id=_DEGREE_FUNCTIONS[name], ctx=ast.Load()),
+                                args=[self._scale(node.args[0], math.pi / 180)], keywords=[])
+            elif name in _INVERSE_DEGREE_FUNCTIONS:
+                call = ast.Call(func=ast.Name(id=_INVERSE_DEGREE_FUNCTIONS[name], ctx=ast.Load()),
+                                args=node.args, keywords=[])
+                return self._fold(ast.BinOp(left=self._fold(call), op=ast.Mult(),
+                                            right=ast.Constant(value=180 / math.pi)))
+        return self._fold(node)
+
+
+def _subtrees(node):
+    """Every subtree of node in evaluation order (operands left to right)"""
+    yield node
+    for child in ast.iter_child_nodes(node):
+        yield from _subtrees(child)
+
+
+def _eliminate_common_subexpressions(tree, local_names):
+    """Compute each repeated subtree once, binding it with ':=' where it first runs"""
+    count = 0
+    while True:
+        seen = {}
+        for node in _subtrees(tree.body):
+            if isinstance(node, (ast.BinOp, ast.UnaryOp, ast.Call)) and any(
+                    isinstance(child, ast.Name) and child.id in local_names
+                    for child in ast.walk(node)):
+                seen.setdefault(ast.dump(node), []).append(node)
+        repeated = [nodes for nodes in seen.values() if len(nodes) > 1]
+        if not repeated:
+            return tree
+        # The largest first, so a repeat nested inside it is counted once
+        nodes = max(repeated, key=lambda nodes: sum(1 for _ in ast.walk(nodes[0])))
+        tree = _Substitute(nodes, f'_t{count}').visit(tree)
+        count += 1
+
+
+class _Substitute(ast.NodeTransformer):
+    """Bind the first of nodes to name and read name in place of the others"""
+
+    def __init__(self, nodes, name):
+        self.first = nodes[0]
+        self.rest = {id(node) for node in nodes[1:]}
+        self.name = name
+
+    def visit(self, node):
+        if node is self.first:
+            return ast.NamedExpr(target=ast.Name(id=self.name, ctx=ast.Store()), value=node)
+        if id(node) in self.rest:
+            return ast.Name(id=self.name, ctx=ast.Load())
+        return self.generic_visit(node)
+
+
+class _InPlaceRewriter(ast.NodeTransformer):
+    """Write arithmetic results into temporaries that nothing else refers to
+
+    A temporary is the result of arithmetic or of a NumPy ufunc; names,
+    constants and values bound with ':=' may be read again and are never
+    overwritten.
+    """
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+
+    def _is_ufunc(self, node):
+        func = self.namespace.get(node.id) if isinstance(node, ast.Name) else None
+        return isinstance(func, np.ufunc) and func.nin == 1 and func.nout == 1
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        op = type(node.op).__name__.lower()
+        if self._temporary(node.left):
+            node = ast.Call(func=ast.Name(id=f'_i{op}', ctx=ast.Load()),
+                            args=[node.left, node.right], keywords=[])
+        elif self._temporary(node.right):
+            node = ast.Call(func=ast.Name(id=f'_i{op}_r', ctx=ast.Load()),
+                            args=[node.left, node.right], keywords=[])
+        node.temporary = True
+        return node
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.USub) and self._temporary(node.operand):
+            node = ast.Call(func=ast.Name(id='_icall', ctx=ast.Load()),
+                            args=[ast.Name(id='_negative', ctx=ast.Load()), node.operand],
+                            keywords=[])
+        node.temporary = True
+        return node
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        if self._is_ufunc(node.func):
+            if len(node.args) == 1 and self._temporary(node.args[0]):
+                node = ast.Call(func=ast.Name(id='_icall', ctx=ast.Load()),
+                                args=[node.func, node.args[0]], keywords=[])
+            node.temporary = True
+        return node
+
+    @staticmethod
+    def _temporary(node):
+        return getattr(node, 'temporary', False)
+
+
+def optimize_graph_tree(tree, namespace, local_names, angle_mode):
+    """Rewrite a parsed graph function for fast evaluation over arrays"""
+    tree = _GraphOptimizer(namespace, local_names, angle_mode).visit(tree)
+    tree = _eliminate_common_subexpressions(tree, frozenset(local_names))
+    tree = _InPlaceRewriter(namespace).visit(tree)
+    return ast.fix_missing_locations(tree)
+
+
+def _compile(text, angle_mode):
+    namespace = _NAMESPACES[angle_mode]
+    family = _FAMILY.match(text)
+    if family is not None and family.group('name') != 'x':
+        parameter = family.group('name')
+        values = _family_values(family.group('start'), family.group('stop'),
+                                family.group('step'))
+        tree = parse_expression(family.group('body'), namespace,
+                                local_names=('x', parameter))
+        tree = optimize_graph_tree(tree, namespace, ('x', parameter), angle_mode)
+        code = compile(tree, '<graph function>', 'eval')
+        return GraphFamily(text, angle_mode, code, namespace, parameter, values)
+    sides = _EQUALS.split(text)
+    if len(sides) == 2:  # F(x, y) = G(x, y) is traced as F - G = 0
+        left, right = (parse_expression(side, namespace, local_names=('x', 'y'))
+                       for side in sides)
+        tree = ast.Expression(body=ast.BinOp(left=left.body, op=ast.Sub(), right=right.body))
+        tree = optimize_graph_tree(tree, namespace, ('x', 'y'), angle_mode)
+        code = compile(tree, '<graph function>', 'eval')
+        return PlaneFunction(text, angle_mode, code, namespace, implicit=True)
+    if len(sides) > 2:
+        raise ValueError("An implicit curve has exactly one '='")
+    tree = parse_expression(text, namespace, local_names=('x', 'y'))
+    plane = any(isinstance(node, ast.Name) and node.id == 'y' for node in ast.walk(tree))
+    tree = optimize_graph_tree(tree, namespace, ('x', 'y'), angle_mode)
+    code = compile(tree, '<graph function>', 'eval')
+    if plane:
+        return PlaneFunction(text, angle_mode, code, namespace, implicit=False)
+    return GraphFunction(text, angle_mode, code, namespace)
+
+
+def _cache_entry(func):
+    """What the disk cache keeps of a compiled function: its kind, code and extras"""
+    if isinstance(func, GraphFamily):
+        return ('family', func.code, func.parameter, tuple(func.values.tolist()))
+    if isinstance(func, PlaneFunction):
+        return ('plane', func.code, func.implicit)
+    return ('function', func.code)
+
+
+def _from_cache_entry(entry, text, angle_mode):
+    kind, code = entry[:2]
+    namespace = _NAMESPACES[angle_mode]
+    if kind == 'family':
+        return GraphFamily(text, angle_mode, code, namespace, entry[2], np.array(entry[3]))
+    if kind == 'plane':
+        return PlaneFunction(text, angle_mode, code, namespace, implicit=entry[2])
+    return GraphFunction(text, angle_mode, code, namespace)
+
+
+@lru_cache(maxsize=GRAPH_CACHE_SIZE)
+def _compile_cached(text, angle_mode):
+    cache = compile_cache()
+    entry = cache.load('graph', text, angle_mode)
+    if entry is not None:
+        return _from_cache_entry(entry, text, angle_mode)
+    func = _compile(text, angle_mode)
+    cache.store('graph', _cache_entry(func), text, angle_mode)
+    return func
+
+
+def compile_graph_function(text, angle_mode='deg'):
+    """Return the cached vectorized callable for a graph function or family"""
+    if angle_mode not in ANGLE_MODES:
+        raise ValueError(f"Unknown angle mode: {angle_mode}")
+    return _compile_cached(text.strip(), angle_mode)
+
+
+# Adaptive sampling
+#
+# Curves start from a coarse uniform grid. Each round bisects the intervals
+# whose end points bend away from the neighbouring chord, jump by a large
+# fraction of the visible y-range, or cross the edge of the domain, until
+# the evaluation budget is spent. Points that lie on a straight line with
+# their neighbours are then merged away, and a NaN is inserted wherever the
+# curve jumps so matplotlib breaks the line instead of drawing a spike.
+
+SAMPLE_BUDGET = 2000
+INITIAL_SAMPLES = 65
+CURVE_TOLERANCE = 0.002  # chord deviation, as a fraction of the y-range
+JUMP_TOLERANCE = 0.05  # single-interval jump, as a fraction of the y-range
+FLAT_TOLERANCE = 0.0002
+MIN_INTERVAL = 1e-7  # smallest interval width, as a fraction of the x-range
+SLOPE_RATIO = 10.0
+MERGE_PASSES = 8
+
+
+def _y_scale(y):
+    """Robust height of the visible part of the curve"""
+    finite = y[np.isfinite(y)]
+    if finite.size < 2:
+        return 1.0
+    low, high = np.percentile(finite, [2, 98])
+    return max(high - low, 1e-12 * max(abs(high), abs(low), 1.0))
+
+
+def _chord_deviation(x, y):
+    """Distance of each interior point from the chord through its neighbours"""
+    deviation = np.zeros_like(y)
+    left, right = x[:-2], x[2:]
+    with np.errstate(all='ignore'):
+        chord = (y[:-2] * (right - x[1:-1]) + y[2:] * (x[1:-1] - left)) / (right - left)
+        deviation[1:-1] = np.abs(y[1:-1] - chord)
+    deviation[~np.isfinite(deviation)] = 0.0
+    return deviation
+
+
+def _interval_errors(x, y, scale):
+    """Refinement priority of every interval (0 means leave it alone)"""
+    deviation = _chord_deviation(x, y) / scale
+    errors = np.maximum(deviation[:-1], deviation[1:])
+    with np.errstate(invalid='ignore'):
+        jumps = np.abs(np.diff(y)) / scale
+    jumps[~np.isfinite(jumps)] = 0.0
+    errors = np.where(jumps > JUMP_TOLERANCE, np.maximum(errors, jumps), errors)
+    finite = np.isfinite(y)
+    errors[finite[:-1] != finite[1:]] = np.inf  # edge of the domain
+    errors[errors < CURVE_TOLERANCE] = 0.0
+    return errors
+
+
+def _merge_flat(x, y, scale):
+    """Drop points that lie on the line through their neighbours"""
+    for parity in range(MERGE_PASSES):
+        deviation = _chord_deviation(x, y) / scale
+        flat = np.zeros(len(x), dtype=bool)
+        flat[1:-1] = deviation[1:-1] < FLAT_TOLERANCE
+        flat &= np.isfinite(y)
+        flat[1:-1] &= np.isfinite(y[:-2]) & np.isfinite(y[2:])
+        # Remove alternate points so a kept neighbour always bounds the error
+        flat[(parity % 2)::2] = False
+        if not flat.any():
+            if parity:
+                break
+            continue
+        x, y = x[~flat], y[~flat]
+    return x, y
+
+
+def _neighbour_max(values):
+    result = np.full_like(values, np.inf)
+    result[1:-1] = np.maximum(values[:-2], values[2:])
+    return result
+
+
+def _break_discontinuities(x, y, scale):
+    """Insert NaN between samples where the curve jumps
+
+    A jump counts as a discontinuity when it is much steeper or much larger
+    than both neighbouring intervals, or when the slope flips sign against
+    two agreeing neighbours (the pole of tan or 1/x).
+    """
+    if len(x) < 3:
+        return x, y
+    dx, dy = np.diff(x), np.diff(y)
+    with np.errstate(all='ignore'):
+        slopes = dy / dx
+        jumps = np.abs(dy) / scale
+    abs_slopes = np.abs(slopes)
+    flipped = np.zeros_like(slopes, dtype=bool)
+    flipped[1:-1] = (np.sign(slopes[1:-1]) != np.sign(slopes[:-2])) & \
+                    (np.sign(slopes[1:-1]) != np.sign(slopes[2:])) & \
+                    (slopes[:-2] * slopes[2:] > 0)
+    with np.errstate(invalid='ignore'):
+        breaks = (jumps > JUMP_TOLERANCE) & (
+            (abs_slopes > SLOPE_RATIO * _neighbour_max(abs_slopes))
+            | (jumps > SLOPE_RATIO * _neighbour_max(jumps)) | flipped)
+    index = np.flatnonzero(breaks)
+    if not index.size:
+        return x, y
+    x = np.insert(x, index + 1, (x[index] + x[index + 1]) / 2)
+    y = np.insert(y, index + 1, np.nan)
+    return x, y
+
+
+def sample_function(func, x_min, x_max, budget=SAMPLE_BUDGET):
+    """Sample func adaptively on [x_min, x_max] using at most budget evaluations
+
+    Returns (x, y) ready for ax.plot; discontinuities and points outside the
+    function's domain are NaN so the line breaks there.
+    """
+    initial = max(3, min(INITIAL_SAMPLES, budget))
+    x = np.linspace(x_min, x_max, initial)
+    y = np.array(func(x), dtype=float)
+    used = initial
+    min_width = (x_max - x_min) * MIN_INTERVAL
+    scale = _y_scale(y)
+
+    while used < budget:
+        errors = _interval_errors(x, y, scale)
+        errors[np.diff(x) <= min_width] = 0.0
+        index = np.flatnonzero(errors)
+        if not index.size:
+            break
+        if index.size > budget - used:
+            worst = np.argsort(errors[index])[::-1][:budget - used]
+            index = np.sort(index[worst])
+        midpoints = (x[index] + x[index + 1]) / 2
+        x = np.insert(x, index + 1, midpoints)
+        y = np.insert(y, index + 1, func(midpoints))
+        used += index.size
+        scale = _y_scale(y)
+
+    y[np.isinf(y)] = np.nan
+    x, y = _merge_flat(x, y, scale)
+    return _break_discontinuities(x, y, scale)
+
+
+# Viewport tiles
+#
+# The x-axis is cut into tiles whose width is a power of two chosen from the
+# visible range, so tiles line up across pans and repeat at the same zoom
+# level. Each tile is sampled adaptively once and kept in a per-function LRU
+# cache keyed by (level, index, budget); panning only samples the tiles that
+# scroll into view.
+
+TILES_PER_VIEW = 8
+TILE_BUDGET = SAMPLE_BUDGET // TILES_PER_VIEW
+TILE_CACHE_SIZE = 256
+
+
+class TileCache:
+    """Per-function cache of adaptively sampled x-tiles"""
+
+    def __init__(self, func, max_tiles=TILE_CACHE_SIZE, tile_budget=TILE_BUDGET):
+        self.func = func
+        self.max_tiles = max_tiles
+        self.tile_budget = tile_budget
+        self.hits = 0
+        self.misses = 0
+        self._tiles = OrderedDict()
+
+    def clear(self):
+        self._tiles.clear()
+
+    def _tile(self, level, index):
+        key = (level, index, self.tile_budget)
+        tile = self._tiles.get(key)
+        if tile is not None:
+            self._tiles.move_to_end(key)
+            self.hits += 1
+            return tile
+        self.misses += 1
+        width = math.ldexp(1.0, level)
+        tile = sample_function(self.func, index * width, (index + 1) * width, self.tile_budget)
+        self._tiles[key] = tile
+        if len(self._tiles) > self.max_tiles:
+            self._tiles.popitem(last=False)
+        return tile
+
+    def sample(self, x_min, x_max):
+        """Return (x, y) covering [x_min, x_max], sampling only uncached tiles"""
+        level = math.floor(math.log2((x_max - x_min) / TILES_PER_VIEW))
+        width = math.ldexp(1.0, level)
+        first = math.floor(x_min / width)
+        last = math.ceil(x_max / width)
+        xs, ys = [], []
+        for index in range(first, last):
+            x, y = self._tile(level, index)
+            # Neighbouring tiles share their boundary point
+            start = 1 if xs else 0
+            xs.append(x[start:])
+            ys.append(y[start:])
+        x, y = np.concatenate(xs), np.concatenate(ys)
+
+        # Trim to the view, keeping one point beyond each edge
+        lo = max(np.searchsorted(x, x_min) - 1, 0)
+        hi = min(np.searchsorted(x, x_max, side='right') + 1, len(x))
+        return x[lo:hi], y[lo:hi]
+
+
+# Shared grid
+#
+# Parameter families, and every curve once the list grows past MANY_CURVES,
+# are evaluated together on one uniform x-grid into a single 2-D block (one
+# row per curve) and drawn as LineCollections rather than one Line2D each.
+# Discontinuities are broken by blanking the sample on the far side of each
+# jump, which needs no per-row insertion and so stays vectorized.
+
+SHARED_SAMPLES = 1000
+MANY_CURVES = 20
+
+
+def shared_grid(x_min, x_max, samples=SHARED_SAMPLES):
+    return np.linspace(x_min, x_max, samples)
+
+
+def evaluate_block(functions, x):
+    """Evaluate functions on x into one block; return (block, row spans)"""
+    rows = sum(func.rows for func in functions)
+    block = np.empty((rows, len(x)))
+    spans = []
+    start = 0
+    for func in functions:
+        stop = start + func.rows
+        block[start:stop] = func(x)
+        spans.append((start, stop))
+        start = stop
+    _break_block(block)
+    return block, spans
+
+
+def _break_block(block):
+    """Set NaN at the far end of every jump in every row, in place"""
+    if block.shape[1] < 3:
+        return
+    block[np.isinf(block)] = np.nan
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # all-NaN rows
+        low, high = np.nanpercentile(block, [2, 98], axis=1)
+    scale = np.maximum(high - low, 1e-12 * np.maximum(np.abs(high), 1.0))
+    steps = np.diff(block, axis=1)
+    signs = np.sign(steps)
+    with np.errstate(invalid='ignore'):
+        jumps = np.abs(steps) / scale[:, np.newaxis]
+        neighbours = np.full_like(jumps, np.inf)
+        neighbours[:, 1:-1] = np.maximum(jumps[:, :-2], jumps[:, 2:])
+        flipped = np.zeros_like(jumps, dtype=bool)
+        flipped[:, 1:-1] = (signs[:, 1:-1] != signs[:, :-2]) & (signs[:, :-2] == signs[:, 2:]) \
+            & (signs[:, :-2] != 0)
+        breaks = (jumps > JUMP_TOLERANCE) & ((jumps > SLOPE_RATIO * neighbours) | flipped)
+    rows, columns = np.nonzero(breaks)
+    if rows.size:
+        far = columns + (np.abs(block[rows, columns + 1]) > np.abs(block[rows, columns]))
+        block[rows, far] = np.nan
+
+
+def block_segments(x, block):
+    """(rows, len(x), 2) vertices for LineCollection.set_segments"""
+    return np.stack(np.broadcast_arrays(x[np.newaxis, :], block), axis=-1)
+
+
+# High-resolution sampling
+#
+# Curves that oscillate faster than the adaptive sampler can follow are
+# evaluated on a uniform grid of up to MAX_SAMPLES points, in chunks of whole
+# pixel columns, and each column is reduced to its minimum and maximum in the
+# order they occur. matplotlib then gets two points per column however many
+# were evaluated, and every peak is still drawn. Jumps and poles are found
+# in the raw samples and become NaN breaks in the reduced line.
+
+MAX_SAMPLES = 10 ** 7
+ENVELOPE_CHUNK = 1 << 20  # samples evaluated at once
+SCALE_SAMPLES = 1001
+
+
+def _sample_breaks(y, scale):
+    """Indices k where the line from y[k] to y[k + 1] should break
+
+    Either a jump much larger than both neighbouring steps, or a change of
+    sign between two values far outside the visible range (a pole).
+    """
+    with np.errstate(invalid='ignore'):
+        jumps = np.abs(np.diff(y))
+        steep = (jumps > JUMP_TOLERANCE * scale) & (jumps > SLOPE_RATIO * _neighbour_max(jumps))
+        pole = (y[:-1] * y[1:] < 0) & (np.minimum(np.abs(y[:-1]), np.abs(y[1:])) > scale)
+    return np.flatnonzero(steep | pole)
+
+
+def sample_envelope(func, x_min, x_max, samples, columns):
+    """Evaluate func at about samples points; return its per-column min/max envelope"""
+    columns = max(int(columns), 1)
+    per_column = max(-(-int(samples) // columns), 1)
+    step = (x_max - x_min) / (per_column * columns)
+    chunk_columns = max(ENVELOPE_CHUNK // per_column, 1)
+    scale = _y_scale(np.array(func(np.linspace(x_min, x_max, SCALE_SAMPLES)), dtype=float))
+    lows, highs = np.empty(columns), np.empty(columns)
+    low_first = np.empty(columns, dtype=bool)
+    gaps = []  # break positions in the reduced line: 2c inside column c, 2c - 1 before it
+    previous = np.empty(0)
+    for first in range(0, columns, chunk_columns):
+        last = min(first + chunk_columns, columns)
+        x = x_min + step * (np.arange(first * per_column, last * per_column) + 0.5)
+        y = np.array(func(x), dtype=float)
+        missing = ~np.isfinite(y)
+        y[missing] = np.nan
+        # Carry the last sample over so breaks at chunk boundaries are seen
+        sample = _sample_breaks(np.concatenate((previous, y)), scale) + 1 - previous.size
+        sample = sample[sample >= 0]
+        column, offset = np.divmod(sample + first * per_column, per_column)
+        gaps.append(np.where(offset == 0, 2 * column - 1, 2 * column))
+        previous = y[-1:]
+
+        y, missing = y.reshape(-1, per_column), missing.reshape(-1, per_column)
+        lowest = np.argmin(np.where(missing, np.inf, y), axis=1)
+        highest = np.argmax(np.where(missing, -np.inf, y), axis=1)
+        rows = np.arange(last - first)
+        lows[first:last] = y[rows, lowest]  # NaN for columns with no finite sample
+        highs[first:last] = y[rows, highest]
+        low_first[first:last] = lowest <= highest
+
+    width = (x_max - x_min) / columns
+    x = np.repeat(x_min + width * (np.arange(columns) + 0.5), 2)
+    x[0::2] -= width / 4
+    x[1::2] += width / 4
+    y = np.empty(2 * columns)
+    y[0::2] = np.where(low_first, lows, highs)
+    y[1::2] = np.where(low_first, highs, lows)
+
+    gaps = np.unique(np.concatenate(gaps))
+    gaps = gaps[gaps >= 0]
+    if gaps.size:
+        x = np.insert(x, gaps + 1, (x[gaps] + x[gaps + 1]) / 2)
+        y = np.insert(y, gaps + 1, np.nan)
+    return x, y
+
+
+# Implicit curves and heat maps
+#
+# F(x, y) = 0 is traced on a quadtree. A coarse grid of CONTOUR_CELLS^2 cells
+# is evaluated at its corners, and only cells whose corners change sign are
+# split in four, level after level, for CONTOUR_LEVELS halvings. Empty
+# regions are never refined, so the finest level matches a 2048 x 2048 grid
+# for a small fraction of the evaluations. Marching squares turns each leaf
+# cell into one or two segments. Leaves whose values dwarf the typical leaf
+# straddle a pole rather than a zero and are dropped.
+#
+# Heat maps are sampled at cell centres on a grid of at most HEAT_SAMPLES
+# per side, about one sample per pixel.
+
+CONTOUR_CELLS = 64
+CONTOUR_LEVELS = 5
+POLE_RATIO = 100.0
+HEAT_SAMPLES = 2000
+
+
+def _cell_corners(func, i, j, step, origin, delta):
+    """Values at the corners (i, j), (i+s, j), (i+s, j+s), (i, j+s) of each cell"""
+    ci = np.stack((i, i + step, i + step, i), axis=1)
+    cj = np.stack((j, j, j + step, j + step), axis=1)
+    return np.array(func(origin[0] + ci * delta[0], origin[1] + cj * delta[1]), dtype=float)
+
+
+def trace_implicit(func, x_min, x_max, y_min, y_max,
+                   cells=CONTOUR_CELLS, levels=CONTOUR_LEVELS):
+    """Return an (n, 2, 2) array of segments approximating func(x, y) = 0"""
+    step = 1 << levels  # finest cells per coarse cell
+    origin = (x_min, y_min)
+    delta = ((x_max - x_min) / (cells * step), (y_max - y_min) / (cells * step))
+    i, j = np.meshgrid(np.arange(cells) * step, np.arange(cells) * step, indexing='ij')
+    i, j = i.ravel(), j.ravel()
+    while True:
+        corners = _cell_corners(func, i, j, step, origin, delta)
+        active = (corners >= 0).any(axis=1) & (corners < 0).any(axis=1)
+        i, j, corners = i[active], j[active], corners[active]
+        if step == 1 or not i.size:
+            break
+        step //= 2
+        i = np.concatenate((i, i + step, i, i + step))
+        j = np.concatenate((j, j, j + step, j + step))
+
+    if i.size:
+        size = np.nanmax(np.abs(corners), axis=1)
+        keep = size <= POLE_RATIO * np.median(size)
+        i, j, corners = i[keep], j[keep], corners[keep]
+
+    # Marching squares: crossing point on each edge whose ends differ in sign
+    ends = (corners, np.roll(corners, -1, axis=1))
+    crossed = (ends[0] >= 0) != (ends[1] >= 0)
+    crossed &= np.isfinite(ends[0]) & np.isfinite(ends[1])
+    with np.errstate(all='ignore'):
+        t = ends[0] / (ends[0] - ends[1])
+    ci = np.stack((i, i + 1, i + 1, i), axis=1)
+    cj = np.stack((j, j, j + 1, j + 1), axis=1)
+    px = origin[0] + delta[0] * (ci + t * (np.roll(ci, -1, axis=1) - ci))
+    py = origin[1] + delta[1] * (cj + t * (np.roll(cj, -1, axis=1) - cj))
+    points = np.stack((px, py), axis=2)  # (n, edge, xy)
+
+    # Two crossings make one segment; four (a saddle) make two
+    order = np.argsort(~crossed, axis=1, kind='stable')
+    points = np.take_along_axis(points, order[:, :, np.newaxis], axis=1)
+    count = crossed.sum(axis=1)
+    segments = [points[count >= 2, 0:2], points[count == 4, 2:4]]
+    return np.concatenate(segments).reshape(-1, 2, 2)
+
+
+def sample_surface(func, x_min, x_max, y_min, y_max, columns, rows):
+    """Values of func(x, y) at cell centres: an array of rows x columns for imshow"""
+    columns = min(max(int(columns), 2), HEAT_SAMPLES)
+    rows = min(max(int(rows), 2), HEAT_SAMPLES)
+    x = x_min + (x_max - x_min) * (np.arange(columns) + 0.5) / columns
+    y = y_min + (y_max - y_min) * (np.arange(rows) + 0.5) / rows
+    z = np.array(func(x[np.newaxis, :], y[:, np.newaxis]), dtype=float)
+    z[~np.isfinite(z)] = np.nan
+    return z
+
+
+# Roots, extrema and intersections
+#
+# Each function is evaluated once on a uniform grid of ANALYSIS_SAMPLES
+# points. Sign changes of f bracket its roots, sign changes of its first
+# differences bracket its extrema, and sign changes of f - g bracket the
+# intersections of a pair. Every bracket is then refined at the same time:
+# roots by Illinois false position (one vectorized evaluation per step),
+# extrema by golden-section search. Refined points where |f| is not small
+# (a pole or a jump) or the value leaves the visible range are dropped.
+
+ANALYSIS_SAMPLES = 100001
+REFINE_STEPS = 60
+ROOT_TOLERANCE = 1e-9  # |f| at a root, as a fraction of the y-range
+ANALYSIS_LABELS = 20  # points annotated with their coordinates
+GOLDEN = (math.sqrt(5) - 1) / 2
+
+
+def _sign_changes(y):
+    """Indices i where y changes sign between y[i] and y[i + 1]"""
+    with np.errstate(invalid='ignore'):
+        return np.flatnonzero(y[:-1] * y[1:] < 0)
+
+
+def _refine_roots(func, a, b, fa, fb, steps=REFINE_STEPS):
+    """Illinois false position on every bracket [a, b] at once"""
+    a, b, fa, fb = a.copy(), b.copy(), fa.copy(), fb.copy()
+    side = np.zeros(a.shape, dtype=int)  # which end moved last: -1 left, 1 right
+    for _ in range(steps):
+        with np.errstate(all='ignore'):
+            c = (a * fb - b * fa) / (fb - fa)
+        c = np.where(np.isfinite(c) & (c > a) & (c < b), c, (a + b) / 2)
+        fc = np.asarray(func(c), dtype=float)
+        left = fa * fc < 0  # root in [a, c]: move b
+        b, fb = np.where(left, c, b), np.where(left, fc, fb)
+        a, fa = np.where(left, a, c), np.where(left, fa, fc)
+        # Halve the value at the end that stayed put twice in a row
+        fa = np.where(left & (side == 1), fa / 2, fa)
+        fb = np.where(~left & (side == -1), fb / 2, fb)
+        side = np.where(left, 1, -1)
+        if np.all((b - a) <= 4 * np.finfo(float).eps * np.maximum(np.abs(a), np.abs(b))):
+            break
+    return np.where(np.abs(fa) < np.abs(fb), a, b)
+
+
+def _refine_extrema(func, a, b, maximum, steps=REFINE_STEPS):
+    """Golden-section search on every bracket at once; maximum flags maxima"""
+    sign = np.where(maximum, -1.0, 1.0)  # search for the minimum of sign * f
+    c = b - GOLDEN * (b - a)
+    d = a + GOLDEN * (b - a)
+    fc, fd = sign * func(c), sign * func(d)
+    for _ in range(steps):
+        with np.errstate(invalid='ignore'):
+            lower = fc < fd
+        b = np.where(lower, d, b)
+        a = np.where(lower, a, c)
+        c, d = np.where(lower, b - GOLDEN * (b - a), d), np.where(lower, c, a + GOLDEN * (b - a))
+        fresh = np.where(lower, c, d)
+        value = sign * func(fresh)
+        fc, fd = np.where(lower, value, fd), np.where(lower, fc, value)
+    return (a + b) / 2
+
+
+def _grid_scale(y):
+    finite = y[np.isfinite(y)]
+    if finite.size < 2:
+        return 1.0, -np.inf, np.inf
+    low, high = np.percentile(finite, [2, 98])
+    scale = max(high - low, 1e-12 * max(abs(high), abs(low), 1.0))
+    return scale, low - SLOPE_RATIO * scale, high + SLOPE_RATIO * scale
+
+
+def _roots_of(func, x, y, scale):
+    zero = y == 0
+    zero[1:] &= ~zero[:-1]  # a run of zeros (floor(x) on [0, 1)) counts once, at its start
+    exact = x[zero]
+    index = _sign_changes(y)
+    roots = _refine_roots(func, x[index], x[index + 1], y[index], y[index + 1])
+    with np.errstate(invalid='ignore'):
+        roots = roots[np.abs(func(roots)) <= ROOT_TOLERANCE * scale]
+    return np.unique(np.concatenate((exact, roots)))
+
+
+def find_roots(func, x_min, x_max, samples=ANALYSIS_SAMPLES):
+    """x-coordinates where func crosses or touches zero on [x_min, x_max]"""
+    x = np.linspace(x_min, x_max, samples)
+    y = np.array(func(x), dtype=float)
+    return _roots_of(func, x, y, _grid_scale(y)[0])
+
+
+def find_extrema(func, x_min, x_max, samples=ANALYSIS_SAMPLES):
+    """(x, is_maximum) of the local extrema of func inside [x_min, x_max]"""
+    x = np.linspace(x_min, x_max, samples)
+    y = np.array(func(x), dtype=float)
+    scale, low, high = _grid_scale(y)
+    steps = np.diff(y)
+    steps[steps == 0] = np.nan  # plateaus are not extrema
+    index = _sign_changes(steps)
+    maximum = steps[index] > 0
+    found = _refine_extrema(func, x[index], x[index + 2], maximum)
+    values = np.asarray(func(found), dtype=float)
+    with np.errstate(invalid='ignore'):
+        keep = np.isfinite(values) & (values >= low) & (values <= high)
+    return found[keep], maximum[keep]
+
+
+def find_intersections(f, g, x_min, x_max, samples=ANALYSIS_SAMPLES):
+    """x-coordinates where the curves of f and g meet on [x_min, x_max]"""
+    x = np.linspace(x_min, x_max, samples)
+    fy = np.array(f(x), dtype=float)
+    scale = max(_grid_scale(fy)[0], _grid_scale(np.array(g(x), dtype=float))[0])
+    return _roots_of(lambda t: f(t) - g(t), x, fy - g(x), scale)
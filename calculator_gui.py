@@ -0,0 +1,1669 @@
+"""Tkinter window of the Ultimate Scientific Calculator.
+
+Started by scientific-calculator.py when it is run without arguments.
+"""
+import tkinter as tk
+from tkinter import ttk, messagebox, simpledialog
+import math
+import random
+import time
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+from matplotlib.collections import LineCollection
+
+import os
+from contextlib import contextmanager
+
+from calculator_core import CalculatorCore, column_to_list, data_dir
+from calculator_history import HistoryIndex, HistoryLog
+from calculator_memory import open_memory_bank
+from calculator_stats import STATS
+from calculator_worker import DigitJob, EvaluationWorker
+from calculator_graph import (
+    ANALYSIS_LABELS, MANY_CURVES, MAX_SAMPLES, GraphFamily, GraphFunction, PlaneFunction, TileCache,
+    block_segments, compile_graph_function, evaluate_block, find_extrema,
+    find_intersections, find_roots, sample_envelope, sample_surface, shared_grid,
+    trace_implicit)
+
+class UltimateCalculator:
+    def __init__(self, root):
+        self.root = root
+        self.root.title("Ultimate Scientific Calculator")
+        self.root.geometry("800x600")  # Reduced screen size
+        self.root.minsize(700, 500)
+        
+        # Custom color scheme
+        self.bg_color = "#2E3440"  # Dark blue-gray
+        self.display_bg = "#3B4252"  # Slightly lighter
+        self.display_fg = "#ECEFF4"  # Light gray
+        self.number_btn = "#4C566A"  # Medium gray-blue
+        self.number_fg = "#D8DEE9"  # Light gray
+        self.operation_btn = "#5E81AC"  # Blue
+        self.operation_fg = "#E5E9F0"  # Very light gray
+        self.function_btn = "#88C0D0"  # Light blue
+        self.function_fg = "#2E3440"  # Dark text
+        self.memory_btn = "#A3BE8C"  # Green
+        self.memory_fg = "#2E3440"  # Dark text
+        self.special_btn = "#BF616A"  # Red
+        self.special_fg = "#E5E9F0"  # Light text
+        self.equals_btn = "#D08770"  # Orange
+        self.equals_fg = "#2E3440"  # Dark text
+        
+        # Headless calculator state; the GUI renders it and forwards input
+        history_log = self.open_history_log()
+        self.core = CalculatorCore(
+            history_log=history_log,
+            history_index=HistoryIndex(history_log) if history_log is not None else None,
+            memory_bank=open_memory_bank(os.path.join(data_dir(), 'memory.bin')))
+        self.core.history_listeners.append(self.on_history_added)
+        if self.core.history_index is not None:
+            self.core.history_index.prepare()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.bind('<Escape>', lambda event: self.cancel_background_work())
+        self.digit_job = None
+        self.digit_chunks = []
+        # Expressions are evaluated off the Tk thread with time/memory budgets
+        self.evaluation_worker = EvaluationWorker()
+        self.evaluation_job = None
+        
+        # Configure root background
+        self.root.configure(bg=self.bg_color)
+        
+        # Style configuration
+        self.style = ttk.Style()
+        self.style.theme_use('clam')  # Provides better theming options
+        
+        # Configure the main frames
+        self.style.configure('TFrame', background=self.bg_color)
+        
+        # Configure entry style
+        self.style.configure('Calculator.TEntry', 
+                            font=('Helvetica', 24),
+                            foreground=self.display_fg,
+                            background=self.display_bg,
+                            borderwidth=0,
+                            relief='flat',
+                            padding=10)
+        
+        # Configure label styles
+        self.style.configure('Title.TLabel', 
+                           font=('Helvetica', 16, 'bold'),
+                           foreground=self.display_fg,
+                           background=self.bg_color)
+        self.style.configure('Memory.TLabel',
+                           font=('Helvetica', 10),
+                           foreground=self.display_fg,
+                           background=self.bg_color)
+        
+        # Configure button styles for different categories
+        # Number buttons
+        self.style.configure('Number.TButton',
+                           font=('Helvetica', 14, 'bold'),
+                           foreground=self.number_fg,
+                           background=self.number_btn,
+                           borderwidth=1,
+                           relief='raised',
+                           padding=5)
+        
+        # Operation buttons
+        self.style.configure('Operation.TButton',
+                           font=('Helvetica', 14, 'bold'),
+                           foreground=self.operation_fg,
+                           background=self.operation_btn,
+                           borderwidth=1,
+                           relief='raised',
+                           padding=5)
+        
+        # Function buttons
+        self.style.configure('Function.TButton',
+                           font=('Helvetica', 12),
+                           foreground=self.function_fg,
+                           background=self.function_btn,
+                           borderwidth=1,
+                           relief='raised',
+                           padding=5)
+        
+        # Memory buttons
+        self.style.configure('Memory.TButton',
+                           font=('Helvetica', 10),
+                           foreground=self.memory_fg,
+                           background=self.memory_btn,
+                           borderwidth=1,
+                           relief='raised',
+                           padding=3)
+        
+        # Special buttons (clear, delete, etc.)
+        self.style.configure('Special.TButton',
+                           font=('Helvetica', 12),
+                           foreground=self.special_fg,
+                           background=self.special_btn,
+                           borderwidth=1,
+                           relief='raised',
+                           padding=5)
+        
+        # Equals button
+        self.style.configure('Equals.TButton',
+                           font=('Helvetica', 14, 'bold'),
+                           foreground=self.equals_fg,
+                           background=self.equals_btn,
+                           borderwidth=1,
+                           relief='raised',
+                           padding=5)
+        
+        # Notebook style
+        self.style.configure('TNotebook', background=self.bg_color)
+        self.style.configure('TNotebook.Tab', 
+                           font=('Helvetica', 10),
+                           foreground=self.display_fg,
+                           background=self.bg_color,
+                           padding=[10, 5])
+        self.style.map('TNotebook.Tab', 
+                      background=[('selected', self.display_bg)],
+                      foreground=[('selected', self.display_fg)])
+        
+        # Create notebook for tabs
+        self.notebook = ttk.Notebook(root)
+        self.notebook.pack(expand=True, fill='both')
+        
+        # Calculator tab
+        self.create_calculator_tab()
+        
+        # Graphing tab
+        self.create_graphing_tab()
+        
+        # Games tab
+        self.create_games_tab()
+        
+        # History tab
+        self.create_history_tab()
+        
+        # Stats tab
+        self.create_stats_tab()
+        
+        # Initialize variables
+        self.graph_functions = []
+        self.compiled_functions = []  # vectorized callables, parallel to graph_functions
+        self.function_lines = []  # Line2D, LineCollection (family, implicit) or image, per function
+        self.function_tiles = []  # per-function TileCache of sampled x-tiles (None for the others)
+        self.analysis_artists = []  # markers and labels from the last Analyse
+        self.crowd_lines = None  # one LineCollection drawing y = f(x) curves past MANY_CURVES
+        self.crowd_members = []  # function index of each crowd_lines segment
+        
+    def create_calculator_tab(self):
+        """Create the calculator tab with scientific functions"""
+        calc_frame = ttk.Frame(self.notebook)
+        self.notebook.add(calc_frame, text="Calculator")
+        
+        # Configure grid weights for responsive layout
+        for i in range(14):
+            calc_frame.grid_rowconfigure(i, weight=1)
+        for i in range(6):
+            calc_frame.grid_columnconfigure(i, weight=1)
+        
+        # Display
+        self.entry_var = tk.StringVar()
+        entry = ttk.Entry(calc_frame, textvariable=self.entry_var, 
+                         style='Calculator.TEntry', justify='right')
+        entry.grid(row=0, column=0, columnspan=6, sticky='nsew', padx=5, pady=5)
+        # Pasted text, such as a column of numbers, goes into the expression
+        entry.bind('<<Paste>>', self.paste_expression)
+        
+        # Memory display
+        self.memory_var = tk.StringVar()
+        memory_label = ttk.Label(calc_frame, textvariable=self.memory_var,
+                               style='Memory.TLabel')
+        memory_label.grid(row=1, column=0, columnspan=6, sticky='w', padx=5)
+        
+        # Modular mode indicator
+        self.mode_var = tk.StringVar(value="")
+        mode_label = ttk.Label(calc_frame, textvariable=self.mode_var,
+                             style='Memory.TLabel')
+        mode_label.grid(row=1, column=0, columnspan=6, sticky='e', padx=5)
+        
+        # Memory buttons
+        mem_buttons = [
+            ('MC', 2, 0, 'Memory.TButton'), 
+            ('MR', 2, 1, 'Memory.TButton'), 
+            ('M+', 2, 2, 'Memory.TButton'), 
+            ('M-', 2, 3, 'Memory.TButton'), 
+            ('MS', 2, 4, 'Memory.TButton'), 
+            ('M▷', 2, 5, 'Memory.TButton'),
+        ]
+        
+        # Bulk memory operations, and the slot the memory keys act on
+        mem_buttons += [
+            ('MC all', 13, 0, 'Memory.TButton'),
+            ('M+ all', 13, 1, 'Memory.TButton'),
+            ('MΣ', 13, 2, 'Memory.TButton'),
+            ('Mx̄', 13, 3, 'Memory.TButton'),
+        ]
+        
+        for (text, row, col, style) in mem_buttons:
+            button = ttk.Button(calc_frame, text=text, style=style,
+                              command=lambda t=text: self.memory_operation(t))
+            button.grid(row=row, column=col, sticky='nsew', padx=2, pady=2)
+        
+        slots = [f"M{slot + 1}" for slot in range(len(self.core.memory_bank))]
+        self.memory_slot_var = tk.StringVar(value=slots[0])
+        slot_box = ttk.Spinbox(calc_frame, values=slots, textvariable=self.memory_slot_var,
+                               state='readonly', wrap=True, width=5,
+                               command=self.select_memory_slot)
+        slot_box.grid(row=13, column=4, columnspan=2, sticky='nsew', padx=2, pady=2)
+        self.update_memory_label()
+        
+        # Scientific buttons with their styles
+        sci_buttons = [
+            ('sin', 3, 0, 'Function.TButton'), ('cos', 3, 1, 'Function.TButton'), 
+            ('tan', 3, 2, 'Function.TButton'), ('π', 3, 3, 'Function.TButton'), 
+            ('e', 3, 4, 'Function.TButton'), ('⌫', 3, 5, 'Special.TButton'),
+            ('asin', 4, 0, 'Function.TButton'), ('acos', 4, 1, 'Function.TButton'), 
+            ('atan', 4, 2, 'Function.TButton'), ('x²', 4, 3, 'Function.TButton'), 
+            ('x^y', 4, 4, 'Function.TButton'), ('C', 4, 5, 'Special.TButton'),
+            ('sinh', 5, 0, 'Function.TButton'), ('cosh', 5, 1, 'Function.TButton'), 
+            ('tanh', 5, 2, 'Function.TButton'), ('√x', 5, 3, 'Function.TButton'), 
+            ('10^x', 5, 4, 'Function.TButton'), ('CE', 5, 5, 'Special.TButton'),
+            ('log', 6, 0, 'Function.TButton'), ('ln', 6, 1, 'Function.TButton'), 
+            ('x!', 6, 2, 'Function.TButton'), ('1/x', 6, 3, 'Function.TButton'), 
+            ('e^x', 6, 4, 'Function.TButton'), ('±', 6, 5, 'Function.TButton'),
+            ('(', 7, 0, 'Function.TButton'), (')', 7, 1, 'Function.TButton'), 
+            ('Rand', 7, 2, 'Function.TButton'), ('|x|', 7, 3, 'Function.TButton'), 
+            ('mod', 7, 4, 'Function.TButton'), ('=', 7, 5, 'Equals.TButton'),
+            ('7', 8, 0, 'Number.TButton'), ('8', 8, 1, 'Number.TButton'), 
+            ('9', 8, 2, 'Number.TButton'), ('+', 8, 3, 'Operation.TButton'), 
+            ('Hex', 8, 4, 'Function.TButton'), ('Bin', 8, 5, 'Function.TButton'),
+            ('4', 9, 0, 'Number.TButton'), ('5', 9, 1, 'Number.TButton'), 
+            ('6', 9, 2, 'Number.TButton'), ('-', 9, 3, 'Operation.TButton'), 
+            ('Deg', 9, 4, 'Function.TButton'), ('Rad', 9, 5, 'Function.TButton'),
+            ('1', 10, 0, 'Number.TButton'), ('2', 10, 1, 'Number.TButton'), 
+            ('3', 10, 2, 'Number.TButton'), ('*', 10, 3, 'Operation.TButton'), 
+            ('F-E', 10, 4, 'Function.TButton'), ('Hist', 10, 5, 'Function.TButton'),
+            ('0', 11, 0, 'Number.TButton'), ('.', 11, 1, 'Number.TButton'), 
+            ('%', 11, 2, 'Number.TButton'), ('/', 11, 3, 'Operation.TButton'), 
+            ('(', 11, 4, 'Function.TButton'), (')', 11, 5, 'Function.TButton'),
+            ('Mod m', 12, 0, 'Memory.TButton'), ('inv', 12, 1, 'Function.TButton'),
+            ('gcd', 12, 2, 'Function.TButton'), ('lcm', 12, 3, 'Function.TButton'),
+            ('crt', 12, 4, 'Function.TButton'), (',', 12, 5, 'Number.TButton'),
+        ]
+        
+        # Create buttons with appropriate styles
+        for (text, row, col, style) in sci_buttons:
+            button = ttk.Button(calc_frame, text=text, style=style,
+                              command=lambda t=text: self.on_button_click(t))
+            button.grid(row=row, column=col, sticky='nsew', padx=2, pady=2)
+    
+    def create_graphing_tab(self):
+        """Create the graphing tab with function plotting"""
+        graph_frame = ttk.Frame(self.notebook)
+        self.notebook.add(graph_frame, text="Graphing")
+        
+        # Configure grid weights
+        graph_frame.grid_rowconfigure(1, weight=1)
+        graph_frame.grid_columnconfigure(0, weight=1)
+        
+        # Graph controls
+        control_frame = ttk.Frame(graph_frame)
+        control_frame.grid(row=0, column=0, sticky='nsew', padx=5, pady=5)
+        
+        # Style for graph controls
+        self.style.configure('Graph.TLabel',
+                           font=('Helvetica', 10),
+                           foreground=self.display_fg,
+                           background=self.bg_color)
+        
+        self.style.configure('Graph.TEntry',
+                           font=('Helvetica', 10),
+                           foreground=self.function_fg,
+                           background=self.display_bg,
+                           borderwidth=1,
+                           relief='sunken',
+                           padding=3)
+        
+        self.style.configure('Graph.TButton',
+                           font=('Helvetica', 10),
+                           foreground=self.function_fg,
+                           background=self.function_btn,
+                           borderwidth=1,
+                           relief='raised',
+                           padding=3)
+        
+        ttk.Label(control_frame, text="Function:", style='Graph.TLabel').grid(row=0, column=0, padx=5)
+        self.function_entry = ttk.Entry(control_frame, style='Graph.TEntry', width=30)
+        self.function_entry.grid(row=0, column=1, padx=5)
+        
+        ttk.Label(control_frame, text="X min:", style='Graph.TLabel').grid(row=0, column=2, padx=5)
+        self.xmin_entry = ttk.Entry(control_frame, style='Graph.TEntry', width=8)
+        self.xmin_entry.insert(0, "-10")
+        self.xmin_entry.grid(row=0, column=3, padx=5)
+        
+        ttk.Label(control_frame, text="X max:", style='Graph.TLabel').grid(row=0, column=4, padx=5)
+        self.xmax_entry = ttk.Entry(control_frame, style='Graph.TEntry', width=8)
+        self.xmax_entry.insert(0, "10")
+        self.xmax_entry.grid(row=0, column=5, padx=5)
+        
+        # Samples per curve: 'Auto' samples adaptively, a number evaluates that
+        # many points and draws their per-pixel min/max envelope
+        ttk.Label(control_frame, text="Samples:", style='Graph.TLabel').grid(row=0, column=6, padx=5)
+        self.samples_entry = ttk.Combobox(control_frame, width=9,
+                                          values=('Auto', '10000', '100000', '1000000', '10000000'))
+        self.samples_entry.set('Auto')
+        self.samples_entry.grid(row=0, column=7, padx=5)
+        
+        # Redraw with the new range or resolution when it is confirmed
+        self.xmin_entry.bind('<Return>', lambda event: self.redraw_graph())
+        self.xmax_entry.bind('<Return>', lambda event: self.redraw_graph())
+        self.samples_entry.bind('<Return>', lambda event: self.redraw_graph())
+        self.samples_entry.bind('<<ComboboxSelected>>', lambda event: self.redraw_graph())
+        
+        plot_button = ttk.Button(control_frame, text="Plot", style='Graph.TButton', 
+                               command=self.plot_function)
+        plot_button.grid(row=0, column=8, padx=5)
+        
+        clear_button = ttk.Button(control_frame, text="Clear", style='Graph.TButton',
+                                command=self.clear_graph)
+        clear_button.grid(row=0, column=9, padx=5)
+        
+        # Matplotlib figure with dark theme
+        plt.style.use('dark_background')
+        self.figure = plt.Figure(figsize=(5, 4), dpi=100)
+        self.ax = self.figure.add_subplot(111)
+        self.ax.set_facecolor('#3B4252')  # Match the dark theme
+        self.figure.patch.set_facecolor(self.bg_color)
+        
+        self.canvas = FigureCanvasTkAgg(self.figure, graph_frame)
+        self.canvas.get_tk_widget().grid(row=1, column=0, sticky='nsew', padx=5, pady=5)
+        # Time every render, including the deferred ones behind draw_idle()
+        self.untimed_canvas_draw = self.canvas.draw
+        self.canvas.draw = self.timed_canvas_draw
+        self.resample_pending = False
+        self.resample_suppressed = False
+        self.setup_axes()
+        
+        # Zoom/pan toolbar; new x-limits trigger a resample of the visible range
+        toolbar_frame = ttk.Frame(graph_frame)
+        toolbar_frame.grid(row=4, column=0, sticky='ew', padx=5)
+        self.toolbar = NavigationToolbar2Tk(self.canvas, toolbar_frame, pack_toolbar=False)
+        self.toolbar.update()
+        self.toolbar.pack(side='left', fill='x')
+        
+        # Function list
+        list_frame = ttk.Frame(graph_frame)
+        list_frame.grid(row=2, column=0, sticky='nsew', padx=5, pady=5)
+        
+        self.function_listbox = tk.Listbox(list_frame, 
+                                         height=5,
+                                         bg=self.display_bg,
+                                         fg=self.display_fg,
+                                         selectbackground=self.operation_btn,
+                                         selectforeground=self.operation_fg,
+                                         font=('Courier', 10))
+        self.function_listbox.pack(side='left', fill='both', expand=True)
+        
+        scrollbar = ttk.Scrollbar(list_frame, orient='vertical')
+        scrollbar.pack(side='right', fill='y')
+        self.function_listbox.config(yscrollcommand=scrollbar.set)
+        scrollbar.config(command=self.function_listbox.yview)
+        
+        # Function list controls
+        list_control_frame = ttk.Frame(graph_frame)
+        list_control_frame.grid(row=3, column=0, sticky='ew', padx=5, pady=5)
+        
+        ttk.Button(list_control_frame, text="Remove", style='Graph.TButton',
+                  command=self.remove_function).pack(side='left', padx=5)
+        ttk.Button(list_control_frame, text="Analyse", style='Graph.TButton',
+                  command=self.analyse_functions).pack(side='left', padx=5)
+        ttk.Button(list_control_frame, text="Save Graph", style='Graph.TButton',
+                  command=self.save_graph).pack(side='left', padx=5)
+    
+    def create_games_tab(self):
+        """Create the games tab with simple math games"""
+        games_frame = ttk.Frame(self.notebook)
+        self.notebook.add(games_frame, text="Games")
+        
+        # Game selection
+        game_choice_frame = ttk.Frame(games_frame)
+        game_choice_frame.pack(fill='x', padx=10, pady=10)
+        
+        ttk.Label(game_choice_frame, text="Select Game:", style='Title.TLabel').pack(side='left', padx=5)
+        
+        self.game_var = tk.StringVar(value="math_quiz")
+        
+        # Style for radio buttons
+        self.style.configure('Game.TRadiobutton',
+                           font=('Helvetica', 10),
+                           foreground=self.display_fg,
+                           background=self.bg_color)
+        
+        games = [
+            ("Math Quiz", "math_quiz"),
+            ("Number Guesser", "number_guesser"),
+            ("Equation Solver", "equation_solver"),
+            ("Graph Challenge", "graph_challenge")
+        ]
+        
+        for text, mode in games:
+            ttk.Radiobutton(game_choice_frame, text=text, variable=self.game_var, 
+                           value=mode, style='Game.TRadiobutton').pack(side='left', padx=5)
+        
+        # Game display area
+        self.game_display = ttk.Frame(games_frame)
+        self.game_display.pack(expand=True, fill='both', padx=10, pady=10)
+        
+        # Start game button
+        ttk.Button(games_frame, text="Start Game", style='Operation.TButton',
+                  command=self.start_game).pack(pady=10)
+    
+    def create_stats_tab(self):
+        """Create the stats tab with per-stage timings and counters"""
+        stats_frame = ttk.Frame(self.notebook)
+        self.notebook.add(stats_frame, text="Stats")
+        
+        stats_frame.grid_rowconfigure(0, weight=1)
+        stats_frame.grid_columnconfigure(0, weight=1)
+        
+        columns = ('count', 'mean', 'p50', 'p90', 'p99', 'max')
+        self.stats_tree = ttk.Treeview(stats_frame, columns=columns)
+        self.stats_tree.heading('#0', text="Stage")
+        self.stats_tree.column('#0', width=200)
+        for column in columns:
+            self.stats_tree.heading(column, text=column)
+            self.stats_tree.column(column, width=80, anchor='e')
+        self.stats_tree.grid(row=0, column=0, sticky='nsew', padx=5, pady=5)
+        
+        scrollbar = ttk.Scrollbar(stats_frame, orient='vertical', command=self.stats_tree.yview)
+        scrollbar.grid(row=0, column=1, sticky='ns')
+        self.stats_tree.configure(yscrollcommand=scrollbar.set)
+        
+        control_frame = ttk.Frame(stats_frame)
+        control_frame.grid(row=1, column=0, columnspan=2, sticky='ew', padx=5, pady=5)
+        
+        ttk.Button(control_frame, text="Refresh", style='Memory.TButton',
+                  command=self.refresh_stats).pack(side='left', padx=5)
+        ttk.Button(control_frame, text="Reset", style='Memory.TButton',
+                  command=self.reset_stats).pack(side='left', padx=5)
+        ttk.Button(control_frame, text="Export JSON", style='Memory.TButton',
+                  command=lambda: self.export_stats('json')).pack(side='left', padx=5)
+        ttk.Button(control_frame, text="Export CSV", style='Memory.TButton',
+                  command=lambda: self.export_stats('csv')).pack(side='left', padx=5)
+        
+        self.stats_enabled_var = tk.BooleanVar(value=STATS.enabled)
+        ttk.Checkbutton(control_frame, text="Collect", variable=self.stats_enabled_var,
+                       command=self.toggle_stats).pack(side='left', padx=5)
+        
+        self.notebook.bind('<<NotebookTabChanged>>', lambda event: self.refresh_stats())
+    
+    def create_history_tab(self):
+        """Create the history tab to show previous calculations"""
+        history_frame = ttk.Frame(self.notebook)
+        self.notebook.add(history_frame, text="History")
+        
+        # Configure grid weights
+        history_frame.grid_rowconfigure(1, weight=1)
+        history_frame.grid_columnconfigure(0, weight=1)
+        
+        # Search box; queries run against the indexed on-disk history
+        search_frame = ttk.Frame(history_frame)
+        search_frame.grid(row=0, column=0, sticky='ew', padx=5, pady=5)
+        
+        ttk.Label(search_frame, text="Search:", style='Memory.TLabel').pack(side='left', padx=5)
+        self.history_search_entry = ttk.Entry(search_frame, width=30)
+        self.history_search_entry.pack(side='left', padx=5)
+        self.history_search_entry.bind('<Return>', lambda event: self.search_history())
+        ttk.Button(search_frame, text="Search", style='Memory.TButton',
+                  command=self.search_history).pack(side='left', padx=5)
+        ttk.Button(search_frame, text="Show Recent", style='Memory.TButton',
+                  command=self.show_recent_history).pack(side='left', padx=5)
+        self.history_status_var = tk.StringVar(value="e.g. sin, between 1e3 and 1e4, >= 0")
+        ttk.Label(search_frame, textvariable=self.history_status_var,
+                 style='Memory.TLabel').pack(side='left', padx=5)
+        self.history_search_active = False
+        
+        # History listbox with scrollbar
+        list_frame = ttk.Frame(history_frame)
+        list_frame.grid(row=1, column=0, sticky='nsew', padx=5, pady=5)
+        
+        self.history_listbox = tk.Listbox(
+            list_frame, 
+            yscrollcommand=ttk.Scrollbar(list_frame).set,
+            bg=self.display_bg,
+            fg=self.display_fg,
+            selectbackground=self.operation_btn,
+            selectforeground=self.operation_fg,
+            font=('Courier', 12),
+            height=25
+        )
+        self.history_listbox.pack(side='left', fill='both', expand=True)
+        
+        scrollbar = ttk.Scrollbar(list_frame, orient='vertical')
+        scrollbar.pack(side='right', fill='y')
+        self.history_listbox.config(yscrollcommand=scrollbar.set)
+        scrollbar.config(command=self.history_listbox.yview)
+        
+        # Recent entries carried over from earlier sessions
+        if self.core.history:
+            self.history_listbox.insert(tk.END, *self.core.history)
+        
+        # History controls
+        control_frame = ttk.Frame(history_frame)
+        control_frame.grid(row=2, column=0, sticky='ew', padx=5, pady=5)
+        
+        ttk.Button(control_frame, text="Copy Selected", style='Memory.TButton',
+                  command=self.copy_history_item).pack(side='left', padx=5)
+        ttk.Button(control_frame, text="Clear History", style='Memory.TButton',
+                  command=self.clear_history).pack(side='left', padx=5)
+        ttk.Button(control_frame, text="Save History", style='Memory.TButton',
+                  command=self.save_history).pack(side='left', padx=5)
+
+    # [Rest of the methods remain exactly the same as in your original code]
+    # All the calculator functions, graphing functions, and game functions
+    # remain unchanged - I've only added styling to the UI components
+
+    def on_button_click(self, button_text):
+        # [Previous implementation remains exactly the same]
+        if self.evaluation_job is not None and button_text not in ('C', 'CE'):
+            return  # busy; C, CE or Esc cancels
+        if button_text == 'C':
+            self.clear()
+        elif button_text == 'CE':
+            self.clear_entry()
+        elif button_text == '⌫':
+            self.backspace()
+        elif button_text == '=':
+            self.evaluate()
+        elif button_text == 'π':
+            self.add_to_expression(str(math.pi))
+        elif button_text == 'e':
+            self.add_to_expression(str(math.e))
+        elif button_text == '±':
+            self.negate()
+        elif button_text == 'x²':
+            self.add_to_expression('**2')
+            self.evaluate()
+        elif button_text == 'x^y':
+            self.add_to_expression('**')
+        elif button_text == 'x!':
+            self.factorial()
+        elif button_text == '1/x':
+            self.reciprocal()
+        elif button_text == '√x':
+            self.add_to_expression('math.sqrt(')
+        elif button_text == '10^x':
+            self.add_to_expression('10**')
+        elif button_text == 'e^x':
+            self.add_to_expression('math.exp(')
+        elif button_text == '|x|':
+            self.add_to_expression('abs(')
+        elif button_text == 'mod':
+            self.add_to_expression('%')
+        elif button_text == 'Rand':
+            self.add_to_expression(str(random.random()))
+        elif button_text == 'Deg':
+            self.core.set_angle_mode('deg')
+            messagebox.showinfo("Angle Mode", "Angle mode set to Degrees")
+        elif button_text == 'Rad':
+            self.core.set_angle_mode('rad')
+            messagebox.showinfo("Angle Mode", "Angle mode set to Radians")
+        elif button_text == 'F-E':
+            self.toggle_number_format()
+        elif button_text == 'Hex':
+            self.convert_to_hex()
+        elif button_text == 'Bin':
+            self.convert_to_bin()
+        elif button_text == 'Hist':
+            self.notebook.select(3)  # Switch to history tab
+        elif button_text == 'Mod m':
+            self.set_modular_mode()
+        elif button_text == 'inv':
+            self.add_to_expression('modinv(')
+        elif button_text in ['sin', 'cos', 'tan', 'asin', 'acos', 'atan', 'sinh', 'cosh', 'tanh', 'log', 'ln',
+                             'gcd', 'lcm', 'crt']:
+            self.add_to_expression(f'{button_text}(')
+        else:
+            self.add_to_expression(button_text)
+    
+    def set_modular_mode(self):
+        """Ask for a modulus to reduce results by; 0 returns to ordinary arithmetic"""
+        modulus = simpledialog.askinteger(
+            "Modular Mode", "Modulus (0 for ordinary arithmetic):",
+            initialvalue=self.core.modulus or 0, minvalue=0, parent=self.root)
+        if modulus is None:
+            return
+        try:
+            self.core.set_modulus(modulus or None)
+        except ValueError as e:
+            messagebox.showerror("Modular Mode", str(e))
+            return
+        self.mode_var.set(f"mod {modulus}" if modulus else "")
+    
+    def memory_operation(self, op):
+        """Forward a memory button to the core and refresh the memory display"""
+        try:
+            if op == 'M▷':  # Memory Show
+                self.notebook.select(3)  # History tab
+                for slot, value in enumerate(self.core.memory_bank.values()):
+                    self.history_listbox.insert(tk.END, f"Memory M{slot + 1}: {value}")
+            else:
+                self.core.memory_operation(op, self.entry_var.get())
+                self.refresh_display()
+            
+            self.update_memory_label()
+        except:
+            messagebox.showerror("Error", "Invalid memory operation")
+    
+    def select_memory_slot(self):
+        self.core.select_memory_slot(int(self.memory_slot_var.get()[1:]) - 1)
+        self.update_memory_label()
+    
+    def update_memory_label(self):
+        self.memory_var.set(f"Memory M{self.core.memory_slot + 1}: {self.core.memory}")
+    
+    def refresh_display(self):
+        """Show the core's display text in the entry"""
+        self.entry_var.set(self.core.display)
+    
+    def add_to_expression(self, value):
+        self.core.add_to_expression(value)
+        self.refresh_display()
+    
+    def paste_expression(self, event=None):
+        """Append the clipboard; a list of numbers becomes an array literal"""
+        try:
+            text = self.root.clipboard_get()
+        except tk.TclError:
+            return 'break'
+        self.add_to_expression(column_to_list(text) or ' '.join(text.split()))
+        return 'break'
+    
+    def clear(self):
+        self.cancel_background_work()
+        self.core.clear()
+        self.refresh_display()
+    
+    def clear_entry(self):
+        self.cancel_background_work()
+        self.core.clear()
+        self.refresh_display()
+    
+    def backspace(self):
+        self.core.backspace()
+        self.refresh_display()
+    
+    def negate(self):
+        self.core.negate()
+        self.refresh_display()
+    
+    def factorial(self):
+        self.core.factorial()
+        self.refresh_display()
+    
+    def reciprocal(self):
+        self.core.reciprocal()
+        self.refresh_display()
+    
+    def toggle_number_format(self):
+        """F-E: switch notation, or fetch exact digits of an approximate result"""
+        if self.core.exact_request is not None:
+            self.request_exact_digits()
+            return
+        self.core.toggle_number_format(self.entry_var.get())
+        self.refresh_display()
+    
+    def request_exact_digits(self):
+        """Compute the exact digits of the displayed result in the background"""
+        self.cancel_digit_job()
+        self.digit_job = DigitJob(self.core.exact_request)
+        self.digit_chunks = []
+        self.entry_var.set("Computing exact digits... (Esc to cancel)")
+        self.root.after(50, self.poll_digit_job)
+    
+    def poll_digit_job(self):
+        """Stream finished digit chunks into the display"""
+        job = self.digit_job
+        if job is None:
+            return
+        chunks = job.poll()
+        if chunks:
+            self.digit_chunks.extend(chunks)
+            self.entry_var.set(''.join(self.digit_chunks))
+        if not job.done:
+            self.root.after(50, self.poll_digit_job)
+            return
+        self.digit_job = None
+        if job.error:
+            self.entry_var.set(f"Error: {job.error}")
+        else:
+            self.core.show_exact(''.join(self.digit_chunks))
+            self.refresh_display()
+        self.digit_chunks = []
+    
+    def cancel_digit_job(self):
+        """Stop a running exact-digits computation and restore the approximation"""
+        if self.digit_job is None:
+            return
+        self.digit_job.cancel()
+        self.digit_job = None
+        self.digit_chunks = []
+        self.refresh_display()
+    
+    def convert_to_hex(self):
+        self.core.convert_to_hex(self.entry_var.get())
+        self.refresh_display()
+    
+    def convert_to_bin(self):
+        self.core.convert_to_bin(self.entry_var.get())
+        self.refresh_display()
+    
+    def evaluate(self):
+        """Evaluate the current expression in the background worker"""
+        self.cancel_digit_job()
+        self.evaluation_job = self.evaluation_worker.submit(
+            self.core.current_expression, self.core.angle_mode, self.core.modulus)
+        # Most expressions finish within a few milliseconds; only show the
+        # busy indicator for those that do not
+        if self.evaluation_job.poll(wait=0.02):
+            self.finish_evaluation()
+        else:
+            self.poll_evaluation()
+    
+    def poll_evaluation(self):
+        """Check on the running evaluation and keep the busy indicator current"""
+        job = self.evaluation_job
+        if job is None:
+            return
+        if job.poll():
+            self.finish_evaluation()
+            return
+        self.entry_var.set(f"Evaluating... {job.elapsed:.0f} s (Esc to cancel)")
+        self.root.after(50, self.poll_evaluation)
+    
+    def finish_evaluation(self):
+        """Post the finished job's result to the core and the display"""
+        job, self.evaluation_job = self.evaluation_job, None
+        STATS.record('evaluate.round_trip', job.elapsed)
+        if job.error is None:
+            self.core.finish_evaluation(job.expression, job.result)
+        elif job.error == "Cancelled":
+            pass
+        elif job.error.startswith(("Timed out", "Out of memory", "Worker stopped")):
+            self.core.fail_evaluation(job.expression, f"Error: {job.error}")
+        else:
+            self.core.fail_evaluation(job.expression)
+        with STATS.time('evaluate.display'):
+            self.refresh_display()
+    
+    def cancel_evaluation(self):
+        """Abandon a running evaluation, leaving the expression as it was"""
+        if self.evaluation_job is None:
+            return
+        self.evaluation_job.cancel()
+        self.finish_evaluation()
+    
+    def cancel_background_work(self):
+        self.cancel_evaluation()
+        self.cancel_digit_job()
+    
+    def add_to_history(self, item):
+        self.core.add_to_history(item)
+    
+    def on_history_added(self, item, evicted):
+        """Mirror a new core history entry into the history listbox"""
+        if self.history_search_active:
+            return
+        with STATS.time('history.listbox'):
+            self.history_listbox.insert(tk.END, item)
+            if evicted:
+                self.history_listbox.delete(0, evicted - 1)
+    
+    def search_history(self):
+        """Show the history entries matching the search box, newest first"""
+        query = self.history_search_entry.get().strip()
+        if not query:
+            self.show_recent_history()
+            return
+        start = time.perf_counter()
+        results = self.core.search_history(query)
+        elapsed = (time.perf_counter() - start) * 1000
+        
+        self.history_search_active = True
+        self.history_listbox.delete(0, tk.END)
+        if results:
+            self.history_listbox.insert(tk.END, *results)
+        self.history_status_var.set(f"{len(results)} matches in {elapsed:.1f} ms")
+    
+    def show_recent_history(self):
+        """Leave search results and list the recent history again"""
+        self.history_search_active = False
+        self.history_listbox.delete(0, tk.END)
+        if self.core.history:
+            self.history_listbox.insert(tk.END, *self.core.history)
+        self.history_status_var.set("")
+    
+    def open_history_log(self):
+        """Open the on-disk history log, or run without one if it is unavailable"""
+        try:
+            return HistoryLog(os.path.join(data_dir(), 'history.log'))
+        except OSError:
+            return None
+    
+    def refresh_stats(self):
+        """Show the current counters and stage timings in the stats tab"""
+        self.stats_tree.delete(*self.stats_tree.get_children())
+        for kind, name, count, *timings in STATS.rows():
+            if kind == 'timer':
+                values = [count] + [f"{seconds * 1000:.3f} ms" for seconds in timings]
+            else:
+                values = [count] + [''] * len(timings)
+            self.stats_tree.insert('', tk.END, text=name, values=values)
+    
+    def reset_stats(self):
+        STATS.reset()
+        self.refresh_stats()
+    
+    def toggle_stats(self):
+        STATS.enabled = bool(self.stats_enabled_var.get())
+    
+    def export_stats(self, fmt):
+        """Write the stats as JSON or CSV to a file named by the user"""
+        try:
+            file_path = simpledialog.askstring("Export Stats", "Enter file name (without extension):")
+            if file_path:
+                text = STATS.to_json() if fmt == 'json' else STATS.to_csv()
+                with open(f"{file_path}.{fmt}", 'w', newline='') as f:
+                    f.write(text)
+                messagebox.showinfo("Success", f"Stats saved as {file_path}.{fmt}")
+        except OSError as e:
+            messagebox.showerror("Error", f"Could not export stats: {e}")
+    
+    def on_close(self):
+        """Persist the history search index and memory before the window goes away"""
+        self.cancel_background_work()
+        self.evaluation_worker.close()
+        try:
+            if self.core.history_index is not None:
+                self.core.history_index.save()
+            if self.core.history_log is not None:
+                self.core.history_log.close()
+            self.core.memory_bank.close()
+        except OSError:
+            pass
+        self.root.destroy()
+    
+    def copy_history_item(self):
+        # [Previous implementation remains exactly the same]
+        try:
+            selection = self.history_listbox.get(self.history_listbox.curselection())
+            self.root.clipboard_clear()
+            self.root.clipboard_append(selection)
+        except:
+            pass
+    
+    def clear_history(self):
+        if not messagebox.askyesno("Clear History",
+                                   "Delete every saved calculation? This cannot be undone."):
+            return
+        self.core.clear_history()
+        self.history_search_active = False
+        self.history_listbox.delete(0, tk.END)
+    
+    def save_history(self):
+        # [Previous implementation remains exactly the same]
+        try:
+            self.core.save_history('calculator_history.txt')
+            messagebox.showinfo("Success", "History saved to calculator_history.txt")
+        except:
+            messagebox.showerror("Error", "Could not save history")
+    
+    # Graphing functions
+    def get_x_range(self):
+        """Read and validate the X min/X max entries"""
+        x_min = float(self.xmin_entry.get())
+        x_max = float(self.xmax_entry.get())
+        if x_min >= x_max:
+            raise ValueError("X min must be less than X max")
+        return x_min, x_max
+    
+    def get_resolution(self):
+        """Read the Samples box: None for adaptive sampling, else a point count"""
+        text = self.samples_entry.get().strip()
+        if not text or text.lower() == 'auto':
+            return None
+        samples = int(float(text))
+        if not 2 <= samples <= MAX_SAMPLES:
+            raise ValueError(f"Samples must be between 2 and {MAX_SAMPLES}")
+        return samples
+    
+    def sample_curve(self, func, tiles, x_min, x_max, resolution):
+        """Sample one function: adaptively through its tiles, or at a fixed resolution"""
+        if resolution is None:
+            return tiles.sample(x_min, x_max)
+        return sample_envelope(func, x_min, x_max, resolution, self.ax.bbox.width)
+    
+    def compiled_function(self, index):
+        """Return the cached callable for graph_functions[index] in the current angle mode"""
+        func = self.compiled_functions[index]
+        if func.angle_mode != self.core.angle_mode:
+            func = compile_graph_function(self.graph_functions[index], self.core.angle_mode)
+            self.compiled_functions[index] = func
+            if self.function_tiles[index] is not None:
+                self.function_tiles[index] = TileCache(func)
+        return func
+    
+    def sample_graph_function(self, index, x_min, x_max, resolution=None):
+        """Sample graph_functions[index] over a range"""
+        func = self.compiled_function(index)
+        return self.sample_curve(func, self.function_tiles[index], x_min, x_max, resolution)
+    
+    def update_curves(self, x_min, x_max, resolution=None):
+        """Resample every curve for [x_min, x_max]
+        
+        Families, and all curves once there are more than MANY_CURVES, are
+        evaluated together on one shared grid; the rest use their tile caches.
+        The crowded y = f(x) curves are drawn as one LineCollection. With a
+        fixed Samples resolution they are sampled one by one at it instead.
+        """
+        planes = {index for index, func in enumerate(self.compiled_functions)
+                  if isinstance(func, PlaneFunction)}
+        shared = [index for index, tiles in enumerate(self.function_tiles) if index not in planes
+                  and (tiles is None or len(self.function_lines) > MANY_CURVES)]
+        crowd = []  # (index, x, y) of the crowded y = f(x) curves
+        y_min, y_max = self.ax.get_ylim()
+        for index, line in enumerate(self.function_lines):
+            if index in planes:
+                self.sample_plane(line, self.compiled_function(index), x_min, x_max, y_min, y_max)
+            elif index not in shared:
+                line.set_data(*self.sample_graph_function(index, x_min, x_max, resolution))
+            elif resolution is not None and self.function_tiles[index] is not None:
+                crowd.append((index, *self.sample_graph_function(index, x_min, x_max,
+                                                                 resolution)))
+        grid = [index for index in shared
+                if resolution is None or self.function_tiles[index] is None]
+        if grid:
+            x = shared_grid(x_min, x_max)
+            block, spans = evaluate_block([self.compiled_function(i) for i in grid], x)
+            for index, (start, stop) in zip(grid, spans):
+                artist = self.function_lines[index]
+                if isinstance(artist, LineCollection):
+                    artist.set_segments(block_segments(x, block[start:stop]))
+                else:
+                    crowd.append((index, x, block[start]))
+        self.draw_crowd(sorted(crowd, key=lambda curve: curve[0]))
+    
+    def draw_crowd(self, curves):
+        """Draw (index, x, y) curves as the single crowd_lines collection
+        
+        Their own Line2D artists are emptied but keep their colour and legend entry.
+        """
+        if not curves:
+            if self.crowd_lines is not None:
+                self.crowd_lines.remove()
+            self.crowd_lines, self.crowd_members = None, []
+            return
+        if self.crowd_lines is None:
+            self.crowd_lines = LineCollection([])
+            self.ax.add_collection(self.crowd_lines, autolim=False)
+        segments, colors = [], []
+        for index, x, y in curves:
+            line = self.function_lines[index]
+            line.set_data([], [])
+            segments.append(np.column_stack((x, y)))
+            colors.append(line.get_color())
+        self.crowd_lines.set_segments(segments)
+        self.crowd_lines.set_color(colors)
+        self.crowd_members = [index for index, _, _ in curves]
+    
+    def remove_from_crowd(self, index):
+        """Drop function index's segment from crowd_lines and renumber the rest"""
+        if index in self.crowd_members:
+            position = self.crowd_members.index(index)
+            segments = self.crowd_lines.get_segments()
+            colors = list(self.crowd_lines.get_colors())
+            del segments[position], colors[position]
+            self.crowd_lines.set_segments(segments)
+            self.crowd_lines.set_color(colors)
+            del self.crowd_members[position]
+        self.crowd_members = [member - (member > index) for member in self.crowd_members]
+    
+    def sample_plane(self, artist, func, x_min, x_max, y_min, y_max):
+        """Retrace an implicit curve or recompute a heat map for the given view"""
+        if func.implicit:
+            artist.set_segments(trace_implicit(func, x_min, x_max, y_min, y_max))
+        else:
+            artist.set_data(sample_surface(func, x_min, x_max, y_min, y_max,
+                                           self.ax.bbox.width, self.ax.bbox.height))
+            artist.set_extent((x_min, x_max, y_min, y_max))
+            artist.autoscale()
+    
+    def on_ylim_changed(self, ax):
+        """Implicit curves and heat maps also depend on the y-range"""
+        if any(isinstance(func, PlaneFunction) for func in self.compiled_functions):
+            self.on_xlim_changed(ax)
+    
+    def on_xlim_changed(self, ax):
+        """Coalesce zoom/pan limit changes into one resample when Tk is idle"""
+        if self.resample_suppressed:
+            return
+        if not self.resample_pending and self.function_lines:
+            self.resample_pending = True
+            self.root.after_idle(self.resample_view)
+    
+    def resample_view(self):
+        """Resample every curve for the visible x-range, reusing cached tiles"""
+        self.resample_pending = False
+        x_min, x_max = self.ax.get_xlim()
+        try:
+            resolution = self.get_resolution()
+        except ValueError:
+            resolution = None
+        with STATS.time('graph.resample'):
+            self.update_curves(x_min, x_max, resolution)
+        self.canvas.draw_idle()
+    
+    @contextmanager
+    def limits_without_resample(self):
+        """Apply the limit changes made in the block without resampling every curve
+
+        Adding or removing one curve rescales the axes; the other curves keep
+        their samples instead of being evaluated again.
+        """
+        self.resample_suppressed = True
+        try:
+            yield
+            self.ax.get_xlim()  # apply autoscaling deferred by ax.plot() now
+            self.ax.get_ylim()
+        finally:
+            self.resample_suppressed = False
+    
+    def timed_canvas_draw(self, *args, **kwargs):
+        with STATS.time('graph.draw'):
+            return self.untimed_canvas_draw(*args, **kwargs)
+    
+    def setup_axes(self):
+        """Draw the axis lines, grid and labels on an empty graph
+
+        Also connects the zoom/pan resampling handlers, which ax.clear() drops.
+        """
+        self.ax.callbacks.connect('xlim_changed', self.on_xlim_changed)
+        self.ax.callbacks.connect('ylim_changed', self.on_ylim_changed)
+        self.ax.axhline(0, color='black', linewidth=0.5)
+        self.ax.axvline(0, color='black', linewidth=0.5)
+        self.ax.grid(True)
+        self.ax.set_xlabel('x')
+        self.ax.set_ylabel('y')
+        self.ax.set_title('Graph of Functions')
+    
+    def update_legend(self):
+        """Rebuild the legend and title after the set of curves changed"""
+        legend = self.ax.get_legend()
+        if legend is not None:
+            legend.remove()
+        if self.ax.get_legend_handles_labels()[0]:  # heat maps have no legend entry
+            self.ax.legend()
+        if len(self.graph_functions) == 1:
+            self.ax.set_title(f'Graph of {self.graph_functions[0]}')
+        else:
+            self.ax.set_title('Graph of Functions')
+    
+    def rescale_graph(self):
+        """Fit the axes to the remaining curves"""
+        with self.limits_without_resample():
+            self.ax.relim()
+            # relim() only looks at lines; add the extent of family and crowd collections
+            for artist in self.function_lines + [self.crowd_lines]:
+                if isinstance(artist, LineCollection) and artist.get_segments():
+                    vertices = np.concatenate(artist.get_segments())
+                    vertices = vertices[np.isfinite(vertices).all(axis=1)]
+                    if len(vertices):
+                        self.ax.update_datalim(vertices)
+            self.ax.autoscale_view()
+    
+    def plot_function(self):
+        """Compile the entered function once and add its curve to the graph"""
+        func_text = self.function_entry.get()
+        if not func_text:
+            messagebox.showerror("Error", "Please enter a function")
+            return
+        
+        try:
+            try:
+                x_min, x_max = self.get_x_range()
+                resolution = self.get_resolution()
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
+                return
+            
+            with STATS.time('plot.compile'):
+                func = compile_graph_function(func_text, self.core.angle_mode)
+            
+            # Add one artist for the new function; existing curves are untouched.
+            # A family gets a single LineCollection coloured along its parameter.
+            if isinstance(func, PlaneFunction):
+                tiles = None
+                # Functions of x and y start on a square view unless curves are shown
+                y_min, y_max = self.ax.get_ylim() if self.function_lines else (x_min, x_max)
+                with STATS.time('plot.artist'):
+                    if func.implicit:
+                        line = LineCollection([], color=f'C{len(self.function_lines) % 10}',
+                                              label=func_text)
+                        self.ax.add_collection(line, autolim=False)
+                    else:
+                        line = self.ax.imshow([[np.nan]], origin='lower', aspect='auto',
+                                              cmap='viridis', interpolation='nearest',
+                                              zorder=0, label=func_text)
+                with STATS.time('plot.sample'):
+                    self.sample_plane(line, func, x_min, x_max, y_min, y_max)
+                with self.limits_without_resample():
+                    self.ax.set_xlim(x_min, x_max)
+                    self.ax.set_ylim(y_min, y_max)
+            elif isinstance(func, GraphFamily):
+                tiles = None
+                with STATS.time('plot.sample'):
+                    x = shared_grid(x_min, x_max)
+                    block, spans = evaluate_block([func], x)
+                with STATS.time('plot.artist'):
+                    line = LineCollection(block_segments(x, block), cmap='viridis',
+                                          label=func_text)
+                    line.set_array(func.values)
+                    self.ax.add_collection(line)
+                    self.rescale_graph()
+            else:
+                tiles = TileCache(func)
+                with STATS.time('plot.sample'):
+                    x, y = self.sample_curve(func, tiles, x_min, x_max, resolution)
+                with STATS.time('plot.artist'), self.limits_without_resample():
+                    line, = self.ax.plot(x, y, label=func_text)
+            
+            # Add to function list
+            self.graph_functions.append(func_text)
+            self.compiled_functions.append(func)
+            self.function_lines.append(line)
+            self.function_tiles.append(tiles)
+            self.function_listbox.insert(tk.END, func_text)
+            
+            with STATS.time('plot.legend'):
+                self.update_legend()
+            STATS.count('plot.functions')
+            self.canvas.draw_idle()
+            
+            # Add to history
+            self.add_to_history(f"Plotted: {func_text} from {x_min} to {x_max}")
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not plot function: {str(e)}")
+    
+    def redraw_graph(self):
+        """Resample every listed function over the current range"""
+        try:
+            x_min, x_max = self.get_x_range()
+            resolution = self.get_resolution()
+        except ValueError:
+            return
+        
+        self.update_curves(x_min, x_max, resolution)
+        
+        with self.limits_without_resample():
+            self.ax.set_xlim(x_min, x_max)
+        self.rescale_graph()
+        self.canvas.draw_idle()
+    
+    def remove_function(self):
+        """Drop the selected function's curve without touching the others"""
+        try:
+            index = self.function_listbox.curselection()[0]
+            self.function_listbox.delete(index)
+            self.graph_functions.pop(index)
+            self.compiled_functions.pop(index)
+            with STATS.time('remove.artist'):
+                self.function_lines.pop(index).remove()
+                self.remove_from_crowd(index)
+            self.function_tiles.pop(index)
+            self.clear_analysis()
+            
+            with STATS.time('remove.legend'):
+                self.update_legend()
+            with STATS.time('remove.rescale'):
+                self.rescale_graph()
+            STATS.count('remove.functions')
+            self.canvas.draw_idle()
+        except:
+            pass
+    
+    def clear_graph(self):
+        self.ax.clear()
+        self.setup_axes()
+        self.canvas.draw()
+        
+        self.graph_functions = []
+        self.compiled_functions = []
+        self.function_lines = []
+        self.function_tiles = []
+        self.analysis_artists = []
+        self.crowd_lines = None
+        self.crowd_members = []
+        self.function_listbox.delete(0, tk.END)
+    
+    def clear_analysis(self):
+        for artist in self.analysis_artists:
+            artist.remove()
+        self.analysis_artists = []
+    
+    def analyse_functions(self):
+        """Mark roots, extrema and intersections in the visible x-range
+        
+        With a function selected, only it and its intersections with the other
+        curves are analysed; otherwise every y = f(x) curve and every pair.
+        """
+        curves = [index for index, func in enumerate(self.compiled_functions)
+                  if isinstance(func, GraphFunction)]
+        selection = self.function_listbox.curselection()
+        targets = [selection[0]] if selection else curves
+        if not targets or targets[0] not in curves:
+            messagebox.showerror("Error", "Select a y = f(x) function to analyse")
+            return
+        
+        self.clear_analysis()
+        x_min, x_max = self.ax.get_xlim()
+        points = {'root': [], 'maximum': [], 'minimum': [], 'intersection': []}
+        with STATS.time('graph.analyse'):
+            for index in targets:
+                func = self.compiled_function(index)
+                roots = find_roots(func, x_min, x_max)
+                points['root'].append(np.column_stack((roots, np.zeros_like(roots))))
+                extrema, maximum = find_extrema(func, x_min, x_max)
+                values = func(extrema)
+                points['maximum'].append(np.column_stack((extrema[maximum], values[maximum])))
+                points['minimum'].append(np.column_stack((extrema[~maximum], values[~maximum])))
+            for index in targets:
+                func = self.compiled_function(index)
+                for other in curves:
+                    if other == index or (other in targets and other < index):
+                        continue
+                    crossings = find_intersections(func, self.compiled_function(other), x_min, x_max)
+                    points['intersection'].append(np.column_stack((crossings, func(crossings))))
+        
+        markers = {'root': 'o', 'maximum': '^', 'minimum': 'v', 'intersection': 'X'}
+        labelled = 0
+        for kind, found in points.items():
+            found = np.concatenate(found) if found else np.empty((0, 2))
+            points[kind] = len(found)
+            if not len(found):
+                continue
+            self.analysis_artists += self.ax.plot(found[:, 0], found[:, 1], linestyle='none',
+                                                  marker=markers[kind], color='white',
+                                                  markersize=5, label='_analysis')
+            # Label the first few points; beyond that the markers speak for themselves
+            for x, y in found[:max(ANALYSIS_LABELS - labelled, 0)]:
+                self.analysis_artists.append(self.ax.annotate(
+                    f"({x:.6g}, {y:.6g})", (x, y), textcoords='offset points',
+                    xytext=(4, 4), fontsize=7, color='white'))
+                labelled += 1
+        self.canvas.draw_idle()
+        
+        names = ', '.join(self.graph_functions[index] for index in targets)
+        self.add_to_history(f"Analysed {names}: {points['root']} roots, "
+                            f"{points['maximum'] + points['minimum']} extrema, "
+                            f"{points['intersection']} intersections")
+    
+    def save_graph(self):
+        # [Previous implementation remains exactly the same]
+        try:
+            file_path = simpledialog.askstring("Save Graph", "Enter file name (without extension):")
+            if file_path:
+                self.figure.savefig(f"{file_path}.png")
+                messagebox.showinfo("Success", f"Graph saved as {file_path}.png")
+                self.add_to_history(f"Graph saved as {file_path}.png")
+        except:
+            messagebox.showerror("Error", "Could not save graph")
+    
+    # Game functions
+    def start_game(self):
+        # [Previous implementation remains exactly the same]
+        game_type = self.game_var.get()
+        
+        # Clear previous game
+        for widget in self.game_display.winfo_children():
+            widget.destroy()
+        
+        if game_type == "math_quiz":
+            self.math_quiz_game()
+        elif game_type == "number_guesser":
+            self.number_guesser_game()
+        elif game_type == "equation_solver":
+            self.equation_solver_game()
+        elif game_type == "graph_challenge":
+            self.graph_challenge_game()
+
+    def math_quiz_game(self):
+        self.quiz_score = 0
+        self.quiz_question_count = 0
+        
+        # Game title
+        ttk.Label(self.game_display, text="Math Quiz Challenge", 
+                 style='Title.TLabel').pack(pady=10)
+        
+        # Score display
+        self.quiz_score_var = tk.StringVar(value="Score: 0/0")
+        ttk.Label(self.game_display, textvariable=self.quiz_score_var,
+                 style='Title.TLabel').pack()
+        
+        # Question display
+        self.quiz_question_var = tk.StringVar()
+        question_label = ttk.Label(self.game_display, 
+                                 textvariable=self.quiz_question_var,
+                                 style='Title.TLabel',
+                                 font=('Helvetica', 14))
+        question_label.pack(pady=20)
+        
+        # Answer entry
+        answer_frame = ttk.Frame(self.game_display)
+        answer_frame.pack(pady=10)
+        
+        ttk.Label(answer_frame, text="Your Answer:", style='Title.TLabel').pack(side='left')
+        
+        self.quiz_answer_entry = ttk.Entry(answer_frame, style='Calculator.TEntry', width=15)
+        self.quiz_answer_entry.pack(side='left', padx=5)
+        
+        # Submit button
+        submit_button = ttk.Button(self.game_display, text="Submit", 
+                                 style='Operation.TButton',
+                                 command=self.check_quiz_answer)
+        submit_button.pack(pady=10)
+        
+        # Next question button
+        next_button = ttk.Button(self.game_display, text="Next Question", 
+                               style='Operation.TButton',
+                               command=self.generate_quiz_question)
+        next_button.pack(pady=5)
+        
+        # Generate first question
+        self.generate_quiz_question()
+    
+    def generate_quiz_question(self):
+        """Generate a random math question"""
+        operations = ['+', '-', '*', '/']
+        operation = random.choice(operations)
+        
+        if operation == '+':
+            num1 = random.randint(1, 100)
+            num2 = random.randint(1, 100)
+            self.correct_answer = num1 + num2
+        elif operation == '-':
+            num1 = random.randint(1, 100)
+            num2 = random.randint(1, num1)  # Ensure positive result
+            self.correct_answer = num1 - num2
+        elif operation == '*':
+            num1 = random.randint(1, 12)
+            num2 = random.randint(1, 12)
+            self.correct_answer = num1 * num2
+        else:  # division
+            num2 = random.randint(1, 10)
+            self.correct_answer = random.randint(1, 10)
+            num1 = num2 * self.correct_answer  # Ensure integer result
+        
+        self.quiz_question_var.set(f"What is {num1} {operation} {num2}?")
+        self.quiz_answer_entry.delete(0, tk.END)
+        self.quiz_answer_entry.focus()
+    
+    def check_quiz_answer(self):
+        """Check if the user's answer is correct"""
+        try:
+            user_answer = float(self.quiz_answer_entry.get())
+            if abs(user_answer - self.correct_answer) < 0.0001:  # Account for floating point
+                self.quiz_score += 1
+                messagebox.showinfo("Correct!", "Your answer is correct!")
+            else:
+                messagebox.showinfo("Incorrect", 
+                                  f"Sorry, the correct answer was {self.correct_answer}")
+            
+            self.quiz_question_count += 1
+            self.quiz_score_var.set(f"Score: {self.quiz_score}/{self.quiz_question_count}")
+        except ValueError:
+            messagebox.showerror("Error", "Please enter a valid number")
+    
+    def number_guesser_game(self):
+        """Number guessing game"""
+        self.secret_number = random.randint(1, 100)
+        self.guess_count = 0
+        
+        # Game title
+        ttk.Label(self.game_display, text="Number Guesser", 
+                 style='Title.TLabel').pack(pady=10)
+        
+        # Instructions
+        ttk.Label(self.game_display, 
+                 text="I'm thinking of a number between 1 and 100.",
+                 style='Title.TLabel').pack()
+        
+        # Guess entry
+        guess_frame = ttk.Frame(self.game_display)
+        guess_frame.pack(pady=10)
+        
+        ttk.Label(guess_frame, text="Your Guess:", style='Title.TLabel').pack(side='left')
+        
+        self.guess_entry = ttk.Entry(guess_frame, style='Calculator.TEntry', width=10)
+        self.guess_entry.pack(side='left', padx=5)
+        
+        # Submit button
+        submit_button = ttk.Button(self.game_display, text="Guess", 
+                                 style='Operation.TButton',
+                                 command=self.check_guess)
+        submit_button.pack(pady=10)
+        
+        # Feedback label
+        self.guess_feedback = ttk.Label(self.game_display, text="",
+                                       style='Title.TLabel')
+        self.guess_feedback.pack()
+        
+        # New game button
+        new_game_button = ttk.Button(self.game_display, text="New Game", 
+                                   style='Operation.TButton',
+                                   command=self.number_guesser_game)
+        new_game_button.pack(pady=5)
+    
+    def check_guess(self):
+        """Check the user's guess against the secret number"""
+        try:
+            guess = int(self.guess_entry.get())
+            self.guess_count += 1
+            
+            if guess < self.secret_number:
+                self.guess_feedback.config(text="Too low! Try a higher number.")
+            elif guess > self.secret_number:
+                self.guess_feedback.config(text="Too high! Try a lower number.")
+            else:
+                self.guess_feedback.config(
+                    text=f"Congratulations! You found the number in {self.guess_count} guesses!")
+                self.secret_number = None  # Prevent further guessing
+        except ValueError:
+            messagebox.showerror("Error", "Please enter a valid integer between 1 and 100")
+    
+    def equation_solver_game(self):
+        """Game where the user solves random equations"""
+        self.equation_score = 0
+        self.equation_attempts = 0
+        
+        # Game title
+        ttk.Label(self.game_display, text="Equation Solver Challenge", 
+                 style='Title.TLabel').pack(pady=10)
+        
+        # Score display
+        self.equation_score_var = tk.StringVar(value="Score: 0/0")
+        ttk.Label(self.game_display, textvariable=self.equation_score_var,
+                 style='Title.TLabel').pack()
+        
+        # Equation display
+        self.equation_var = tk.StringVar()
+        equation_label = ttk.Label(self.game_display, 
+                                  textvariable=self.equation_var,
+                                  style='Title.TLabel',
+                                  font=('Helvetica', 14))
+        equation_label.pack(pady=20)
+        
+        # Answer entry
+        answer_frame = ttk.Frame(self.game_display)
+        answer_frame.pack(pady=10)
+        
+        ttk.Label(answer_frame, text="x =", style='Title.TLabel').pack(side='left')
+        
+        self.equation_answer_entry = ttk.Entry(answer_frame, 
+                                             style='Calculator.TEntry', 
+                                             width=10)
+        self.equation_answer_entry.pack(side='left', padx=5)
+        
+        # Submit button
+        submit_button = ttk.Button(self.game_display, text="Submit", 
+                                 style='Operation.TButton',
+                                 command=self.check_equation_solution)
+        submit_button.pack(pady=10)
+        
+        # New equation button
+        new_eq_button = ttk.Button(self.game_display, text="New Equation", 
+                                 style='Operation.TButton',
+                                 command=self.generate_equation)
+        new_eq_button.pack(pady=5)
+        
+        # Generate first equation
+        self.generate_equation()
+    
+    def generate_equation(self):
+        """Generate a random linear equation to solve"""
+        a = random.randint(1, 10)
+        b = random.randint(1, 10)
+        c = random.randint(1, 10)
+        
+        # Equation form: ax + b = c
+        self.equation_solution = (c - b) / a
+        
+        self.equation_var.set(f"{a}x + {b} = {c}")
+        self.equation_answer_entry.delete(0, tk.END)
+        self.equation_answer_entry.focus()
+    
+    def check_equation_solution(self):
+        """Check if the user's solution is correct"""
+        try:
+            user_solution = float(self.equation_answer_entry.get())
+            if abs(user_solution - self.equation_solution) < 0.0001:  # Account for floating point
+                self.equation_score += 1
+                messagebox.showinfo("Correct!", "Your solution is correct!")
+            else:
+                messagebox.showinfo("Incorrect", 
+                                  f"Sorry, the correct solution was x = {self.equation_solution}")
+            
+            self.equation_attempts += 1
+            self.equation_score_var.set(f"Score: {self.equation_score}/{self.equation_attempts}")
+        except ValueError:
+            messagebox.showerror("Error", "Please enter a valid number")
+    
+    def graph_challenge_game(self):
+        """Game where the user identifies functions from graphs"""
+        self.graph_score = 0
+        self.graph_attempts = 0
+        
+        # Game title
+        ttk.Label(self.game_display, text="Graph Challenge", 
+                 style='Title.TLabel').pack(pady=10)
+        
+        # Score display
+        self.graph_score_var = tk.StringVar(value="Score: 0/0")
+        ttk.Label(self.game_display, textvariable=self.graph_score_var,
+                 style='Title.TLabel').pack()
+        
+        # Create a frame for the graph
+        graph_frame = ttk.Frame(self.game_display)
+        graph_frame.pack(expand=True, fill='both', padx=10, pady=10)
+        
+        # Matplotlib figure for the game
+        self.game_figure = plt.Figure(figsize=(5, 3), dpi=100)
+        self.game_ax = self.game_figure.add_subplot(111)
+        self.game_ax.set_facecolor('#3B4252')
+        self.game_figure.patch.set_facecolor(self.bg_color)
+        
+        self.game_canvas = FigureCanvasTkAgg(self.game_figure, graph_frame)
+        self.game_canvas.get_tk_widget().pack(expand=True, fill='both')
+        
+        # Function options
+        self.function_options = [
+            "x", "x**2", "x**3", "sqrt(x)", "sin(x)", "cos(x)", 
+            "tan(x)", "exp(x)", "log(x)", "abs(x)"
+        ]
+        
+        # Current correct function
+        self.correct_function = ""
+        
+        # Options frame
+        options_frame = ttk.Frame(self.game_display)
+        options_frame.pack(pady=10)
+        
+        # Radio buttons for function selection
+        self.selected_function = tk.StringVar()
+        
+        for i, func in enumerate(self.function_options):
+            rb = ttk.Radiobutton(options_frame, text=func, 
+                                variable=self.selected_function,
+                                value=func,
+                                style='Game.TRadiobutton')
+            rb.grid(row=i//2, column=i%2, sticky='w', padx=5)
+        
+        # Submit button
+        submit_button = ttk.Button(self.game_display, text="Submit", 
+                                 style='Operation.TButton',
+                                 command=self.check_graph_answer)
+        submit_button.pack(pady=10)
+        
+        # New graph button
+        new_graph_button = ttk.Button(self.game_display, text="New Graph", 
+                                    style='Operation.TButton',
+                                    command=self.generate_graph_question)
+        new_graph_button.pack(pady=5)
+        
+        # Generate first question
+        self.generate_graph_question()
+    
+    def generate_graph_question(self):
+        """Generate a random graph for the user to identify"""
+        self.game_ax.clear()
+        
+        # Select a random function
+        self.correct_function = random.choice(self.function_options)
+        
+        # Generate the graph
+        x = np.linspace(-5, 5, 400)
+        
+        if self.correct_function == "sqrt(x)":
+            x = np.linspace(0, 5, 400)
+        
+        y = eval(self.correct_function, {'np': np, 'x': x, 'math': math, 'sqrt': np.sqrt})
+        
+        self.game_ax.plot(x, y)
+        self.game_ax.axhline(0, color='white', linewidth=0.5)
+        self.game_ax.axvline(0, color='white', linewidth=0.5)
+        self.game_ax.grid(True)
+        self.game_ax.set_title("Identify this function")
+        
+        self.game_canvas.draw()
+        self.selected_function.set("")  # Clear selection
+    
+    def check_graph_answer(self):
+        """Check if the user correctly identified the function"""
+        if not self.selected_function.get():
+            messagebox.showerror("Error", "Please select a function")
+            return
+        
+        if self.selected_function.get() == self.correct_function:
+            self.graph_score += 1
+            messagebox.showinfo("Correct!", "You identified the function correctly!")
+        else:
+            messagebox.showinfo("Incorrect", 
+                              f"Sorry, the correct function was {self.correct_function}")
+        
+        self.graph_attempts += 1
+        self.graph_score_var.set(f"Score: {self.graph_score}/{self.graph_attempts}")
+
+def main():
+    root = tk.Tk()
+    app = UltimateCalculator(root)
+    root.mainloop()
+    return 0
+
+
+# Main application
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,493 @@
+"""Persistent calculation history for the Ultimate Scientific Calculator.
+
+Every history entry is appended to a log file as one JSON line. A companion
+index file holds the byte offset of each line as a fixed-width 8-byte
+integer, so entry i is found with one seek into the index and one into the
+log, however long the history grows. Clearing the history truncates both
+files.
+"""
+import json
+import math
+import os
+import re
+import struct
+import threading
+import time
+
+OFFSET = struct.Struct('<Q')
+
+
+class HistoryLog:
+    """Append-only history file with an offset index for random access"""
+
+    def __init__(self, path):
+        self.path = path
+        self.index_path = path + '.idx'
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._log = open(path, 'ab+')
+        self._index = open(self.index_path, 'ab+')
+        self._lock = threading.RLock()  # seek + read pairs; HistoryIndex may read from a thread
+        self._count = self._check_index()
+
+    def close(self):
+        self._log.close()
+        self._index.close()
+
+    def __len__(self):
+        return self._count
+
+    def _offset(self, i):
+        with self._lock:
+            self._index.seek(i * OFFSET.size)
+            return OFFSET.unpack(self._index.read(OFFSET.size))[0]
+
+    def _check_index(self):
+        """Return the entry count, rebuilding the index if it disagrees with the log"""
+        log_size = os.path.getsize(self.path)
+        index_size = os.path.getsize(self.index_path)
+        count, partial = divmod(index_size, OFFSET.size)
+        if not partial:
+            if count == 0 and log_size == 0:
+                return 0
+            if count:
+                offset = self._offset(count - 1)
+                if offset < log_size:
+                    self._log.seek(offset)
+                    line = self._log.readline()
+                    if offset + len(line) == log_size and line.endswith(b'\n'):
+                        return count
+        return self._rebuild_index()
+
+    def _rebuild_index(self):
+        """Recreate the index by scanning the log (after a crash or edit)"""
+        self._log.seek(0)
+        offsets = []
+        offset = 0
+        ends_with_newline = True
+        for line in self._log:
+            offsets.append(offset)
+            offset += len(line)
+            ends_with_newline = line.endswith(b'\n')
+        if not ends_with_newline:  # torn last write: terminate it
+            self._log.write(b'\n')
+            self._log.flush()
+        self._index.truncate(0)
+        self._index.write(b''.join(OFFSET.pack(o) for o in offsets))
+        self._index.flush()
+        return len(offsets)
+
+    @staticmethod
+    def _decode(line):
+        text = line.decode('utf-8', errors='replace').rstrip('\n')
+        try:
+            return json.loads(text)['item']
+        except (ValueError, KeyError, TypeError):
+            return text
+
+    def append(self, item):
+        """Append an entry and return its index"""
+        record = json.dumps({'time': time.time(), 'item': item}, ensure_ascii=False)
+        with self._lock:
+            self._log.seek(0, os.SEEK_END)
+            offset = self._log.tell()
+            self._log.write(record.encode('utf-8') + b'\n')
+            self._log.flush()
+            self._index.write(OFFSET.pack(offset))
+            self._index.flush()
+            self._count += 1
+            return self._count - 1
+
+    def clear(self):
+        """Delete every entry: truncate the log and its offset index"""
+        with self._lock:
+            self._log.truncate(0)
+            self._log.flush()
+            self._index.truncate(0)
+            self._index.flush()
+            self._count = 0
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("history index out of range")
+        with self._lock:
+            self._log.seek(self._offset(i))
+            line = self._log.readline()
+        return self._decode(line)
+
+    def read_lines(self, start=0, stop=None):
+        """Return the raw JSON lines of entries start..stop-1 in one read"""
+        stop = self._count if stop is None else min(stop, self._count)
+        start = max(start, 0)
+        if start >= stop:
+            return []
+        with self._lock:
+            begin = self._offset(start)
+            end = self._offset(stop) if stop < self._count else os.path.getsize(self.path)
+            self._log.seek(begin)
+            return self._log.read(end - begin).splitlines(keepends=True)
+
+    def read(self, start=0, stop=None):
+        """Return entries start..stop-1 with one contiguous read of the log"""
+        return [self._decode(line) for line in self.read_lines(start, stop)]
+
+    def tail(self, n):
+        """Return the most recent n entries, oldest first"""
+        return self.read(self._count - n)
+
+
+# Search index
+#
+# Entries are grouped into blocks of BLOCK_SIZE consecutive log entries. For
+# every term the index keeps a bitset of the blocks containing it, stored as
+# a bytearray. Terms are the lower-cased character trigrams of each entry
+# plus one log-scale bucket (sign, decade, leading digit) for its numeric
+# result. A query ANDs the bitsets of its terms, walks the surviving blocks
+# newest first and checks their entries against the query, reading each
+# block from the log in one go. The bitsets are saved beside the log and
+# brought up to date incrementally, so a full rebuild only happens when the
+# index file is missing or damaged. A rebuild, or any catch-up of more than
+# BACKGROUND_ENTRIES, runs on a background thread; searches meanwhile use
+# the blocks indexed so far and scan the rest of the log.
+
+BLOCK_SIZE = 64
+SAVE_INTERVAL = 64  # blocks between automatic index saves
+BACKGROUND_ENTRIES = BLOCK_SIZE * 256  # larger catch-ups are indexed on a thread
+INDEX_MAGIC = b'SCIHIDX1'
+INDEX_HEADER = struct.Struct('<QI')
+_TERM_HEADER = struct.Struct('<HI')
+NUMERIC_PREFIX = '\x00'  # marks numeric bucket terms; never part of a trigram
+
+_RANGE_PATTERNS = (
+    (re.compile(r'\bbetween\s+(\S+)\s+and\s+(\S+)', re.I), 'between'),
+    (re.compile(r'(?<!\S)(\S+?)\.\.(\S+)(?!\S)'), 'between'),
+    (re.compile(r'(?<!\S)(>=?|<=?)\s*(\S+)'), 'compare'),
+)
+
+
+def result_value(item):
+    """Numeric result of a history entry ('expr = result'), or None"""
+    _, sep, result = item.rpartition(' = ')
+    if not sep:
+        return None
+    result = result.strip()
+    try:
+        return float(result)
+    except ValueError:
+        pass
+    try:
+        return float(int(result, 0))
+    except (ValueError, OverflowError):
+        return None
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _numeric_term(value):
+    """Bucket term for a finite value: NUMERIC_PREFIX sign decade '.' leading digit"""
+    if value is None or not math.isfinite(value):
+        return None
+    if value == 0:
+        return NUMERIC_PREFIX + '0'
+    magnitude = abs(value)
+    exponent = math.floor(math.log10(magnitude))
+    digit = min(max(int(magnitude / 10.0 ** exponent), 1), 9)
+    return f"{NUMERIC_PREFIX}{'-' if value < 0 else '+'}{exponent}.{digit}"
+
+
+def _bucket_bounds(term):
+    """Closed value interval covered by a numeric bucket term
+
+    Widened by a relative hair so rounding in log10 never hides a value
+    sitting on a bucket edge.
+    """
+    if term == NUMERIC_PREFIX + '0':
+        return 0.0, 0.0
+    sign = -1.0 if term[1] == '-' else 1.0
+    exponent, digit = term[2:].split('.')
+    low = int(digit) * 10.0 ** int(exponent) * (1 - 1e-9)
+    high = (int(digit) + 1) * 10.0 ** int(exponent) * (1 + 1e-9)
+    return (low, high) if sign > 0 else (-high, -low)
+
+
+def parse_query(query):
+    """Split a query into (words, low, high)
+
+    Numeric ranges may be written 'between 1e3 and 1e4', '1e3..1e4',
+    '>= 1e3' or '< 0'; everything else is matched as case-insensitive
+    substrings, all of which must occur in an entry.
+    """
+    low = high = None
+    for pattern, kind in _RANGE_PATTERNS:
+        for match in list(pattern.finditer(query)):
+            try:
+                if kind == 'between':
+                    a, b = float(match.group(1)), float(match.group(2))
+                    low, high = min(a, b), max(a, b)
+                else:
+                    value = float(match.group(2))
+                    if match.group(1).startswith('>'):
+                        low = value
+                    else:
+                        high = value
+            except ValueError:
+                continue
+            query = query.replace(match.group(0), ' ', 1)
+    return query.lower().split(), low, high
+
+
+class HistoryIndex:
+    """Block-level trigram and numeric-range index over a HistoryLog"""
+
+    def __init__(self, log, path=None, block_size=BLOCK_SIZE):
+        self.log = log
+        self.path = path or log.path + '.search'
+        self.block_size = block_size
+        self.count = 0  # log entries covered by the index
+        self._bits = {}
+        self._numeric_terms = set()
+        self._saved_blocks = 0
+        self._loaded = False
+        self._lock = threading.RLock()  # held while the bitsets change or are saved
+        self._builder = None  # thread catching up with a large backlog
+
+    # Maintenance
+    def _set(self, term, block):
+        bits = self._bits.get(term)
+        if bits is None:
+            bits = self._bits[term] = bytearray()
+            if term[0] == NUMERIC_PREFIX:
+                self._numeric_terms.add(term)
+        byte = block >> 3
+        if len(bits) <= byte:
+            bits.extend(bytes(byte + 1 - len(bits)))
+        bits[byte] |= 1 << (block & 7)
+
+    def _index_items(self, first, items):
+        """Index items holding entries first, first+1, ..."""
+        end = first + len(items)
+        start = first
+        while start < end:
+            block = start // self.block_size
+            stop = min((block + 1) * self.block_size, end)
+            chunk = items[start - first:stop - first]
+            terms = _trigrams('\n'.join(chunk).lower().replace(NUMERIC_PREFIX, ''))
+            terms.update(_numeric_term(result_value(item)) for item in chunk)
+            terms.discard(None)
+            for term in terms:
+                self._set(term, block)
+            start = stop
+        self.count = end
+
+    def add(self, entry_id, item):
+        """Index a newly appended log entry; a stale index catches up on search"""
+        with self._lock:
+            if not self._loaded or entry_id != self.count:
+                return
+            self._index_items(entry_id, [item])
+            if self.count // self.block_size - self._saved_blocks >= SAVE_INTERVAL:
+                self.save()
+
+    def _catch_up(self):
+        """Index the log entries not covered yet, one lock-holding chunk at a time"""
+        step = self.block_size * 256
+        while True:
+            with self._lock:
+                if self.count >= len(self.log):
+                    return
+                self._index_items(self.count, self.log.read(self.count, self.count + step))
+
+    def _load_once(self):
+        if not self._loaded:
+            self._load()
+            self._loaded = True
+        if self.count > len(self.log):  # the log was replaced: start over
+            self._bits.clear()
+            self._numeric_terms.clear()
+            self.count = 0
+
+    def _build(self):
+        with self._lock:
+            self._load_once()
+        self._catch_up()
+        if self.count // self.block_size > self._saved_blocks:
+            try:
+                self.save()
+            except OSError:
+                pass  # caught up again next session
+
+    def prepare(self):
+        """Load the index and catch up with the log on a background thread
+
+        Called at startup, so the first search usually finds the index ready.
+        """
+        if self._builder is None:
+            self._builder = threading.Thread(target=self._build, name='history-index',
+                                             daemon=True)
+            self._builder.start()
+
+    def ensure_current(self):
+        """Load the saved index and index any log entries it does not cover
+
+        Returns True once the index covers the log. A backlog of more than
+        BACKGROUND_ENTRIES (a missing index on a long history, say) is indexed
+        on a background thread, and False is returned until it is done.
+        """
+        if self._builder is not None:
+            if self._builder.is_alive():
+                return False
+            self._builder = None
+        with self._lock:
+            self._load_once()
+            backlog = len(self.log) - self.count
+        if backlog > BACKGROUND_ENTRIES:
+            self._builder = threading.Thread(target=self._build, name='history-index',
+                                             daemon=True)
+            self._builder.start()
+            return False
+        self._catch_up()
+        return True
+
+    def clear(self):
+        """Forget every entry after HistoryLog.clear(), and save the empty index"""
+        with self._lock:
+            self._bits.clear()
+            self._numeric_terms.clear()
+            self.count = 0
+            self._loaded = True
+            self.save()
+
+    def _load(self):
+        try:
+            with open(self.path, 'rb') as f:
+                if f.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+                    return
+                count, terms = INDEX_HEADER.unpack(f.read(INDEX_HEADER.size))
+                bits = {}
+                for _ in range(terms):
+                    term_size, bits_size = _TERM_HEADER.unpack(f.read(_TERM_HEADER.size))
+                    term = f.read(term_size).decode('utf-8')
+                    data = f.read(bits_size)
+                    if len(data) != bits_size:
+                        return
+                    bits[term] = bytearray(data)
+        except (OSError, ValueError, struct.error):
+            return
+        self._bits = bits
+        self._numeric_terms = {term for term in bits if term[0] == NUMERIC_PREFIX}
+        # The last block may have been saved part-filled; re-index it
+        self.count = count - count % self.block_size
+        self._saved_blocks = self.count // self.block_size
+
+    def save(self):
+        """Write the index next to the log (atomically replacing the old one)"""
+        with self._lock:
+            if not self._loaded:
+                return
+            temp_path = self.path + '.tmp'
+            with open(temp_path, 'wb') as f:
+                f.write(INDEX_MAGIC)
+                f.write(INDEX_HEADER.pack(self.count, len(self._bits)))
+                for term, bits in self._bits.items():
+                    encoded = term.encode('utf-8')
+                    f.write(_TERM_HEADER.pack(len(encoded), len(bits)))
+                    f.write(encoded)
+                    f.write(bits)
+            os.replace(temp_path, self.path)
+            self._saved_blocks = self.count // self.block_size
+
+    # Queries
+    def _term_bits(self, term):
+        bits = self._bits.get(term)
+        return int.from_bytes(bits, 'little') if bits else 0
+
+    def _candidate_blocks(self, words, low, high):
+        blocks = self.count // self.block_size + 1
+        candidates = (1 << blocks) - 1
+        for word in words:
+            for term in _trigrams(word):
+                candidates &= self._term_bits(term)
+        if low is not None or high is not None:
+            low = -math.inf if low is None else low
+            high = math.inf if high is None else high
+            in_range = 0
+            for term in self._numeric_terms:
+                bucket_low, bucket_high = _bucket_bounds(term)
+                if bucket_low <= high and bucket_high >= low:
+                    in_range |= self._term_bits(term)
+            candidates &= in_range
+        return candidates
+
+    def search(self, query, limit=100):
+        """Return up to limit (entry_id, item) matches, newest first"""
+        words, low, high = parse_query(query)
+        ready = self.ensure_current()
+        with self._lock:
+            candidates = self._candidate_blocks(words, low, high)
+            if not ready:  # still being built: scan the blocks it does not cover yet
+                indexed = self.count // self.block_size
+                blocks = len(self.log) // self.block_size + 1
+                candidates |= ((1 << blocks) - 1) >> indexed << indexed
+        # Words as they appear inside the JSON log lines, for a cheap
+        # byte-level pre-check before decoding an entry. bytes.lower() only
+        # folds ASCII, so other words are left to the check on decoded text.
+        raw_words = [json.dumps(word, ensure_ascii=False)[1:-1].encode('utf-8')
+                     for word in words if word.isascii()]
+        numeric = low is not None or high is not None
+        matches = []
+        while candidates and len(matches) < limit:
+            block = candidates.bit_length() - 1
+            candidates ^= 1 << block
+            first = block * self.block_size
+            lines = self.log.read_lines(first, first + self.block_size)
+            for offset in range(len(lines) - 1, -1, -1):
+                line = lines[offset].lower()
+                if not all(word in line for word in raw_words):
+                    continue
+                if numeric and not _raw_in_range(line, low, high):
+                    continue
+                item = HistoryLog._decode(lines[offset])
+                if _matches(item, words, low, high):
+                    matches.append((first + offset, item))
+                    if len(matches) == limit:
+                        break
+        return matches
+
+
+def _raw_in_range(line, low, high):
+    """Range pre-check on a raw log line; True when it cannot be decided"""
+    _, sep, tail = line.rpartition(b' = ')
+    try:
+        value = float(tail[:tail.index(b'"')])
+    except ValueError:
+        return bool(sep)
+    return (low is None or value >= low) and (high is None or value <= high)
+
+
+def _matches(item, words, low, high):
+    text = item.lower()
+    if not all(word in text for word in words):
+        return False
+    if low is None and high is None:
+        return True
+    value = result_value(item)
+    if value is None:
+        return False
+    return (low is None or value >= low) and (high is None or value <= high)
+
+
+def search_items(items, query, limit=100):
+    """Search a plain sequence of entries (no index), newest first"""
+    words, low, high = parse_query(query)
+    matches = []
+    for entry_id in range(len(items) - 1, -1, -1):
+        if _matches(items[entry_id], words, low, high):
+            matches.append((entry_id, items[entry_id]))
+            if len(matches) == limit:
+                break
+    return matches
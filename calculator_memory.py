@@ -0,0 +1,92 @@
+"""Memory registers for the Ultimate Scientific Calculator.
+
+The bank is a fixed number of slots, each one little-endian 8-byte float,
+packed back to back in a single buffer. Given a path the buffer is a
+memory-mapped file: every store lands in the file as it happens and the
+next session maps the same values with no load step. Without a path it is
+an anonymous mapping that lasts as long as the bank.
+"""
+import mmap
+import os
+import struct
+
+SLOT = struct.Struct('<d')
+MEMORY_SLOTS = 10
+
+
+def memory_slots():
+    """Configured number of memory slots: SCICALC_MEMORY_SLOTS, else MEMORY_SLOTS"""
+    try:
+        return max(int(os.environ.get('SCICALC_MEMORY_SLOTS', MEMORY_SLOTS)), 1)
+    except ValueError:
+        return MEMORY_SLOTS
+
+
+class MemoryBank:
+    """Fixed-size array of float memory registers, optionally backed by a file"""
+
+    def __init__(self, slots=MEMORY_SLOTS, path=None):
+        if slots < 1:
+            raise ValueError("A memory bank needs at least one slot")
+        self.path = path
+        self._slots = slots
+        size = slots * SLOT.size
+        if path is None:
+            self._map = mmap.mmap(-1, size)
+            return
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            # A file from a bank of another size keeps its common slots
+            if os.fstat(fd).st_size != size:
+                os.ftruncate(fd, size)
+            self._map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+
+    def close(self):
+        if not self._map.closed:
+            self._map.flush()
+            self._map.close()
+
+    def __len__(self):
+        return self._slots
+
+    def _offset(self, slot):
+        if not 0 <= slot < self._slots:
+            raise IndexError(f"No memory slot M{slot + 1}")
+        return slot * SLOT.size
+
+    def __getitem__(self, slot):
+        return SLOT.unpack_from(self._map, self._offset(slot))[0]
+
+    def __setitem__(self, slot, value):
+        SLOT.pack_into(self._map, self._offset(slot), float(value))
+
+    def values(self):
+        return [value for value, in SLOT.iter_unpack(self._map)]
+
+    # Bulk operations
+    def clear(self):
+        self._map[:] = bytes(len(self._map))
+
+    def add_all(self, value):
+        """Add value to every slot"""
+        for slot, current in enumerate(self.values()):
+            self[slot] = current + value
+
+    def total(self):
+        return sum(self.values())
+
+    def mean(self):
+        return self.total() / self._slots
+
+
+def open_memory_bank(path):
+    """Map the memory file at path, or keep the registers in RAM if that fails"""
+    try:
+        return MemoryBank(memory_slots(), path)
+    except (OSError, ValueError):
+        return MemoryBank(memory_slots())
@@ -0,0 +1,189 @@
+"""Terminal mode for the Ultimate Scientific Calculator.
+
+`scientific-calculator.py --repl` reads expressions at a prompt and
+evaluates them like the GUI's "=" key, sharing its history log and memory
+registers. Only the headless core is imported: no tkinter, no matplotlib,
+and NumPy only once an expression uses arrays or 'np'. Ctrl-C abandons the
+current evaluation, Ctrl-D or 'quit' leaves.
+"""
+import os
+import sys
+
+from calculator_core import CalculatorCore, data_dir, evaluate_expression
+from calculator_history import HistoryLog
+from calculator_memory import open_memory_bank
+
+HISTORY_FILE_LINES = 1000  # input lines kept for readline between sessions
+
+HELP = """\
+Type an expression to evaluate it, for example  sin(30) + 2^10
+Commands:
+  deg, rad          set the angle unit
+  mod M, mod off    enter or leave modular mode
+  hex [EXPR]        last result (or EXPR) in hexadecimal
+  bin [EXPR]        last result (or EXPR) in binary
+  digits            exact digits of the last approximate result
+  ms, m+, m- [N]    store / add / subtract the last result in memory slot N
+  mr [N], mc [N]    recall / clear memory slot N (default: the selected slot)
+  slot N            select memory slot N
+  mem               list the memory slots
+  history [N]       show the last N calculations (default 10)
+  help, quit"""
+
+MEMORY_COMMANDS = {'ms': 'MS', 'm+': 'M+', 'm-': 'M-', 'mc': 'MC', 'mr': 'MR'}
+
+
+def _setup_readline(path):
+    """Enable line editing and persistent input history where available"""
+    try:
+        import readline
+    except ImportError:
+        return None
+    try:
+        readline.read_history_file(path)
+    except OSError:
+        pass
+    readline.set_history_length(HISTORY_FILE_LINES)
+    return readline
+
+
+class Repl:
+    """Command loop over a CalculatorCore"""
+
+    def __init__(self, core, exact=False, out=sys.stdout):
+        self.core = core
+        self.exact = exact
+        self.out = out
+        self.last = None  # display text of the last result, for hex/bin/memory
+
+    def write(self, text):
+        print(text, file=self.out)
+
+    @property
+    def prompt(self):
+        mode = self.core.angle_mode
+        if self.core.modulus is not None:
+            mode += f" mod {self.core.modulus}"
+        return f"{mode}> "
+
+    def evaluate(self, expression):
+        core = self.core
+        try:
+            result = evaluate_expression(expression, core.angle_mode, self.exact, core.modulus)
+        except KeyboardInterrupt:
+            self.write("Cancelled")
+            return
+        except Exception as e:
+            core.fail_evaluation(expression)
+            self.write(f"Error: {str(e) or type(e).__name__}")
+            return
+        self.last = core.finish_evaluation(expression, result)
+        prefix = "≈ " if core.exact_request is not None else ""
+        self.write(prefix + self.last)
+
+    def _slot(self, argument):
+        """0-based memory slot from a 1-based argument, or None for the selected slot"""
+        if not argument:
+            return None
+        slot = int(argument.lstrip('mM')) - 1
+        self.core.memory_bank[slot]  # IndexError if the bank has no such slot
+        return slot
+
+    def command(self, line):
+        """Run one input line; return False to leave the loop"""
+        core = self.core
+        name, _, argument = line.partition(' ')
+        name, argument = name.lower(), argument.strip()
+        try:
+            if name in ('quit', 'exit'):
+                return False
+            elif name in ('help', '?'):
+                self.write(HELP)
+            elif name in ('deg', 'rad') and not argument:
+                core.set_angle_mode(name)
+            elif name == 'mod' and argument:
+                core.set_modulus(None if argument == 'off' else int(argument))
+            elif name in ('hex', 'bin'):
+                text = argument or self.last
+                if argument:
+                    text = str(evaluate_expression(argument, core.angle_mode))
+                if text is None:
+                    self.write("Nothing to convert")
+                elif name == 'hex':
+                    self.write(core.convert_to_hex(text))
+                else:
+                    self.write(core.convert_to_bin(text))
+            elif name == 'digits' and not argument:
+                self.write(core.exact_digits())
+            elif name in MEMORY_COMMANDS:
+                op = MEMORY_COMMANDS[name]
+                slot = self._slot(argument)
+                if op in ('MS', 'M+', 'M-') and self.last is None:
+                    self.write("No result to store")
+                    return True
+                value = core.memory_operation(op, self.last, slot)
+                label = core.memory_slot if slot is None else slot
+                self.write(f"M{label + 1} = {value}")
+                core.clear()  # MR appends to the expression; here it is only shown
+            elif name == 'slot' and argument:
+                core.select_memory_slot(self._slot(argument))
+                self.write(f"Memory slot M{core.memory_slot + 1}")
+            elif name == 'mem' and not argument:
+                for slot, value in enumerate(core.memory_bank.values()):
+                    marker = '*' if slot == core.memory_slot else ' '
+                    self.write(f"{marker}M{slot + 1} = {value}")
+            elif name == 'history':
+                count = int(argument) if argument else 10
+                for item in list(core.history)[-count:]:
+                    self.write(item)
+            else:
+                self.evaluate(line)
+        except KeyboardInterrupt:
+            self.write("Cancelled")
+        except (IndexError, ValueError) as e:
+            self.write(f"Error: {e}")
+        return True
+
+    def run(self):
+        interactive = sys.stdin.isatty()
+        while True:
+            try:
+                line = input(self.prompt if interactive else '')
+            except EOFError:
+                if interactive:
+                    self.write('')
+                return
+            except KeyboardInterrupt:
+                self.write('')
+                continue
+            line = line.strip()
+            if line and not self.command(line):
+                return
+
+
+def run_repl(angle_mode='deg', exact=False):
+    """Start the terminal calculator on stdin/stdout"""
+    directory = data_dir()
+    try:
+        history_log = HistoryLog(os.path.join(directory, 'history.log'))
+    except OSError:
+        history_log = None
+    core = CalculatorCore(angle_mode, history_log=history_log,
+                          memory_bank=open_memory_bank(os.path.join(directory, 'memory.bin')))
+    readline_module = None
+    history_path = os.path.join(directory, 'repl_history')
+    if sys.stdin.isatty():
+        readline_module = _setup_readline(history_path)
+        print("Ultimate Scientific Calculator. Type 'help' for commands.")
+    try:
+        Repl(core, exact).run()
+    finally:
+        if readline_module is not None:
+            try:
+                readline_module.write_history_file(history_path)
+            except OSError:
+                pass
+        if history_log is not None:
+            history_log.close()
+        core.memory_bank.close()
+    return 0
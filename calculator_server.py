@@ -0,0 +1,412 @@
+"""HTTP/JSON evaluation service for the Ultimate Scientific Calculator.
+
+`scientific-calculator.py --serve` answers on a local socket:
+
+    POST /evaluate  {"expression": "2**10", "angle_mode": "deg", "exact": false,
+                     "modulus": null}
+    POST /batch     {"expressions": ["1+1", "sin(30)"], "angle_mode": "deg"}
+    POST /sample    {"function": "sin(x)", "x_min": -10, "x_max": 10, "samples": 500}
+    GET  /health
+    GET  /stats
+
+Every POST body may also carry "timeout" (seconds, capped at the server's),
+counted from the request's arrival.
+/sample samples adaptively unless "samples" asks for a uniform grid;
+points outside the function's domain are null.
+
+One asyncio event loop owns every connection, so thousands of concurrent
+clients cost a coroutine each. Evaluation runs in a fixed set of worker
+processes, each with an address-space limit. A process keeps its own
+in-memory compile cache; what one process compiles reaches the others
+through the shared on-disk compile cache (calculator_cache). CPU-bound C code such as big int powers holds the GIL, so a thread
+could be neither interrupted nor kept from starving the event loop (see
+calculator_worker). A request that misses its deadline is answered with 504
+and its worker process is killed and replaced. When the workers and their
+queue are full, new work is refused with 503 instead of piling up.
+"""
+import asyncio
+import json
+import multiprocessing
+import os
+import math
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from calculator_batch import _json_result, evaluate_fields
+from calculator_core import ANGLE_MODES, flush_compile_cache, set_compile_cache_stores
+from calculator_stats import STATS
+from calculator_worker import MEMORY_BUDGET, _limit_memory
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+REQUEST_TIMEOUT = 10.0  # seconds
+MAX_PENDING = 10000  # jobs queued or running before requests get 503
+IDLE_TIMEOUT = 60.0  # seconds a keep-alive connection may sit idle
+MAX_BODY = 16 << 20
+MAX_HEADERS = 100
+MAX_BATCH = 10000
+MAX_SAMPLES = 100000
+
+REASONS = {
+    200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    413: 'Payload Too Large', 422: 'Unprocessable Entity',
+    431: 'Request Header Fields Too Large', 500: 'Internal Server Error',
+    503: 'Service Unavailable', 504: 'Gateway Timeout',
+}
+
+
+class RequestError(Exception):
+    """A request the server refuses; carries the HTTP status"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _angle_mode(request):
+    angle_mode = request.get('angle_mode', 'deg')
+    if angle_mode not in ANGLE_MODES:
+        raise RequestError(400, f"angle_mode must be one of {', '.join(ANGLE_MODES)}")
+    return angle_mode
+
+
+def _field(request, name, kind):
+    try:
+        value = request[name]
+    except KeyError:
+        raise RequestError(400, f"Missing field: {name}") from None
+    if not isinstance(value, kind) or isinstance(value, bool):
+        raise RequestError(400, f"Wrong type for field: {name}")
+    return value
+
+
+def _timeout(request, limit):
+    """The request's "timeout", capped at limit"""
+    try:
+        timeout = float(request.get('timeout', limit))
+    except (TypeError, ValueError):
+        timeout = math.nan
+    if not (math.isfinite(timeout) and timeout > 0):
+        raise RequestError(422, f"timeout must be a positive number of seconds, "
+                                f"not {request['timeout']!r}")
+    return min(timeout, limit)
+
+
+def _json_floats(values):
+    """List of floats with NaN and infinities as None (JSON has neither)"""
+    return [value if value - value == 0 else None for value in values.tolist()]
+
+
+# Jobs: validated on the event loop into (function, args) for a worker
+# process; each function returns (status, JSON payload)
+
+def _evaluate(expression, angle_mode, exact, modulus):
+    fields = evaluate_fields(expression, angle_mode, exact, modulus)
+    return (422 if 'error' in fields else 200), fields
+
+
+def _batch(expressions, angle_mode, exact):
+    return 200, {'results': [evaluate_fields(expression, angle_mode, exact)
+                             for expression in expressions]}
+
+
+def _sample(text, x_min, x_max, samples, angle_mode):
+    import numpy as np
+    from calculator_graph import (SAMPLE_BUDGET, GraphFunction, compile_graph_function,
+                                  sample_function)
+
+    try:
+        func = compile_graph_function(text, angle_mode)
+        if not isinstance(func, GraphFunction):
+            return 422, {'error': "Only y = f(x) functions can be sampled"}
+        if samples is None:
+            x, y = sample_function(func, x_min, x_max, SAMPLE_BUDGET)
+        else:
+            x = np.linspace(x_min, x_max, samples)
+            y = func(x)
+    except Exception as e:
+        return 422, {'error': str(e) or type(e).__name__}
+    return 200, {'x': _json_floats(x), 'y': _json_floats(np.asarray(y, dtype=float))}
+
+
+def evaluate_job(request):
+    expression = _field(request, 'expression', str)
+    angle_mode = _angle_mode(request)
+    exact = bool(request.get('exact', False))
+    modulus = request.get('modulus')
+    return _evaluate, (expression, angle_mode, exact, modulus)
+
+
+def batch_job(request):
+    expressions = _field(request, 'expressions', list)
+    if len(expressions) > MAX_BATCH:
+        raise RequestError(413, f"At most {MAX_BATCH} expressions per batch")
+    if not all(isinstance(expression, str) for expression in expressions):
+        raise RequestError(400, "expressions must be strings")
+    angle_mode = _angle_mode(request)
+    exact = bool(request.get('exact', False))
+    return _batch, (expressions, angle_mode, exact)
+
+
+def sample_job(request):
+    text = _field(request, 'function', str)
+    x_min = float(_field(request, 'x_min', (int, float)))
+    x_max = float(_field(request, 'x_max', (int, float)))
+    if not x_min < x_max:
+        raise RequestError(400, "x_min must be less than x_max")
+    samples = request.get('samples')
+    if samples is not None and not (isinstance(samples, int) and 2 <= samples <= MAX_SAMPLES):
+        raise RequestError(400, f"samples must be an integer from 2 to {MAX_SAMPLES}")
+    angle_mode = _angle_mode(request)
+    return _sample, (text, x_min, x_max, samples, angle_mode)
+
+
+ROUTES = {
+    '/evaluate': evaluate_job,
+    '/batch': batch_job,
+    '/sample': sample_job,
+}
+
+
+def _job_worker(conn, memory_budget):
+    if memory_budget:
+        _limit_memory(memory_budget)
+    STATS.reset()  # forked with the parent's numbers; only report our own
+    set_compile_cache_stores('deferred')  # written after each answer has gone out
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        function, args = job
+        try:
+            status, payload = function(*args)
+        except MemoryError:
+            status, payload = 422, {'error': "Out of memory"}
+        except Exception as e:
+            status, payload = 500, {'error': str(e) or type(e).__name__}
+        conn.send((status, payload, STATS.drain()))
+        flush_compile_cache()
+
+
+class JobProcess:
+    """A worker process that runs one job at a time and is killed if it overruns"""
+
+    def __init__(self, memory_budget=MEMORY_BUDGET):
+        self._conn, child = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(
+            target=_job_worker, args=(child, memory_budget), daemon=True)
+        self._process.start()
+        child.close()
+
+    def run(self, job, timeout):
+        """Return (status, payload), or None if the job overran and the process was killed"""
+        try:
+            self._conn.send(job)
+            if self._conn.poll(timeout):
+                status, payload, stats = self._conn.recv()
+                STATS.merge(stats)
+                return status, payload
+        except (EOFError, OSError):
+            self.close()
+            return 500, {'error': "Worker stopped (out of memory?)"}
+        self.close()
+        return None
+
+    @property
+    def alive(self):
+        return self._process.is_alive()
+
+    def close(self):
+        if self._process.is_alive():
+            self._process.terminate()
+        self._process.join(timeout=1)
+        self._conn.close()
+
+
+class EvaluationServer:
+    """asyncio HTTP/1.1 front end over a fixed set of evaluation processes
+
+    Each of `workers` threads hands jobs to a process of its own and waits
+    for the answer; the threads only block in pipe reads, so the event loop
+    keeps serving while every process is busy.
+    """
+
+    def __init__(self, workers=None, timeout=REQUEST_TIMEOUT, max_pending=MAX_PENDING,
+                 memory_budget=MEMORY_BUDGET):
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self.memory_budget = memory_budget
+        self._pool = ThreadPoolExecutor(max_workers=self.workers,
+                                        thread_name_prefix='evaluate')
+        self._local = threading.local()
+        self._processes = set()
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    async def serve_forever(self, host=DEFAULT_HOST, port=DEFAULT_PORT, ready=None):
+        server = await asyncio.start_server(self._connection, host, port, backlog=4096)
+        if ready is not None:
+            ready(server)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.close()
+
+    def close(self):
+        self._pool.shutdown(wait=False)
+        with self._lock:
+            processes, self._processes = self._processes, set()
+        for process in processes:
+            process.close()
+
+    def _process(self):
+        """This pool thread's worker process, started or replaced as needed"""
+        process = getattr(self._local, 'process', None)
+        if process is None or not process.alive:
+            process = self._local.process = JobProcess(self.memory_budget)
+            with self._lock:
+                self._processes.add(process)
+        return process
+
+    def _execute(self, job, deadline):
+        """Run job in a pool thread; blocks until the job ends or is killed
+
+        Returns None if the deadline passes first, including while the job
+        was still queued.
+        """
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        process = self._process()
+        result = process.run(job, remaining)
+        if not process.alive:
+            with self._lock:
+                self._processes.discard(process)
+        return result
+
+    def _finished(self, future):
+        self._pending -= 1
+
+    async def _run(self, job, timeout):
+        if self._pending >= self.max_pending:
+            STATS.count('serve.rejected')
+            return 503, {'error': "Server busy"}
+        loop = asyncio.get_running_loop()
+        deadline = time.monotonic() + timeout
+        self._pending += 1
+        future = self._pool.submit(self._execute, job, deadline)
+        # Count the job until it has really ended, even if its client goes away
+        future.add_done_callback(lambda future: loop.call_soon_threadsafe(self._finished, future))
+        try:
+            # A queued job is cancelled; a running one is killed at the same deadline
+            result = await asyncio.wait_for(asyncio.wrap_future(future),
+                                            deadline - time.monotonic())
+        except asyncio.TimeoutError:
+            result = None
+        if result is None:
+            STATS.count('serve.timeouts')
+            return 504, {'error': f"Timed out after {timeout:g} s"}
+        return result
+
+    async def dispatch(self, method, path, body):
+        """Return (status, JSON payload) for one request"""
+        if path == '/health':
+            return 200, {'status': 'ok', 'pending': self._pending, 'workers': self.workers}
+        if path == '/stats':
+            return 200, STATS.to_dict()
+        make_job = ROUTES.get(path)
+        if make_job is None:
+            return 404, {'error': f"No such endpoint: {path}"}
+        if method != 'POST':
+            return 405, {'error': "Use POST"}
+        try:
+            request = json.loads(body or b'{}')
+            if not isinstance(request, dict):
+                raise RequestError(400, "Request body must be a JSON object")
+            timeout = _timeout(request, self.timeout)
+            job = make_job(request)
+        except RequestError as e:
+            return e.status, {'error': str(e)}
+        except (TypeError, ValueError) as e:
+            return 400, {'error': str(e) or "Invalid request"}
+        with STATS.time(f'serve.{path[1:]}'):
+            return await self._run(job, timeout)
+
+    async def _connection(self, reader, writer):
+        STATS.count('serve.connections')
+        try:
+            while True:
+                try:
+                    line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                if not line:
+                    break
+                try:
+                    method, target, version = line.decode('latin-1').split()
+                except ValueError:
+                    await self._respond(writer, 400, {'error': "Bad request line"}, False)
+                    break
+                headers = {}
+                for _ in range(MAX_HEADERS + 1):
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                else:
+                    await self._respond(writer, 431, {'error': "Too many header fields"}, False)
+                    break
+                length = headers.get('content-length') or '0'
+                if not (length.isascii() and length.isdigit()):
+                    await self._respond(writer, 400, {'error': "Bad Content-Length"}, False)
+                    break
+                length = int(length)
+                if length > MAX_BODY:
+                    await self._respond(writer, 413, {'error': "Request body too large"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection == 'keep-alive' if version == 'HTTP/1.0' \
+                    else connection != 'close'
+
+                STATS.count('serve.requests')
+                status, payload = await self.dispatch(method, target.split('?', 1)[0], body)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass  # client went away or sent something unparseable
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload, default=_json_result).encode()
+        head = (f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=None, timeout=REQUEST_TIMEOUT):
+    """Run the service until interrupted"""
+    server = EvaluationServer(workers, timeout)
+
+    def ready(listener):
+        address = listener.sockets[0].getsockname()
+        print(f"Serving on http://{address[0]}:{address[1]} "
+              f"({server.workers} workers, {timeout:g} s timeout)", file=sys.stderr)
+
+    try:
+        asyncio.run(server.serve_forever(host, port, ready))
+    except KeyboardInterrupt:
+        pass
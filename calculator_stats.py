@@ -0,0 +1,186 @@
+"""Performance counters and latency histograms for the Ultimate Scientific Calculator.
+
+Stages of evaluation, plotting and history updates are timed with
+STATS.time(name) and counted with STATS.count(name). Each timer keeps a
+count, total, min and max plus a histogram with one power-of-two bucket per
+doubling of latency, so recording a sample is a few arithmetic operations
+and memory stays fixed however long the program runs. Percentiles are
+estimated from the buckets.
+
+Worker processes keep their own registry and ship it back with drain();
+the front end folds it in with merge().
+"""
+import math
+import time
+
+BUCKETS = 32  # bucket k holds samples below 2**k microseconds; the last is open
+
+
+class Histogram:
+    """Latency distribution of one timed stage"""
+
+    __slots__ = ('count', 'total', 'min', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.buckets = [0] * BUCKETS
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+        bucket = math.frexp(seconds * 1e6)[1] if seconds > 0 else 0
+        self.buckets[min(max(bucket, 0), BUCKETS - 1)] += 1
+
+    def merge(self, other):
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of samples"""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(math.ldexp(1.0, bucket) * 1e-6, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count, 'total': self.total, 'mean': self.mean,
+            'min': self.min if self.count else 0.0, 'max': self.max,
+            'p50': self.percentile(0.5), 'p90': self.percentile(0.9),
+            'p99': self.percentile(0.99), 'buckets': list(self.buckets),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        histogram.count = data['count']
+        histogram.total = data['total']
+        histogram.min = data['min'] if data['count'] else math.inf
+        histogram.max = data['max']
+        histogram.buckets = list(data['buckets'])
+        return histogram
+
+
+class _Timer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.add(time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Stats:
+    """Registry of named counters and timers"""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.counters = {}
+        self.timers = {}
+
+    def histogram(self, name):
+        histogram = self.timers.get(name)
+        if histogram is None:
+            histogram = self.timers[name] = Histogram()
+        return histogram
+
+    def time(self, name):
+        """Context manager that adds the duration of its block to timer name"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self.histogram(name))
+
+    def record(self, name, seconds):
+        if self.enabled:
+            self.histogram(name).add(seconds)
+
+    def count(self, name, amount=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def reset(self):
+        self.counters.clear()
+        self.timers.clear()
+
+    def to_dict(self):
+        return {
+            'counters': dict(sorted(self.counters.items())),
+            'timers': {name: histogram.to_dict()
+                       for name, histogram in sorted(self.timers.items())},
+        }
+
+    def drain(self):
+        """Return everything recorded so far and start again from zero"""
+        data = self.to_dict()
+        self.reset()
+        return data
+
+    def merge(self, data):
+        """Fold in the result of another registry's to_dict()/drain()"""
+        for name, amount in data['counters'].items():
+            self.counters[name] = self.counters.get(name, 0) + amount
+        for name, timer in data['timers'].items():
+            self.histogram(name).merge(Histogram.from_dict(timer))
+
+    def rows(self):
+        """(kind, name, count, mean, p50, p90, p99, max) for display and CSV"""
+        rows = [('timer', name, h.count, h.mean, h.percentile(0.5), h.percentile(0.9),
+                 h.percentile(0.99), h.max) for name, h in sorted(self.timers.items())]
+        rows.extend(('counter', name, count, None, None, None, None, None)
+                    for name, count in sorted(self.counters.items()))
+        return rows
+
+    def to_json(self):
+        import json
+
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_csv(self):
+        import csv
+        import io
+
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(['kind', 'name', 'count', 'mean_s', 'p50_s', 'p90_s', 'p99_s', 'max_s'])
+        for row in self.rows():
+            writer.writerow(['' if value is None else value for value in row])
+        return out.getvalue()
+
+
+STATS = Stats()
@@ -0,0 +1,234 @@
+"""Background jobs for the Ultimate Scientific Calculator.
+
+Expression evaluation and big-integer work run in separate processes so
+they never block the GUI and can be cancelled by terminating the process;
+CPU-bound C code such as int power or math.factorial holds the GIL, so a
+thread would not do. Results come back over pipes that the front end polls
+from its event loop.
+"""
+import multiprocessing
+import time
+
+from calculator_core import exact_digits
+from calculator_stats import STATS
+
+DIGIT_CHUNK = 65536
+
+
+def _digits_worker(conn, request):
+    _limit_memory(MEMORY_BUDGET)
+    try:
+        digits = exact_digits(request)
+        for start in range(0, len(digits), DIGIT_CHUNK):
+            conn.send(('chunk', digits[start:start + DIGIT_CHUNK]))
+        conn.send(('done', len(digits)))
+    except MemoryError:
+        conn.send(('error', "Out of memory"))
+    except Exception as e:
+        conn.send(('error', str(e) or type(e).__name__))
+    finally:
+        conn.close()
+
+
+class DigitJob:
+    """Exact digits of an approximate result, computed in a subprocess
+
+    Call poll() from the event loop; it returns the chunks received so far
+    without blocking. `done` turns true once every chunk has arrived,
+    `error` holds a message if the worker failed.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.done = False
+        self.error = None
+        self._conn, child = multiprocessing.Pipe(duplex=False)
+        self._process = multiprocessing.Process(
+            target=_digits_worker, args=(child, request), daemon=True)
+        self._process.start()
+        child.close()
+
+    def poll(self):
+        """Return the digit chunks that are ready (possibly none)"""
+        chunks = []
+        try:
+            while not self.done and self._conn.poll():
+                kind, payload = self._conn.recv()
+                if kind == 'chunk':
+                    chunks.append(payload)
+                else:
+                    self.done = True
+                    if kind == 'error':
+                        self.error = payload
+        except EOFError:  # worker died without reporting
+            self.done = True
+            self.error = "Worker stopped"
+        if self.done:
+            self._cleanup()
+        return chunks
+
+    def cancel(self):
+        """Stop the computation"""
+        if self._process.is_alive():
+            self._process.terminate()
+        self.done = True
+        self._cleanup()
+
+    def _cleanup(self):
+        self._process.join(timeout=1)
+        self._conn.close()
+
+
+# Expression evaluation
+#
+# A single long-lived worker process evaluates expressions for the GUI, so
+# its compiled-expression cache stays warm between presses of "=". Each job
+# has a wall-clock budget; the process also runs under an address-space
+# limit. A job that overruns, runs out of memory or is cancelled takes the
+# process down with it, and the next job starts a fresh one.
+
+EVALUATION_TIMEOUT = 10.0  # seconds
+MEMORY_BUDGET = 1 << 30  # bytes the worker may allocate beyond its start size
+
+
+def _limit_memory(budget):
+    """Cap this process's address space at its current size plus budget"""
+    try:
+        import resource
+        with open('/proc/self/statm') as f:
+            current = int(f.read().split()[0]) * resource.getpagesize()
+        limit = current + budget
+        soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    except (ImportError, OSError, ValueError):
+        pass  # no limit on platforms without /proc or setrlimit
+
+
+def _evaluation_worker(conn, memory_budget):
+    from calculator_core import evaluate_expression, flush_compile_cache, set_compile_cache_stores
+
+    if memory_budget:
+        _limit_memory(memory_budget)
+    STATS.reset()  # forked with the parent's numbers; only report our own
+    set_compile_cache_stores('deferred')  # written after each answer has gone out
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            return
+        if request is None:
+            return
+        job_id, expression, angle_mode, modulus = request
+        # Stage timings recorded here travel back with the answer
+        try:
+            result = evaluate_expression(expression, angle_mode, modulus=modulus)
+            conn.send(('ok', job_id, result, STATS.drain()))
+        except MemoryError:
+            conn.send(('error', job_id, "Out of memory", STATS.drain()))
+        except Exception as e:
+            conn.send(('error', job_id, str(e) or type(e).__name__, STATS.drain()))
+        flush_compile_cache()
+
+
+class EvaluationJob:
+    """One expression submitted to an EvaluationWorker"""
+
+    def __init__(self, worker, job_id, expression, angle_mode):
+        self.worker = worker
+        self.job_id = job_id
+        self.expression = expression
+        self.angle_mode = angle_mode
+        self.started = time.monotonic()
+        self.done = False
+        self.result = None
+        self.error = None
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def poll(self, wait=0):
+        """Check for the result, waiting at most wait seconds; return done"""
+        if not self.done:
+            self.worker._collect(self, wait)
+        return self.done
+
+    def cancel(self):
+        if not self.done:
+            self.worker._abort(self, "Cancelled")
+
+
+class EvaluationWorker:
+    """Evaluates expressions in a subprocess with time and memory budgets"""
+
+    def __init__(self, timeout=EVALUATION_TIMEOUT, memory_budget=MEMORY_BUDGET):
+        self.timeout = timeout
+        self.memory_budget = memory_budget
+        self._process = None
+        self._conn = None
+        self._next_id = 0
+        self._job = None
+
+    def _start(self):
+        self._conn, child = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(
+            target=_evaluation_worker, args=(child, self.memory_budget), daemon=True)
+        self._process.start()
+        child.close()
+
+    def _stop(self):
+        if self._process is not None:
+            if self._process.is_alive():
+                self._process.terminate()
+            self._process.join(timeout=1)
+            self._conn.close()
+        self._process = None
+        self._conn = None
+
+    def submit(self, expression, angle_mode='deg', modulus=None):
+        """Start evaluating expression, cancelling any job still running"""
+        if self._job is not None and not self._job.done:
+            self._job.cancel()
+        if self._process is None or not self._process.is_alive():
+            self._stop()
+            self._start()
+        self._next_id += 1
+        self._job = EvaluationJob(self, self._next_id, expression, angle_mode)
+        self._conn.send((self._job.job_id, expression, angle_mode, modulus))
+        return self._job
+
+    def _collect(self, job, wait):
+        try:
+            while self._conn.poll(wait):
+                wait = 0
+                status, job_id, payload, stats = self._conn.recv()
+                STATS.merge(stats)
+                if job_id != job.job_id:
+                    continue  # answer to a job that was already abandoned
+                job.done = True
+                if status == 'ok':
+                    job.result = payload
+                else:
+                    job.error = payload
+                return
+        except (EOFError, OSError):
+            self._abort(job, "Worker stopped (out of memory?)")
+            return
+        if job.elapsed > self.timeout:
+            self._abort(job, f"Timed out after {self.timeout:g} s")
+
+    def _abort(self, job, message):
+        """Give up on job; the worker may be stuck in it, so restart it"""
+        job.done = True
+        job.error = message
+        self._stop()
+
+    def close(self):
+        if self._conn is not None:
+            try:
+                self._conn.send(None)
+            except OSError:
+                pass
+        self._stop()
@@ -0,0 +1,13 @@
+"""Tests for the Ultimate Scientific Calculator.
+
+Run from the repository root with  python -m unittest  (or pytest). The
+data directory points at a temporary one, so the compile cache and history
+of whoever runs the tests are left alone.
+"""
+import atexit
+import os
+import shutil
+import tempfile
+
+os.environ['SCICALC_HOME'] = tempfile.mkdtemp(prefix='scicalc-tests-')
+atexit.register(shutil.rmtree, os.environ['SCICALC_HOME'], True)
@@ -0,0 +1,88 @@
+"""On-disk compile cache: round trips, rejection of bad entries, eviction"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from calculator_cache import HEADER, CompileCache
+
+
+class CompileCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = CompileCache(os.path.join(self.directory, 'cache'), 1)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def entry_path(self):
+        (name,) = os.listdir(self.cache.directory)
+        return os.path.join(self.cache.directory, name)
+
+    def test_round_trip(self):
+        code = compile('1 + 2', '<expression>', 'eval')
+        self.cache.store('expression', (code, 3, False), '1+2', 'deg')
+        loaded = self.cache.load('expression', '1+2', 'deg')
+        self.assertEqual(eval(loaded[0]), 3)
+        self.assertEqual(loaded[1:], (3, False))
+        self.assertIsNone(self.cache.load('expression', '1+2', 'rad'))
+
+    def test_other_versions_miss(self):
+        self.cache.store('expression', 1, 'a')
+        self.assertIsNone(CompileCache(self.cache.directory, 2).load('expression', 'a'))
+
+    def test_corrupt_entry_is_rejected_and_deleted(self):
+        self.cache.store('expression', (1, 2, 3), 'a')
+        path = self.entry_path()
+        with open(path, 'r+b') as f:
+            f.seek(HEADER.size + 5)
+            byte = f.read(1)
+            f.seek(HEADER.size + 5)
+            f.write(bytes([byte[0] ^ 0xFF]))
+        self.assertIsNone(self.cache.load('expression', 'a'))
+        self.assertFalse(os.path.exists(path))
+
+    def test_truncated_entry_is_rejected(self):
+        self.cache.store('expression', (1, 2, 3), 'a')
+        with open(self.entry_path(), 'r+b') as f:
+            f.truncate(HEADER.size - 1)
+        self.assertIsNone(self.cache.load('expression', 'a'))
+
+    @unittest.skipUnless(hasattr(os, 'getuid'), "POSIX permissions")
+    def test_entries_writable_by_others_are_not_trusted(self):
+        self.cache.store('expression', 1, 'a')
+        os.chmod(self.entry_path(), 0o666)
+        self.assertIsNone(self.cache.load('expression', 'a'))
+        os.chmod(self.entry_path(), 0o600)
+        self.assertEqual(CompileCache(self.cache.directory, 1).load('expression', 'a'), 1)
+        os.chmod(self.cache.directory, 0o777)
+        self.assertIsNone(CompileCache(self.cache.directory, 1).load('expression', 'a'))
+
+    def test_eviction_keeps_the_directory_bounded(self):
+        cache = CompileCache(self.cache.directory, 1, max_bytes=64 << 10)
+        for i in range(100):
+            cache.store('expression', 'x' * 1000, str(i))
+        used = sum(size for _, size, _ in cache._entries())
+        self.assertLessEqual(used, 64 << 10)
+        self.assertEqual(cache.load('expression', '99'), 'x' * 1000)  # newest kept
+
+    def test_store_modes(self):
+        cache = CompileCache(self.cache.directory, 1, stores='off')
+        cache.store('expression', 1, 'a')
+        self.assertFalse(os.path.exists(self.cache.directory))
+        cache.stores = 'deferred'
+        cache.store('expression', 1, 'a')
+        self.assertFalse(os.path.exists(self.cache.directory))
+        cache.flush()
+        self.assertEqual(cache.load('expression', 'a'), 1)
+        with self.assertRaises(ValueError):
+            CompileCache(self.cache.directory, 1, stores='later')
+
+    def test_zero_bound_disables_the_cache(self):
+        cache = CompileCache(self.cache.directory, 1, max_bytes=0)
+        cache.store('expression', 1, 'a')
+        self.assertIsNone(cache.load('expression', 'a'))
+
+
+if __name__ == '__main__':
+    unittest.main()
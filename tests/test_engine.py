@@ -0,0 +1,113 @@
+"""Expression engine: the AST whitelist, notation and power-mod rewriting"""
+import unittest
+
+from calculator_core import (EXACT_DIGIT_LIMIT, MAX_ARRAY_ELEMENTS, ExpressionError,
+                             compile_expression, evaluate_expression, is_approximate)
+
+
+class WhitelistTest(unittest.TestCase):
+    REJECTED = (
+        '__import__("os")',
+        'open',
+        'print(1)',
+        'getattr',
+        '_power_mod(2, 3, 5)',
+        '(1).__class__',
+        'math.__dict__',
+        'np.load',
+        'np.sin.__call__',
+        '"abc"',
+        'True',
+        '[1, 2][0]',
+        'lambda: 1',
+        '(lambda: 1)()',
+        '[x for x in [1]]',
+        '{1: 2}',
+        'f"{1}"',
+        '1 < 2',
+        'a if 1 else 2',
+        'sqrt(x=4)',
+        'x',
+    )
+
+    def test_rejects_everything_outside_the_whitelist(self):
+        for expression in self.REJECTED:
+            with self.subTest(expression=expression):
+                with self.assertRaises(ExpressionError):
+                    compile_expression(expression)
+
+    def test_syntax_errors_are_expression_errors(self):
+        with self.assertRaises(ExpressionError):
+            compile_expression('2 +* 3')
+
+    def test_math_and_numpy_attributes_are_allowed(self):
+        self.assertEqual(evaluate_expression('math.sqrt(16)'), 4.0)
+        self.assertEqual(float(evaluate_expression('np.sin(0)')), 0.0)
+
+
+class NotationTest(unittest.TestCase):
+    def test_calculator_notation(self):
+        self.assertEqual(evaluate_expression('2^10'), 1024)
+        self.assertEqual(evaluate_expression('7 mod 3'), 1)
+        self.assertEqual(evaluate_expression('sqrt(16'), 4.0)  # closing parenthesis added
+        self.assertAlmostEqual(evaluate_expression('2*π'), 6.283185307179586)
+
+    def test_angle_modes(self):
+        self.assertAlmostEqual(evaluate_expression('sin(30)', 'deg'), 0.5)
+        self.assertAlmostEqual(evaluate_expression('asin(1)', 'deg'), 90.0)
+        self.assertAlmostEqual(evaluate_expression('sin(pi/2)', 'rad'), 1.0)
+        with self.assertRaises(ValueError):
+            evaluate_expression('1', 'grad')
+
+    def test_asin_is_not_rewritten_as_sin(self):
+        self.assertAlmostEqual(evaluate_expression('asin(0.5)', 'deg'), 30.0)
+
+    def test_compiled_expressions_are_cached(self):
+        self.assertIs(compile_expression('1 + 2'), compile_expression(' 1  +  2 '))
+
+
+class PowerModTest(unittest.TestCase):
+    def test_power_mod_matches_pow(self):
+        cases = ((3, 10 ** 8, 1000), (2, 10 ** 6, 7), (12345, 6789, 101), (-7, 5, 13))
+        for base, exponent, modulus in cases:
+            with self.subTest(base=base, exponent=exponent, modulus=modulus):
+                expression = f'({base})^({exponent}) mod {modulus}'
+                self.assertEqual(evaluate_expression(expression), pow(base, exponent, modulus))
+
+    def test_power_mod_is_not_routed_to_approximation(self):
+        compiled = compile_expression('3^(10^8) mod 1000')
+        self.assertLessEqual(compiled.cost, EXACT_DIGIT_LIMIT)
+
+    def test_float_operands_keep_ordinary_arithmetic(self):
+        self.assertAlmostEqual(evaluate_expression('2.5^2 mod 4'), 2.25)
+
+    def test_modulo_by_zero(self):
+        with self.assertRaises(ZeroDivisionError):
+            evaluate_expression('2^3 mod 0')
+
+
+class CostTest(unittest.TestCase):
+    def test_huge_powers_are_approximate_unless_exact(self):
+        self.assertTrue(is_approximate(evaluate_expression('10^200000')))
+        self.assertEqual(evaluate_expression('10^200', exact=True), 10 ** 200)
+
+    def test_float_overflow_is_approximated(self):
+        self.assertTrue(is_approximate(evaluate_expression('exp(1000)', 'rad')))
+
+
+class ArrayTest(unittest.TestCase):
+    def test_elementwise_arithmetic(self):
+        self.assertEqual(evaluate_expression('[1, 2, 3] * 2').tolist(), [2, 4, 6])
+        self.assertEqual(float(evaluate_expression('sum(range(1, 5))')), 10.0)
+
+    def test_array_size_is_capped(self):
+        with self.assertRaises(ValueError):
+            evaluate_expression('range(0, 1e9)')
+        with self.assertRaises(ValueError):
+            evaluate_expression(f'linspace(0, 1, {MAX_ARRAY_ELEMENTS + 1})')
+        with self.assertRaises(ValueError):
+            evaluate_expression('range(0, 10, 0)')
+
+
+if __name__ == '__main__':
+    unittest.main()
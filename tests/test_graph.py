@@ -0,0 +1,85 @@
+"""Graph functions: the optimizer must not change what a function computes"""
+import unittest
+
+import numpy as np
+
+from calculator_core import parse_expression
+from calculator_graph import (IN_PLACE_SIZE, _NAMESPACES, GraphFamily, GraphFunction,
+                              PlaneFunction, compile_graph_function)
+
+EXPRESSIONS = (
+    'x',
+    '2',
+    'x^2 + 3*x - 1',
+    'x^3 - x^4 + x^5',
+    'sin(x) + cos(x)^2 + tan(x/4)',
+    'sin(x)^2 + sin(x)^2 * cos(x)',
+    'sqrt(abs(x)) * exp(-x^2/100)',
+    'log(abs(x) + 1) + ln(x^2 + 1)',
+    '1/x',
+    'asin(x/20) + atan(x)',
+    '(x + 1)*(x + 1) - (x + 1)',
+    '2^10 * x + pi * e',
+    '-x - -x',
+    'floor(x) + ceil(x) mod 3',
+)
+
+
+def naive(text, angle_mode, x):
+    """Evaluate text with no optimizer: just the checked AST, compiled as is"""
+    namespace = _NAMESPACES[angle_mode]
+    tree = parse_expression(text, namespace, local_names=('x', 'y'))
+    with np.errstate(all='ignore'):
+        y = eval(compile(tree, '<naive>', 'eval'), namespace, {'x': x})
+    return np.broadcast_to(np.asarray(y, dtype=float), np.shape(x))
+
+
+class OptimizerTest(unittest.TestCase):
+    def test_matches_unoptimized_evaluation(self):
+        for size in (101, IN_PLACE_SIZE * 2 + 1):  # below and above the in-place threshold
+            x = np.linspace(-30, 30, size)
+            for angle_mode in ('deg', 'rad'):
+                for text in EXPRESSIONS:
+                    with self.subTest(text=text, angle_mode=angle_mode, size=size):
+                        func = compile_graph_function(text, angle_mode)
+                        self.assertIsInstance(func, GraphFunction)
+                        np.testing.assert_allclose(func(x), naive(text, angle_mode, x),
+                                                   rtol=1e-12, atol=1e-12, equal_nan=True)
+
+    def test_matches_plain_numpy(self):
+        x = np.linspace(-10, 10, IN_PLACE_SIZE * 2)
+        func = compile_graph_function('sin(x)^3 + 2*sin(x)', 'deg')
+        s = np.sin(np.radians(x))
+        np.testing.assert_allclose(func(x), s ** 3 + 2 * s, rtol=1e-12, atol=1e-12)
+
+    def test_input_is_not_modified(self):
+        x = np.linspace(-5, 5, IN_PLACE_SIZE * 2)
+        copy = x.copy()
+        compile_graph_function('-x + x^2 * 3 + sqrt(abs(x))', 'rad')(x)
+        np.testing.assert_array_equal(x, copy)
+
+    def test_family_rows_match_single_functions(self):
+        x = np.linspace(-3, 3, 50)
+        family = compile_graph_function('sin(k*x) + k, k=1..5', 'rad')
+        self.assertIsInstance(family, GraphFamily)
+        rows = family(x)
+        for row, k in zip(rows, family.values):
+            np.testing.assert_allclose(row, np.sin(k * x) + k, rtol=1e-12)
+
+    def test_plane_functions(self):
+        circle = compile_graph_function('x^2 + y^2 = 1', 'rad')
+        self.assertIsInstance(circle, PlaneFunction)
+        self.assertTrue(circle.implicit)
+        self.assertEqual(float(circle(np.array(0.6), np.array(0.8))), 0.0)
+        heat = compile_graph_function('x*y', 'rad')
+        self.assertFalse(heat.implicit)
+
+    def test_rejects_unknown_names(self):
+        with self.assertRaises(ValueError):
+            compile_graph_function('z + 1')
+        with self.assertRaises(ValueError):
+            compile_graph_function('__import__("os")')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,179 @@
+"""History log, its offset index and the search index"""
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import calculator_history
+from calculator_history import HistoryIndex, HistoryLog, parse_query, search_items
+
+
+class HistoryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'history.jsonl')
+        self.log = HistoryLog(self.path)
+
+    def tearDown(self):
+        self.log.close()
+        shutil.rmtree(self.directory)
+
+    def reopen(self):
+        self.log.close()
+        self.log = HistoryLog(self.path)
+
+    def fill(self, count):
+        for i in range(count):
+            self.log.append(f'{i}*2 = {2 * i}')
+
+
+class HistoryLogTest(HistoryTestCase):
+    def test_append_and_random_access(self):
+        self.fill(100)
+        self.assertEqual(len(self.log), 100)
+        self.assertEqual(self.log[0], '0*2 = 0')
+        self.assertEqual(self.log[-1], '99*2 = 198')
+        self.assertEqual(self.log.read(10, 12), ['10*2 = 20', '11*2 = 22'])
+        self.assertEqual(self.log.tail(2), ['98*2 = 196', '99*2 = 198'])
+        with self.assertRaises(IndexError):
+            self.log[100]
+
+    def test_survives_reopening(self):
+        self.fill(10)
+        self.reopen()
+        self.assertEqual(len(self.log), 10)
+        self.assertEqual(self.log[9], '9*2 = 18')
+
+    def test_damaged_offset_index_is_rebuilt(self):
+        self.fill(10)
+        self.log.close()
+        with open(self.path + '.idx', 'r+b') as f:
+            f.truncate(20)  # two and a half offsets
+        self.log = HistoryLog(self.path)
+        self.assertEqual(len(self.log), 10)
+        self.assertEqual(self.log[7], '7*2 = 14')
+
+    def test_clear_is_permanent(self):
+        self.fill(10)
+        self.log.clear()
+        self.assertEqual(len(self.log), 0)
+        self.log.append('after')
+        self.reopen()
+        self.assertEqual(self.log.read(), ['after'])
+
+    def test_torn_last_line_is_terminated(self):
+        self.fill(3)
+        self.log.close()
+        with open(self.path, 'ab') as f:
+            f.write(b'{"time": 0, "item": "4*2')
+        self.log = HistoryLog(self.path)
+        self.assertEqual(len(self.log), 4)
+        self.log.append('after')
+        self.assertEqual(self.log[-1], 'after')
+
+
+class QueryTest(unittest.TestCase):
+    def test_parse_query(self):
+        self.assertEqual(parse_query('Sin COS'), (['sin', 'cos'], None, None))
+        self.assertEqual(parse_query('between 10 and 1'), ([], 1.0, 10.0))
+        self.assertEqual(parse_query('sqrt 1e3..1e4'), (['sqrt'], 1000.0, 10000.0))
+        self.assertEqual(parse_query('>= 5 < 9'), ([], 5.0, 9.0))
+
+    def test_search_items(self):
+        items = ['1+1 = 2', 'sin(30) = 0.5', '2^10 = 1024', 'SIN(90) = 1']
+        self.assertEqual(search_items(items, 'sin'), [(3, 'SIN(90) = 1'), (1, 'sin(30) = 0.5')])
+        self.assertEqual(search_items(items, '> 100'), [(2, '2^10 = 1024')])
+        self.assertEqual(search_items(items, 'sin', limit=1), [(3, 'SIN(90) = 1')])
+
+
+class HistoryIndexTest(HistoryTestCase):
+    def test_matches_a_linear_scan(self):
+        self.fill(1000)
+        self.log.append('Ärger + été = 5')
+        index = HistoryIndex(self.log)
+        items = self.log.read()
+        for query in ('99', '7*2', '= 1', 'between 100 and 120', '>= 1990', '< 0', 'nothing',
+                      'ärger', 'ÉTÉ', '9 between 1000 and 2000'):
+            with self.subTest(query=query):
+                self.assertEqual(index.search(query), search_items(items, query))
+
+    def test_non_ascii_case_is_folded(self):
+        self.log.append('Ärger = 1')
+        index = HistoryIndex(self.log)
+        self.assertEqual(index.search('ärger'), [(0, 'Ärger = 1')])
+        self.assertEqual(index.search('ÄRGER'), [(0, 'Ärger = 1')])
+
+    def test_newest_first_with_limit(self):
+        self.fill(500)
+        index = HistoryIndex(self.log)
+        matches = index.search('*2', limit=3)
+        self.assertEqual([entry_id for entry_id, _ in matches], [499, 498, 497])
+
+    def test_new_entries_are_indexed(self):
+        self.fill(200)
+        index = HistoryIndex(self.log)
+        index.search('1')
+        entry_id = self.log.append('fresh = 42')
+        index.add(entry_id, 'fresh = 42')
+        self.assertEqual(index.search('fresh'), [(200, 'fresh = 42')])
+        self.assertEqual(index.count, 201)
+
+    def test_saved_index_is_reused_and_caught_up(self):
+        self.fill(300)
+        index = HistoryIndex(self.log)
+        index.search('1')
+        index.save()
+        self.log.append('later = 7')
+        self.reopen()
+        index = HistoryIndex(self.log)
+        self.assertEqual(index.search('later'), [(300, 'later = 7')])
+        self.assertEqual(index.search('299*'), [(299, '299*2 = 598')])
+
+    def test_damaged_index_file_is_rebuilt(self):
+        self.fill(300)
+        index = HistoryIndex(self.log)
+        index.search('1')
+        index.save()
+        with open(index.path, 'r+b') as f:
+            f.truncate(os.path.getsize(index.path) // 2)
+        index = HistoryIndex(self.log)
+        self.assertEqual(index.search('123*'), [(123, '123*2 = 246')])
+
+    def test_clear(self):
+        self.fill(300)
+        index = HistoryIndex(self.log)
+        index.search('1')
+        self.log.clear()
+        index.clear()
+        self.assertEqual(index.search('1'), [])
+        entry_id = self.log.append('after = 1')
+        index.add(entry_id, 'after = 1')
+        self.reopen()
+        index = HistoryIndex(self.log)
+        self.assertEqual(index.search('1'), [(0, 'after = 1')])
+
+    def test_large_backlog_is_indexed_in_the_background(self):
+        self.fill(300)
+        with mock.patch.object(calculator_history, 'BACKGROUND_ENTRIES', 100):
+            index = HistoryIndex(self.log)
+            # Correct answers while the builder runs, from the index and a scan
+            expected = search_items(self.log.read(), '17*')
+            self.assertEqual(index.search('17*'), expected)
+            index._builder.join()
+        self.assertTrue(index.ensure_current())
+        self.assertEqual(index.count, 300)
+        self.assertTrue(os.path.exists(index.path))
+        self.assertEqual(index.search('17*'), expected)
+
+    def test_prepare_builds_ahead_of_the_first_search(self):
+        self.fill(300)
+        index = HistoryIndex(self.log)
+        index.prepare()
+        index._builder.join()
+        self.assertEqual(index.count, 300)
+        self.assertEqual(index.search('250*'), search_items(self.log.read(), '250*'))
+
+
+if __name__ == '__main__':
+    unittest.main()
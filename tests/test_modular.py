@@ -0,0 +1,76 @@
+"""Modular arithmetic: modinv, lcm, crt and the modular evaluation mode"""
+import unittest
+
+from calculator_core import check_modulus, crt, evaluate_expression, lcm, modinv
+
+
+class NumberTheoryTest(unittest.TestCase):
+    def test_modinv(self):
+        self.assertEqual(modinv(3, 7), 5)
+        self.assertEqual(3 * modinv(3, 1000003) % 1000003, 1)
+        with self.assertRaises(ValueError):
+            modinv(2, 4)
+
+    def test_lcm(self):
+        self.assertEqual(lcm(4, 6), 12)
+        self.assertEqual(lcm(2, 3, 4, 5), 60)
+        self.assertEqual(lcm(-4, 6), 12)
+        self.assertEqual(lcm(0, 5), 0)
+
+    def test_crt(self):
+        self.assertEqual(crt(2, 3, 3, 5, 2, 7), 23)
+        self.assertEqual(crt(5, 1), 0)
+        self.assertEqual(crt(3, 4, 1, 6), 7)  # moduli need not be coprime
+
+    def test_crt_solution_satisfies_every_congruence(self):
+        pairs = (17, 101, 5, 12, 1, 35)
+        x = crt(*pairs)
+        for r, m in zip(pairs[::2], pairs[1::2]):
+            self.assertEqual(x % m, r % m)
+
+    def test_crt_rejects_bad_input(self):
+        for pairs in ((2, 4, 1, 6), (1,), (), (5, -3), (5, 0), (1, 3.0), (2.5, 3)):
+            with self.subTest(pairs=pairs):
+                with self.assertRaises(ValueError):
+                    crt(*pairs)
+
+    def test_functions_are_available_in_expressions(self):
+        self.assertEqual(evaluate_expression('crt(2, 3, 3, 5)'), 8)
+        self.assertEqual(evaluate_expression('modinv(3, 7)'), 5)
+        self.assertEqual(evaluate_expression('lcm(4, 6)'), 12)
+
+
+class ModularModeTest(unittest.TestCase):
+    def test_every_operation_is_reduced(self):
+        self.assertEqual(evaluate_expression('5 - 9', modulus=7), 3)
+        self.assertEqual(evaluate_expression('2^100', modulus=1000), pow(2, 100, 1000))
+        self.assertEqual(evaluate_expression('123456789 * 987654321', modulus=97),
+                         123456789 * 987654321 % 97)
+
+    def test_division_uses_the_inverse(self):
+        self.assertEqual(evaluate_expression('3 / 2', modulus=7), 5)
+        self.assertEqual(evaluate_expression('2^-1', modulus=7), 4)
+        with self.assertRaises(ValueError):
+            evaluate_expression('1 / 2', modulus=4)
+
+    def test_exponents_are_not_reduced(self):
+        # 2^(7 + 1) is 2^8, not 2^((7 + 1) mod 7)
+        self.assertEqual(evaluate_expression('2^(7 + 1)', modulus=7), pow(2, 8, 7))
+
+    def test_powers_and_division_need_integers(self):
+        self.assertEqual(evaluate_expression('4.0 / 2', modulus=7), 2)
+        for expression in ('1.5 / 2', '1.5^2', '2^0.5'):
+            with self.subTest(expression=expression):
+                with self.assertRaises(ValueError):
+                    evaluate_expression(expression, modulus=7)
+
+    def test_modulus_is_validated(self):
+        self.assertIsNone(check_modulus(None))
+        for modulus in (1, 0, -5, 2.0, '7'):
+            with self.subTest(modulus=modulus):
+                with self.assertRaises(ValueError):
+                    check_modulus(modulus)
+
+
+if __name__ == '__main__':
+    unittest.main()